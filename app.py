@@ -1,16 +1,25 @@
 import getpass
-from typing import Any, Callable, Tuple
+import itertools
+import os
+import sys
+import threading
+from collections.abc import Sequence
+from concurrent.futures import Future, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from typeguard import typechecked
 from valid8 import ValidationError
 
-from movie.domain import Email, MovieDealer, Password, Username, Id, Title, Description, Year, Category, Director, \
-    ImageUrl, Movie
 from movie.menu import Entry, Menu, MenuDescription
+from movie.render import TableRenderer
+
+
+# movie.domain and what it pulls in (requests, the replica, the like queue) take most of the startup time, so
+# they are imported by the methods that need them and first loaded while the menu waits for input
 
 
 class App:
-    def __init__(self):
+    def __init__(self, replica_path: Optional[str] = None, write_behind: bool = False, full_screen: bool = False):
         self.__menu = Menu.Builder(MenuDescription('Secure Movie Application Command line'),
                                    auto_select=lambda: print('Welcome to Secure Movie Design!')) \
             .with_entry(Entry.create('1', 'Sign up', on_selected=lambda: self.__sign_up())) \
@@ -25,37 +34,75 @@ class App:
             .with_entry(Entry.create('10', 'Sort by title', on_selected=lambda: self.__sortByTitle())) \
             .with_entry(Entry.create('11', 'Filter by director', on_selected=lambda: self.__filter_by_director())) \
             .with_entry(Entry.create('12', 'Log out', on_selected=lambda: self.__logout())) \
+            .with_entry(Entry.create('13', 'Import movies', on_selected=lambda: self.__import_movies())) \
+            .with_entry(Entry.create('14', 'Stats', on_selected=lambda: self.__show_stats())) \
             .with_entry(Entry.create('0', 'Exit', on_selected=lambda: print('See you next time!'), is_exit=True)) \
             .build()
-        self.__film_dealer = MovieDealer()
+        # the dealer is built and warmed up in the background, the first menu entry that needs it waits for it
+        self.__dealer: Future = Future()
+        threading.Thread(target=self.__start_dealer, args=(replica_path, write_behind), name='dealer-start',
+                         daemon=True).start()
         self.__token = None
-
-    def __list_movies(self):
-        movies = self.__film_dealer.get_movies()
-        if len(movies) == 0:
-            print('No movies found...')
-        else:
+        self.__renderer = TableRenderer()
+        self.__browser = None
+        if full_screen:
+            from movie import tui
+            # full screen needs curses and a terminal; otherwise the tables are printed as usual
+            if tui.available() and sys.stdout.isatty():
+                self.__browser = tui.MovieBrowser()
+
+    def __start_dealer(self, replica_path: Optional[str], write_behind: bool) -> None:
+        try:
+            from movie.domain import MovieDealer
+            from movie.likes import LikeQueueConfig
+            likes = LikeQueueConfig() if write_behind else None
+            dealer = MovieDealer.with_replica(replica_path, write_behind=likes) if replica_path \
+                else MovieDealer(write_behind=likes)
+            try:
+                dealer.warm_up()
+            except Exception:
+                # warming up only saves the first request its connection setup
+                pass
+            if dealer.sync is not None:
+                dealer.sync.start()
+        except BaseException as e:
+            self.__dealer.set_exception(e)
+            return
+        self.__dealer.set_result(dealer)
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        # True once the dealer is built and warmed up, or failed to start
+        return bool(wait([self.__dealer], timeout).done)
+
+    @property
+    def __film_dealer(self) -> Any:
+        return self.__dealer.result()
+
+    def __list_movies(self) -> bool:
+        if self.__browser is not None:
+            # the browser reads rows by position, and the listing comes back as a view on the columnar catalog
+            movies = self.__film_dealer.get_movies()
+            if len(movies) == 0:
+                print('No movies found...')
+                return False
             self.__show_movies(movies)
+            return True
+        movies = self.__film_dealer.iter_movies()
+        first = next(movies, None)
+        if first is None:
+            print('No movies found...')
+            return False
+        self.__show_movies(itertools.chain((first,), movies))
+        return True
 
-    @typechecked
     def __show_movies(self, movies, title_str: str = 'ALL MOVIES'):
-        def sep():
-            print('-' * 120)
-
-        fmt = '{:4}\t{:40}\t{:25}\t{:15}\t{:4}'
-
-        print()
-        sep()
-        print(title_str)
-        sep()
-        print(fmt.format('ID', 'TITLE', 'DIRECTOR', 'CATEGORY', 'YEAR'))
-        sep()
-        for movie in movies:
-            print(fmt.format(movie['id'], movie['title'], movie['director'], movie['category'], movie['year']))
-        sep()
-        print()
+        if self.__browser is not None:
+            self.__browser.show(movies if isinstance(movies, Sequence) else list(movies), title_str)
+        else:
+            self.__renderer.render(movies, title_str)
 
     def __sign_up(self):
+        from movie.domain import Email, Password, Username
         username = self.__read_from_input("insert username", Username)
         email = self.__read_from_input("insert email", Email)
         password = self.__read_from_input("insert password", Password, password=True)
@@ -68,6 +115,7 @@ class App:
             print("You are already logged!")
             return
 
+        from movie.domain import Password, Username
         username = self.__read_from_input("insert username", Username)
         password = self.__read_from_input("insert password", Password, password=True)
         token = self.__film_dealer.login(username, password)
@@ -82,7 +130,14 @@ class App:
             print("You must be logged to add like!")
             return
 
-        movie_id = self.__read_from_input("insert movie id", Id, to_convert=True)
+        from movie.domain import parse_id_list
+        movie_ids = self.__read_from_input("insert movie ids (e.g. 1,5,10-40)", parse_id_list)
+        if len(movie_ids) > 1:
+            self.__print_bulk_result(self.__film_dealer.add_likes(self.__token, movie_ids), 'Liked',
+                                     "Couldn't like the movies with ids")
+            return
+
+        movie_id = movie_ids[0]
         result = self.__film_dealer.add_like(self.__token, movie_id)
 
         if result:
@@ -95,7 +150,14 @@ class App:
             print("You must be logged to remove like!")
             return
 
-        movie_id = self.__read_from_input("insert movie id", Id, to_convert=True)
+        from movie.domain import parse_id_list
+        movie_ids = self.__read_from_input("insert movie ids (e.g. 1,5,10-40)", parse_id_list)
+        if len(movie_ids) > 1:
+            self.__print_bulk_result(self.__film_dealer.remove_likes(self.__token, movie_ids), 'Removed like from',
+                                     "Couldn't remove like to the movies with ids")
+            return
+
+        movie_id = movie_ids[0]
         result = self.__film_dealer.remove_like(self.__token, movie_id)
 
         if result:
@@ -103,6 +165,13 @@ class App:
         else:
             print(f"Couldn't remove like to the movie with id {movie_id}...")
 
+    @staticmethod
+    def __print_bulk_result(results: Dict[int, bool], done: str, failed: str) -> None:
+        failures = [str(movie_id) for movie_id, ok in results.items() if not ok]
+        print(f"{done} {len(results) - len(failures)} of {len(results)} movies.")
+        if failures:
+            print(f"{failed} {', '.join(failures)}...")
+
     def __addMovie(self):
         if not self.__is_logged():
             print("You must be logged to add a movie!")
@@ -119,6 +188,32 @@ class App:
         else:
             print("Couldn't add the movie...")
 
+    def __import_movies(self):
+        if not self.__is_logged():
+            print("You must be logged to import movies!")
+            return
+
+        elif not self.__film_dealer.is_admin_user(self.__token):
+            print("You must be admin to import movies!")
+            return
+
+        path = input('File to import (.csv or .jsonl): ').strip()
+        if not os.path.isfile(path):
+            print(f"File {path} not found!")
+            return
+
+        from movie.importer import MovieImporter, write_error_report
+        importer = MovieImporter(self.__film_dealer, self.__token, checkpoint_path=f'{path}.checkpoint')
+        try:
+            report = importer.run(path)
+        except ValueError as e:
+            print(f"Couldn't import the movies: {e}")
+            return
+        print(report.summary())
+        if report.errors:
+            write_error_report(report, f'{path}.errors.csv')
+            print(f"Rows with errors are listed in {path}.errors.csv")
+
     def __updateMovie(self):
         if not self.__is_logged():
             print("You must be logged to update a movie!")
@@ -128,18 +223,19 @@ class App:
             print("You must be admin to update a movie!")
             return
 
-        self.__list_movies()
+        from movie.domain import Id, Movie, UpdateOutcome
+        listed = self.__list_movies()
         movie_id = self.__read_from_input("insert movie id", Id, to_convert=True)
-        movie = self.__film_dealer.get_movie(movie_id)
+        # the id was picked from the listing just shown, which the dealer still holds
+        movie = self.__film_dealer.get_listed_movie(movie_id) if listed else self.__film_dealer.get_movie(movie_id)
 
         if movie is None:
             print(f"Movie with id {movie_id.value} not found!")
             return
 
-        movie_to_print = Movie(Id(movie['id']), Title(movie['title']), Description(movie['description']),
-                               Year(movie['year']), Category(Category.MovieCategory[movie['category']]),
-                               Director(movie['director']))
+        movie_to_print = Movie.create(movie)
         print(movie_to_print)
+        original = dict(movie)
 
         for f, c in self.__film_dealer.movie_fields:
             print(f"Do you want to update {f}? (y to update, n to skip)")
@@ -151,10 +247,14 @@ class App:
                     val = self.__read_from_input(f"insert new {f}", c)
                     movie[f] = val.value
 
-        result = self.__film_dealer.update_movie(self.__token, movie)
+        result = self.__film_dealer.patch_movie(self.__token, original, movie)
 
-        if result:
+        if result is UpdateOutcome.UPDATED:
             print("Movie updated successfully!")
+        elif result is UpdateOutcome.UNCHANGED:
+            print("Nothing to update.")
+        elif result is UpdateOutcome.CONFLICT:
+            print("The movie was changed by someone else in the meantime, please try again.")
         else:
             print("Couldn't update the movie...")
 
@@ -167,9 +267,11 @@ class App:
             print("You must be admin to remove a movie!")
             return
 
-        self.__list_movies()
+        from movie.domain import Id
+        listed = self.__list_movies()
         movie_id = self.__read_from_input("insert movie id", Id, to_convert=True)
-        movie = self.__film_dealer.get_movie(movie_id)
+        # the id was picked from the listing just shown, which the dealer still holds
+        movie = self.__film_dealer.get_listed_movie(movie_id) if listed else self.__film_dealer.get_movie(movie_id)
 
         if movie is None:
             print(f"Movie with id {movie_id.value} not found!")
@@ -187,6 +289,7 @@ class App:
             print("You must be logged to logout!")
             return
 
+        self.__report_unsent_likes(self.__film_dealer.flush_likes(self.__token))
         result = self.__film_dealer.logout(self.__token)
         if result:
             print("Logout successful!")
@@ -213,6 +316,7 @@ class App:
             self.__show_movies(movies, title_str='USER LIKED MOVIES')
 
     def __filter_by_director(self):
+        from movie.domain import Director
         director = self.__read_from_input("insert director", Director)
         movies = self.__film_dealer.filter_movies_by_director(director)
         if len(movies) == 0:
@@ -220,7 +324,36 @@ class App:
         else:
             self.__show_movies(movies, title_str='MOVIES FILTERED BY DIRECTOR')
 
-    def __read_movie(self) -> Tuple[Title, Description, Year, Category, Director, ImageUrl]:
+    def __show_stats(self):
+        metrics = self.__film_dealer.metrics
+        while True:
+            self.__print_stats(metrics.snapshot())
+            line = input('Enter to refresh, a file name to export (.json or .prom), q to go back: ').strip()
+            if line == 'q':
+                return
+            if line:
+                try:
+                    print(f"Stats exported as {metrics.export(line)} to {line}")
+                except OSError as e:
+                    print(f"Couldn't export the stats: {e}")
+
+    @staticmethod
+    def __print_stats(stats: List[Any]) -> None:
+        if not stats:
+            print('No requests sent yet...')
+            return
+        print_sep = lambda: print('-' * 100)
+        fmt = '%-7s %-38s %7s %7s %10s %9s %9s %9s'
+        print_sep()
+        print(fmt % ('METHOD', 'ENDPOINT', 'CALLS', 'ERRORS', 'KB', 'P50 MS', 'P95 MS', 'P99 MS'))
+        print_sep()
+        for s in stats:
+            print(fmt % (s.method, s.path, s.count, s.errors, f'{s.bytes / 1024:.1f}', f'{s.p50 * 1000:.1f}',
+                         f'{s.p95 * 1000:.1f}', f'{s.p99 * 1000:.1f}'))
+        print_sep()
+
+    def __read_movie(self) -> Tuple['Title', 'Description', 'Year', 'Category', 'Director', 'ImageUrl']:
+        from movie.domain import Description, Director, ImageUrl, Title, Year
         title = self.__read_from_input('Title', Title)
         description = self.__read_from_input('Description', Description)
         year = self.__read_from_input('Year', Year, to_convert=True)
@@ -242,6 +375,7 @@ class App:
 
     @typechecked
     def __read_category(self, prompt: str) -> Any:
+        from movie.domain import Category
         while True:
             try:
                 self.__print_categories()
@@ -279,13 +413,27 @@ class App:
     def __is_logged(self):
         return self.__token is not None
 
+    @staticmethod
+    def __report_unsent_likes(unsent: int) -> None:
+        if unsent:
+            print(f"Couldn't save {unsent} like changes, the server is not reachable...")
+
     def run(self):
-        self.__menu.run()
+        try:
+            self.__menu.run()
+        finally:
+            self.__report_unsent_likes(self.__film_dealer.flush_likes())
+            self.__film_dealer.close()
 
 
-def main(name: str):
+def main(name: str, argv: Optional[List[str]] = None):
     if name == '__main__':
-        App().run()
+        # with arguments the app runs them as commands and exits, without them it opens the menu
+        if argv:
+            from movie import cli
+            sys.exit(cli.main(argv))
+        App(os.environ.get('MOVIE_REPLICA'), write_behind=os.environ.get('MOVIE_WRITE_BEHIND') == '1',
+            full_screen=os.environ.get('MOVIE_FULL_SCREEN') == '1').run()
 
 
-main(__name__)
+main(__name__, sys.argv[1:])
@@ -0,0 +1,59 @@
+import argparse
+import gc
+import time
+import tracemalloc
+
+from benchmarks.stub_server import synthetic_movies
+from movie.catalog import LocalCatalog
+from movie.columns import ColumnStore, numpy
+
+
+def timed(run) -> float:
+    start = time.perf_counter()
+    run()
+    return time.perf_counter() - start
+
+
+def traced(build) -> tuple:
+    gc.collect()
+    tracemalloc.start()
+    res = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return res, size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Memory and query times of the columnar catalog')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    rows, dict_size = traced(lambda: synthetic_movies(args.rows))
+
+    def columns():
+        store = ColumnStore()
+        for row in rows:
+            store.put(row)
+        return store
+
+    store, column_size = traced(columns)
+    del store
+    catalog = LocalCatalog()
+    load = timed(lambda: catalog.load(rows))
+    del rows
+    gc.collect()
+
+    print(f'{args.rows} movies, NumPy {"on" if numpy is not None else "off"}')
+    print(f'list of dicts    {dict_size / args.rows:8.1f} B/movie')
+    print(f'column store     {column_size / args.rows:8.1f} B/movie')
+    print(f'load             {load:8.3f} s')
+    print(f'sort by title    {timed(lambda: catalog.sorted_by_title()):8.3f} s')
+    print(f'sort by year     {timed(lambda: catalog.sorted_by("year")):8.3f} s')
+    print(f'sort by director {timed(lambda: catalog.sorted_by("director")):8.3f} s')
+    print(f'select category  {timed(lambda: catalog.select(category="DRAMA", min_year=2000)):8.3f} s')
+    print(f'filter director  {timed(lambda: catalog.filter_by_director("Director bc")):8.3f} s')
+    print(f'iterate 100k     {timed(lambda: sum(1 for _ in catalog.table()[:100_000])):8.3f} s')
+
+
+if __name__ == '__main__':
+    main()
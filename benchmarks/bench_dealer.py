@@ -0,0 +1,124 @@
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Tuple
+
+from requests.exceptions import RequestException
+
+from benchmarks.report import compare, load, save, summarize
+from benchmarks.stub_server import StubServer
+from movie.cache import CacheConfig, ResponseCache
+from movie.domain import MovieDealer, Username, Password, Email, Id, Title, Description, Year, Category, Director, \
+    ImageUrl, UpdateOutcome
+
+IMAGE_URL = 'https://image.tmdb.org/t/p/w500/abcdefghiABCDEFGH0123456789.jpg'
+
+Operation = Tuple[str, Callable[[int], Any]]
+
+
+def operations(dealer: MovieDealer, server: StubServer, token: str, catalog_size: int) -> List[Operation]:
+    # every public MovieDealer call, in an order where each one finds the data it needs
+    first_new_id = server.state.next_id
+    movie = dict(server.state.movies[0]) if catalog_size else {'id': 0}
+
+    def movie_id(i: int) -> Id:
+        return Id(i % catalog_size if catalog_size else 0)
+
+    return [
+        ('warm_up', lambda i: dealer.warm_up()),
+        ('sign_up', lambda i: dealer.sign_up(Username(f'user{i}'), Email(f'user{i}@example.com'),
+                                             Password('A_p@ssw0rd'), Password('A_p@ssw0rd'))),
+        ('login', lambda i: dealer.login(Username(f'user{i}'), Password('A_p@ssw0rd'))),
+        ('is_admin_user', lambda i: dealer.is_admin_user(token)),
+        ('get_movies', lambda i: dealer.get_movies()),
+        ('iter_movies', lambda i: sum(1 for _ in dealer.iter_movies())),
+        ('get_movie', lambda i: dealer.get_movie(movie_id(i))),
+        ('get_listed_movie', lambda i: dealer.get_listed_movie(movie_id(i))),
+        ('sort_movies_by_title', lambda i: dealer.sort_movies_by_title()),
+        ('filter_movies_by_director', lambda i: dealer.filter_movies_by_director(
+            Director(f'Director {"".join(chr(ord("a") + int(d)) for d in str(i % 100))}'))),
+        ('add_like', lambda i: dealer.add_like(token, movie_id(i))),
+        ('get_liked_movies', lambda i: dealer.get_liked_movies(token)),
+        ('remove_like', lambda i: dealer.remove_like(token, movie_id(i))),
+        ('add_likes', lambda i: all(dealer.add_likes(token, [movie_id(i + k) for k in range(10)]).values())),
+        ('remove_likes', lambda i: all(dealer.remove_likes(token, [movie_id(i + k) for k in range(10)]).values())),
+        ('add_movie', lambda i: dealer.add_movie(token, Title(f'New title {i}'), Description('A description'),
+                                                 Year(2000), Category(Category.MovieCategory.ACTION),
+                                                 Director('Stanley Kubrick'), ImageUrl(IMAGE_URL))),
+        ('update_movie', lambda i: dealer.update_movie(token, {**movie, 'title': f'Updated {i}'})),
+        ('patch_movie', lambda i: dealer.patch_movie(token, movie, {**movie, 'title': f'Patched {i}'})
+         is UpdateOutcome.UPDATED),
+        ('remove_movie', lambda i: dealer.remove_movie(token, Id(first_new_id + i))),
+        ('logout', lambda i: dealer.logout(dealer.login(Username(f'user{i}'), Password('A_p@ssw0rd')) or 'none')),
+    ]
+
+
+def run(call: Callable[[int], Any], iterations: int, concurrency: int) -> Dict[str, float]:
+    def timed(i: int) -> Tuple[float, bool]:
+        start = time.perf_counter()
+        try:
+            ok = call(i) not in (False, None)
+        except RequestException:
+            ok = False
+        return time.perf_counter() - start, ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(timed, range(iterations)))
+    elapsed = time.perf_counter() - start
+    return summarize([latency for latency, _ in results], elapsed, sum(not ok for _, ok in results))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Every MovieDealer call against the local stub API server')
+    parser.add_argument('--catalog-size', type=int, default=1000)
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='delay added by the server to each request')
+    parser.add_argument('--jitter', type=float, default=0.0, help='relative spread of the delay, 0..1')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of requests answered with 503')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--no-cache', action='store_true', help='send every read to the server')
+    parser.add_argument('--only', help='comma separated operations to run')
+    parser.add_argument('--save', metavar='PATH', help='write the results as JSON, e.g. to use as a baseline')
+    parser.add_argument('--compare', metavar='PATH', help='baseline to compare with; regressions exit with 1')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative regression')
+    args = parser.parse_args()
+
+    cache = ResponseCache(CacheConfig(ttl=0.0, serve_stale=False)) if args.no_cache else ResponseCache()
+    results: Dict[str, Dict[str, float]] = {}
+    with StubServer(args.catalog_size, latency=args.latency_ms / 1000, jitter=args.jitter,
+                    error_rate=args.error_rate, seed=args.seed) as server:
+        with MovieDealer(api_server=server.url, cache=cache) as dealer:
+            dealer.warm_up()
+            token = None
+            while token is None:
+                # the admin login itself may hit an injected error
+                token = dealer.login(Username('admin'), Password('A_p@ssw0rd'))
+            selected = set(args.only.split(',')) if args.only else None
+            print(f"{'operation':<26}{'calls':>7}{'req/s':>11}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+                  f"{'errors':>8}")
+            for name, call in operations(dealer, server, token, args.catalog_size):
+                if selected is not None and name not in selected:
+                    continue
+                summary = results[name] = run(call, args.iterations, args.concurrency)
+                print(f"{name:<26}{summary['requests']:>7}{summary['rps']:>11.1f}{summary['p50_ms']:>10.3f}"
+                      f"{summary['p95_ms']:>10.3f}{summary['p99_ms']:>10.3f}{summary['errors']:>8}")
+
+    document = {'config': {key: value for key, value in vars(args).items()
+                           if key not in ('save', 'compare', 'only')}, 'results': results}
+    if args.save:
+        save(args.save, document)
+    if args.compare:
+        baseline = load(args.compare)
+        if baseline.get('config') != document['config']:
+            print('warning: the baseline was recorded with different settings')
+        regressions = compare(results, baseline['results'], args.tolerance)
+        print('\n'.join(['Regressions:', *regressions]) if regressions else 'No regressions.')
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
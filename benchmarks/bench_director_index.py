@@ -0,0 +1,49 @@
+import argparse
+import random
+import time
+from typing import Callable, List, Tuple
+
+from movie.catalog import DirectorIndex
+
+FIRST_NAMES = ['Stanley', 'Steven', 'Sofia', 'Francis', 'Martin', 'Greta', 'Akira', 'Agnes', 'Billy', 'Orson',
+               'Ingmar', 'Federico', 'Jane', 'Kathryn', 'Sergio', 'Wong', 'Pedro', 'Chloe', 'David', 'Spike']
+
+
+def synthetic_directors(movies: int, directors: int, seed: int = 42) -> List[Tuple[int, str]]:
+    rng = random.Random(seed)
+    names = [f'{rng.choice(FIRST_NAMES)} Surname{i}' for i in range(directors)]
+    return [(movie_id, rng.choice(names)) for movie_id in range(movies)]
+
+
+def timed(name: str, call: Callable[[], object], repeat: int = 1) -> None:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        call()
+    elapsed = time.perf_counter() - start
+    print(f'{name:<32}{elapsed / repeat * 1e6:>14.2f} us/op{repeat / elapsed:>16.0f} ops/s')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='DirectorIndex build, lookup and update costs')
+    parser.add_argument('--movies', type=int, default=1_000_000)
+    parser.add_argument('--directors', type=int, default=50_000)
+    parser.add_argument('--lookups', type=int, default=10_000)
+    args = parser.parse_args()
+
+    entries = synthetic_directors(args.movies, args.directors)
+    start = time.perf_counter()
+    index = DirectorIndex.build(entries)
+    print(f'built index of {len(index)} directors over {args.movies} movies in {time.perf_counter() - start:.2f} s')
+
+    rng = random.Random(7)
+    probes = [director for _, director in rng.sample(entries, min(args.lookups, len(entries)))]
+    it = iter(probes * 4)
+    timed('exact (normalized)', lambda: index.exact(next(it).upper()), len(probes))
+    timed('surname', lambda: index.surname(next(it).rsplit(' ', 1)[-1]), len(probes))
+    timed('prefix', lambda: index.prefix(next(it)[:-1]), len(probes))
+    updates = iter(range(args.movies, args.movies + len(probes)))
+    timed('incremental add', lambda: index.add(next(updates), next(it)), len(probes))
+
+
+if __name__ == '__main__':
+    main()
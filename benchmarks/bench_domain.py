@@ -0,0 +1,134 @@
+import argparse
+import sys
+import timeit
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from benchmarks.report import compare, load, save
+from movie.domain import Category, Description, Director, Email, Id, ImageUrl, Like, Movie, MovieDealer, Password, \
+    Title, Username, Year
+from movie.menu import Entry, Key, Menu, MenuDescription
+
+IMAGE_URL = 'https://image.tmdb.org/t/p/w500/abcdefghiABCDEFGH0123456789.jpg'
+MOVIE = {'id': 1, 'title': 'A title', 'description': 'A description', 'year': 2000, 'category': 'ACTION',
+         'director': 'Stanley Kubrick'}
+
+Case = Tuple[str, Callable[[], Any]]
+
+
+def _movie(movie_id: int = 1) -> Movie:
+    return Movie(Id(movie_id), Title('A title'), Description('A description'), Year(2000),
+                 Category(Category.MovieCategory.ACTION), Director('Stanley Kubrick'))
+
+
+def _menu() -> Menu:
+    return Menu.Builder(MenuDescription('A menu')) \
+        .with_entry(Entry.create('1', 'First')) \
+        .with_entry(Entry.create('0', 'Exit', is_exit=True)) \
+        .build()
+
+
+def _dealer() -> MovieDealer:
+    dealer = MovieDealer()
+    dealer.close()
+    return dealer
+
+
+# class name -> (how to build one instance, how to build an equal but distinct one, how to build a greater one)
+FACTORIES: Dict[str, Tuple[Callable[[], Any], Callable[[], Any], Optional[Callable[[], Any]]]] = {
+    'Title': (lambda: Title('A title'), lambda: Title('A title'), lambda: Title('B title')),
+    'Description': (lambda: Description('A description'), lambda: Description('A description'),
+                    lambda: Description('B description')),
+    'Year': (lambda: Year(2000), lambda: Year(2000), lambda: Year(2001)),
+    'Id': (lambda: Id(1), lambda: Id(1), None),
+    'Category': (lambda: Category(Category.MovieCategory.ACTION), lambda: Category(Category.MovieCategory.ACTION),
+                 lambda: Category(Category.MovieCategory.WESTERN)),
+    'Director': (lambda: Director('Stanley Kubrick'), lambda: Director('Stanley Kubrick'),
+                 lambda: Director('Steven Spielberg')),
+    'ImageUrl': (lambda: ImageUrl(IMAGE_URL), lambda: ImageUrl(IMAGE_URL), None),
+    'Movie': (_movie, _movie, lambda: _movie(2)),
+    'Like': (lambda: Like(Id(1), _movie()), lambda: Like(Id(1), _movie()), lambda: Like(Id(2), _movie())),
+    'Email': (lambda: Email('user@example.com'), lambda: Email('user@example.com'),
+              lambda: Email('user@example.org')),
+    'Password': (lambda: Password('A_p@ssw0rd'), lambda: Password('A_p@ssw0rd'), None),
+    'Username': (lambda: Username('user'), lambda: Username('user'), lambda: Username('user2')),
+    'MovieDealer': (_dealer, _dealer, None),
+    'MenuDescription': (lambda: MenuDescription('A menu'), lambda: MenuDescription('A menu'),
+                        lambda: MenuDescription('B menu')),
+    'Key': (lambda: Key('1'), lambda: Key('1'), lambda: Key('2')),
+    'Entry': (lambda: Entry.create('1', 'First'), lambda: Entry.create('1', 'First'), None),
+    'Menu': (_menu, _menu, None),
+}
+
+# the factory methods the application uses besides the constructors
+EXTRA: List[Case] = [
+    ('Movie.create', lambda: Movie.create(MOVIE)),
+    ('Category.of', lambda: Category.of(Category.MovieCategory.ACTION)),
+    ('Director.of', lambda: Director.of('Stanley Kubrick')),
+]
+
+
+def cases() -> List[Case]:
+    # construction, equality, hashing and ordering for each class; an operation the class does not support is left out
+    res: List[Case] = []
+    for name, (build, build_equal, build_greater) in FACTORIES.items():
+        one, other = build(), build_equal()
+        candidates = [('construct', build), ('eq', lambda one=one, other=other: one == other),
+                      ('hash', lambda one=one: hash(one))]
+        if build_greater is not None:
+            greater = build_greater()
+            candidates.append(('lt', lambda one=one, greater=greater: one < greater))
+        for operation, call in candidates:
+            try:
+                call()
+            except TypeError:
+                continue
+            res.append((f'{name}.{operation}', call))
+    return res + EXTRA
+
+
+def measure(call: Callable[[], Any], repeat: int, min_time: float) -> Dict[str, float]:
+    timer = timeit.Timer(call)
+    number = 1
+    while timer.timeit(number) < min_time:
+        number *= 10
+    # the fastest run is the one least disturbed by the rest of the machine
+    best = min(timer.repeat(repeat, number)) / number
+    return {'ns_per_op': best * 1e9, 'ops': 1 / best if best > 0 else 0.0, 'number': number}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Construction, equality, hashing and ordering of the domain and '
+                                                 'menu classes')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.05, help='seconds each timed run lasts at least')
+    parser.add_argument('--only', help='comma separated prefixes, e.g. Movie,Like.construct')
+    parser.add_argument('--save', metavar='PATH', help='write the results as JSON, e.g. to use as a baseline')
+    parser.add_argument('--compare', metavar='PATH', help='baseline to compare with; slowdowns exit with 1')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed relative slowdown')
+    args = parser.parse_args()
+
+    prefixes = tuple(args.only.split(',')) if args.only else ('',)
+    results: Dict[str, Dict[str, float]] = {}
+    print(f"{'case':<28}{'ns/op':>12}{'ops/s':>14}")
+    for name, call in cases():
+        if not name.startswith(prefixes):
+            continue
+        summary = results[name] = measure(call, args.repeat, args.min_time)
+        print(f"{name:<28}{summary['ns_per_op']:>12,.0f}{summary['ops']:>14,.0f}")
+
+    document = {'python': sys.version.split()[0], 'results': results}
+    if args.save:
+        save(args.save, document)
+    if args.compare:
+        baseline = load(args.compare)
+        if baseline.get('python') != document['python']:
+            print(f"warning: the baseline was recorded with Python {baseline.get('python')}")
+        slowdowns = compare(results, baseline['results'], args.threshold, lower_is_better=('ns_per_op',),
+                            higher_is_better=(), min_ms=0.0)
+        print('\n'.join(['Slowdowns:', *slowdowns]) if slowdowns else 'No slowdowns.')
+        if slowdowns:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+import argparse
+import gc
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List
+
+from benchmarks.stub_server import synthetic_movies
+from movie.domain import Movie
+
+
+# the layout the domain classes had before slots and interning, without validation
+@dataclass(frozen=True)
+class _Value:
+    value: Any
+
+
+@dataclass(frozen=True)
+class _Movie:
+    id: _Value
+    title: _Value
+    description: _Value
+    year: _Value
+    category: _Value
+    director: _Value
+
+
+def legacy(movie: Dict[str, Any]) -> _Movie:
+    return _Movie(_Value(movie['id']), _Value(movie['title']), _Value(movie['description']), _Value(movie['year']),
+                  _Value(movie['category']), _Value(movie['director']))
+
+
+def measure(build: Callable[[Dict[str, Any]], Any], rows: List[Dict[str, Any]]) -> tuple:
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    movies = [build(row) for row in rows]
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del movies
+    return size, elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Compare the memory taken by Movie objects')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+    rows = synthetic_movies(args.rows)
+
+    before, before_elapsed = measure(legacy, rows)
+    after, after_elapsed = measure(Movie.create, rows)
+    print(f'{args.rows} movies')
+    print(f'dict based dataclasses  {before / args.rows:8.1f} B/movie  {before / 2 ** 20:8.1f} MiB  '
+          f'{before_elapsed:6.2f} s')
+    print(f'slotted and interned    {after / args.rows:8.1f} B/movie  {after / 2 ** 20:8.1f} MiB  '
+          f'{after_elapsed:6.2f} s')
+    print(f'saved                   {(before - after) / before:8.1%}')
+
+
+if __name__ == '__main__':
+    main()
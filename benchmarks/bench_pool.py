@@ -0,0 +1,42 @@
+import argparse
+import time
+from typing import Callable, List
+
+import requests
+
+from benchmarks.report import format_row, summarize
+from benchmarks.stub_server import StubServer
+from movie.domain import MovieDealer
+
+
+def measure(call: Callable[[], object], count: int) -> List[float]:
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='MovieDealer with and without the pooled session')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--catalog-size', type=int, default=50)
+    args = parser.parse_args()
+
+    with StubServer(catalog_size=args.catalog_size) as server:
+        url = f'{server.url}/movies/'
+        for name, call in [('no pool (requests.get)', lambda: requests.get(url).json())]:
+            start = time.perf_counter()
+            latencies = measure(call, args.requests)
+            print(format_row(name, summarize(latencies, time.perf_counter() - start)))
+
+        with MovieDealer(api_server=server.url) as dealer:
+            dealer.warm_up()
+            start = time.perf_counter()
+            latencies = measure(dealer.get_movies, args.requests)
+            print(format_row('pooled MovieDealer', summarize(latencies, time.perf_counter() - start)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+import argparse
+import os
+import time
+from contextlib import redirect_stdout
+
+from benchmarks.stub_server import synthetic_movies
+from movie.render import TableRenderer
+
+
+def print_per_row(movies) -> None:
+    fmt = '{:4}\t{:40}\t{:25}\t{:15}\t{:4}'
+    for movie in movies:
+        print(fmt.format(movie['id'], movie['title'], movie['director'], movie['category'], movie['year']))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Render a movie table into memory')
+    parser.add_argument('--rows', type=int, default=100_000)
+    args = parser.parse_args()
+    movies = synthetic_movies(args.rows)
+
+    # a line buffered sink behaves like an interactive terminal: one write per printed line
+    with open(os.devnull, 'w', buffering=1) as sink, redirect_stdout(sink):
+        start = time.perf_counter()
+        print_per_row(movies)
+        legacy = time.perf_counter() - start
+
+        renderer = TableRenderer()
+        start = time.perf_counter()
+        renderer.write_rows(movies)
+        cold = time.perf_counter() - start
+        start = time.perf_counter()
+        renderer.write_rows(movies)
+        warm = time.perf_counter() - start
+
+    print(f'{args.rows} rows')
+    print(f'print per row        {legacy:8.3f} s')
+    print(f'TableRenderer cold   {cold:8.3f} s')
+    print(f'TableRenderer cached {warm:8.3f} s')
+
+
+if __name__ == '__main__':
+    main()
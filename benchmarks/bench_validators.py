@@ -0,0 +1,53 @@
+import argparse
+import time
+from datetime import datetime
+
+from valid8 import validate
+
+from movie.domain import TEXT_REGEX, Title, Year
+from validation.dataclasses import validate_dataclass
+from validation.regex import pattern
+
+
+def legacy_title(instance) -> None:
+    validate_dataclass(instance)
+    validate('value', instance.value, min_len=1, max_len=50, custom=pattern(TEXT_REGEX),
+             help_msg="Title must be between 1 and 50 characters long.")
+
+
+def legacy_year(instance) -> None:
+    validate_dataclass(instance)
+    validate('value', instance.value, min_value=1900, max_value=datetime.now().year,
+             help_msg="Year must be between 1900 and current year.")
+
+
+def timed(run, count: int) -> float:
+    start = time.perf_counter()
+    run()
+    return count / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Construct value objects with compiled and valid8 validation')
+    parser.add_argument('--count', type=int, default=50_000)
+    args = parser.parse_args()
+    titles = [f'Movie {i}' for i in range(args.count)]
+    years = [1900 + i % 120 for i in range(args.count)]
+    title, year = Title('Movie'), Year(2000)
+
+    for name, instance, legacy, values, cls in (('Title', title, legacy_title, titles, Title),
+                                                 ('Year', year, legacy_year, years, Year)):
+        def run_legacy():
+            for _ in values:
+                legacy(instance)
+
+        def run_compiled():
+            for value in values:
+                cls(value)
+
+        print(f'{name:6} valid8 checks    {timed(run_legacy, args.count):12,.0f} /s')
+        print(f'{name:6} compiled objects {timed(run_compiled, args.count):12,.0f} /s')
+
+
+if __name__ == '__main__':
+    main()
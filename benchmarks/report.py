@@ -0,0 +1,54 @@
+import json
+from typing import Any, Dict, List, Tuple
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies: List[float], elapsed: float, errors: int = 0) -> Dict[str, float]:
+    return {
+        'requests': len(latencies),
+        'rps': len(latencies) / elapsed if elapsed > 0 else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'errors': errors,
+        'error_rate': errors / len(latencies) if latencies else 0.0,
+    }
+
+
+def format_row(name: str, summary: Dict[str, float]) -> str:
+    return (f"{name:<24}{summary['requests']:>8}{summary['rps']:>12.1f} req/s"
+            f"{summary['p50_ms']:>10.3f} ms p50{summary['p99_ms']:>10.3f} ms p99")
+
+
+def save(path: str, results: Dict[str, Any]) -> None:
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(results, file, indent=2, sort_keys=True)
+
+
+def load(path: str) -> Dict[str, Any]:
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def compare(current: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], tolerance: float,
+            lower_is_better: Tuple[str, ...] = ('p95_ms',), higher_is_better: Tuple[str, ...] = ('rps',),
+            min_ms: float = 0.05) -> List[str]:
+    # one line per metric that got worse by more than `tolerance`; tiny latencies are left out as noise
+    regressions = []
+    for name in sorted(current.keys() & baseline.keys()):
+        now, before = current[name], baseline[name]
+        for metric in higher_is_better:
+            if metric in now and metric in before and now[metric] < before[metric] * (1 - tolerance):
+                regressions.append(f'{name}: {metric} {before[metric]:.1f} -> {now[metric]:.1f}')
+        for metric in lower_is_better:
+            if metric in now and metric in before and max(now[metric], before[metric]) >= min_ms and \
+                    now[metric] > before[metric] * (1 + tolerance):
+                regressions.append(f'{name}: {metric} {before[metric]:.3f} -> {now[metric]:.3f}')
+    return regressions
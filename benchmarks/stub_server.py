@@ -0,0 +1,252 @@
+import json
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+
+def synthetic_movies(size: int) -> List[Dict[str, Any]]:
+    categories = ['ACTION', 'COMEDY', 'DRAMA', 'HORROR', 'WESTERN']
+    # director names may only contain letters, so the number is spelled with a..j
+    directors = [f'Director {"".join(chr(ord("a") + int(d)) for d in str(i))}' for i in range(100)]
+    return [{'id': i, 'title': f'Title {i}', 'description': f'Description {i}', 'year': 1950 + i % 70,
+             'category': categories[i % len(categories)], 'director': directors[i % 100],
+             'image_url': 'https://image.tmdb.org/t/p/w500/abcdefghiABCDEFGH0123456789.jpg'} for i in range(size)]
+
+
+class StubState:
+    # the whole API in memory: movies, users and likes, behind one lock
+    def __init__(self, catalog_size: int):
+        self.lock = threading.Lock()
+        self.movies: Dict[int, Dict[str, Any]] = {movie['id']: movie for movie in synthetic_movies(catalog_size)}
+        self.next_id = catalog_size
+        self.version = 0
+        self.tokens: Dict[str, str] = {}
+        self.likes: Dict[str, Set[int]] = {}
+        self.__body: Optional[Tuple[int, bytes]] = None
+
+    def changed(self) -> None:
+        self.version += 1
+
+    def catalog_body(self) -> Tuple[str, bytes]:
+        # the full listing is encoded once per version, as a server with a response cache would
+        if self.__body is None or self.__body[0] != self.version:
+            self.__body = (self.version, json.dumps(list(self.movies.values())).encode())
+        return f'"v{self.version}"', self.__body[1]
+
+
+_MOVIE = re.compile(r'^/api/v1/movies/(\d+)/$')
+_LIKE = re.compile(r'^/api/v1/likes/by_movie/(\d+)/$')
+_DIRECTOR = re.compile(r'^/api/v1/movies/filter-by-director/(.+)/$')
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def __reply(self, status: int, body: bytes = b'', headers: Optional[Dict[str, str]] = None) -> None:
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def __json(self, status: int, value: Any) -> None:
+        self.__reply(status, json.dumps(value).encode())
+
+    def __body(self) -> Dict[str, Any]:
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length).decode() if length else ''
+        if self.headers.get('Content-Type', '').startswith('application/json'):
+            return json.loads(raw or '{}')
+        return {key: values[-1] for key, values in parse_qs(raw).items()}
+
+    def __user(self) -> Optional[str]:
+        authorization = self.headers.get('Authorization', '')
+        with self.server.state.lock:
+            return self.server.state.tokens.get(authorization[len('Token '):]) \
+                if authorization.startswith('Token ') else None
+
+    def __handle(self) -> None:
+        # the body is always read, so that an injected error keeps the connection usable
+        body = self.__body() if self.command in ('POST', 'PUT', 'PATCH') else {}
+        if self.server.latency > 0:
+            time.sleep(self.server.latency * (1 + self.server.jitter * (2 * random.random() - 1)))
+        if random.random() < self.server.error_rate:
+            self.__json(503, {'detail': 'injected error'})
+            return
+        url = urlsplit(self.path)
+        route = getattr(self, f'_{self.command.lower()}', None)
+        status = route(url.path, parse_qs(url.query), body) if route is not None else None
+        if status is None:
+            self.__json(404, {'detail': 'Not found.'})
+
+    def do_HEAD(self) -> None:
+        self.__reply(200)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = __handle
+
+    def _get(self, path: str, query: Dict[str, List[str]], body: Dict[str, Any]) -> Optional[bool]:
+        state = self.server.state
+        if path == '/api/v1/movies/':
+            with state.lock:
+                if 'limit' in query:
+                    limit, offset = int(query['limit'][0]), int(query.get('offset', ['0'])[0])
+                    movies = list(state.movies.values())
+                    self.__json(200, {'count': len(movies), 'results': movies[offset:offset + limit],
+                                      'next': offset + limit < len(movies) or None})
+                    return True
+                etag, payload = state.catalog_body()
+            if self.headers.get('If-None-Match') == etag:
+                self.__reply(304, headers={'ETag': etag})
+            else:
+                self.__reply(200, payload, {'ETag': etag})
+            return True
+        if path == '/api/v1/movies/sort-by-title/':
+            with state.lock:
+                self.__json(200, sorted(state.movies.values(), key=lambda m: (m['title'], m['id'])))
+            return True
+        if path == '/api/v1/movies/user-type/':
+            user = self.__user()
+            if user is None:
+                self.__json(401, {'detail': 'Invalid token.'})
+            else:
+                self.__json(200, {'user-type': 'admin' if user.startswith('admin') else 'user'})
+            return True
+        if path == '/api/v1/movies/user_liked_movies/':
+            user = self.__user()
+            with state.lock:
+                liked = [state.movies[i] for i in sorted(state.likes.get(user, ())) if i in state.movies]
+            self.__json(200 if user is not None else 401, liked)
+            return True
+        match = _DIRECTOR.match(path)
+        if match is not None:
+            director = unquote(match.group(1))
+            with state.lock:
+                self.__json(200, [m for m in state.movies.values() if m['director'] == director])
+            return True
+        match = _MOVIE.match(path)
+        if match is not None:
+            with state.lock:
+                movie = state.movies.get(int(match.group(1)))
+            self.__json(200 if movie is not None else 404, movie if movie is not None else {})
+            return True
+        return None
+
+    def _post(self, path: str, query: Dict[str, List[str]], body: Dict[str, Any]) -> Optional[bool]:
+        state = self.server.state
+        if path == '/api/v1/auth/registration':
+            self.__reply(204)
+        elif path == '/api/v1/auth/login/':
+            token = f'{body.get("username", "")}-{random.getrandbits(64):016x}'
+            with state.lock:
+                state.tokens[token] = body.get('username', '')
+            self.__json(200, {'key': token})
+        elif path == '/api/v1/auth/logout/':
+            with state.lock:
+                state.tokens.pop(self.headers.get('Authorization', '')[len('Token '):], None)
+            self.__json(200, {})
+        elif path == '/api/v1/likes/':
+            user = self.__user()
+            if user is None:
+                self.__json(401, {})
+                return True
+            with state.lock:
+                state.likes.setdefault(user, set()).add(int(body['movie']))
+            self.__json(201, {'movie': int(body['movie'])})
+        elif path == '/api/v1/movies/':
+            with state.lock:
+                movie = {**body, 'id': state.next_id}
+                state.movies[movie['id']] = movie
+                state.next_id += 1
+                state.changed()
+            self.__json(201, movie)
+        else:
+            return None
+        return True
+
+    def __change_movie(self, path: str, update: Optional[Dict[str, Any]], replace: bool) -> Optional[bool]:
+        match = _MOVIE.match(path)
+        if match is None:
+            return None
+        state, movie_id = self.server.state, int(match.group(1))
+        with state.lock:
+            if movie_id not in state.movies:
+                self.__json(404, {})
+                return True
+            if update is None:
+                del state.movies[movie_id]
+            else:
+                state.movies[movie_id] = {**({} if replace else state.movies[movie_id]), **update, 'id': movie_id}
+            state.changed()
+        if update is None:
+            self.__reply(204)
+        else:
+            self.__json(200, state.movies.get(movie_id, {}))
+        return True
+
+    def _put(self, path: str, query: Dict[str, List[str]], body: Dict[str, Any]) -> Optional[bool]:
+        return self.__change_movie(path, body, replace=True)
+
+    def _patch(self, path: str, query: Dict[str, List[str]], body: Dict[str, Any]) -> Optional[bool]:
+        return self.__change_movie(path, body, replace=False)
+
+    def _delete(self, path: str, query: Dict[str, List[str]], body: Dict[str, Any]) -> Optional[bool]:
+        match = _LIKE.match(path)
+        if match is not None:
+            user = self.__user()
+            with self.server.state.lock:
+                self.server.state.likes.get(user, set()).discard(int(match.group(1)))
+            self.__reply(204 if user is not None else 401)
+            return True
+        return self.__change_movie(path, None, replace=False)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address) -> None:
+        # clients that give up on a slow or failed response close the socket early, which is expected here
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class StubServer:
+    # an in-process stand-in for the /api/v1 endpoints; latency and error rate apply to every request but HEAD
+    def __init__(self, catalog_size: int = 10, port: int = 0, latency: float = 0.0, jitter: float = 0.0,
+                 error_rate: float = 0.0, seed: Optional[int] = None):
+        if seed is not None:
+            random.seed(seed)
+        self.__server = _Server(('127.0.0.1', port), StubHandler)
+        self.__server.state = StubState(catalog_size)
+        self.__server.latency = latency
+        self.__server.jitter = jitter
+        self.__server.error_rate = error_rate
+        self.__thread = threading.Thread(target=self.__server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.__server.server_address[:2]
+        return f'http://{host}:{port}/api/v1'
+
+    @property
+    def state(self) -> StubState:
+        return self.__server.state
+
+    def __enter__(self) -> 'StubServer':
+        self.__thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.__server.shutdown()
+        self.__server.server_close()
@@ -0,0 +1,118 @@
+import asyncio
+import functools
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List
+
+from typeguard import typechecked
+from valid8 import validate
+
+from movie.domain import MovieDealer, Username, Email, Password, Id, Title, Description, Year, Category, Director, \
+    ImageUrl, UpdateOutcome
+from movie.session import HttpPool, PoolConfig
+
+
+@dataclass(frozen=True)
+@typechecked
+class AsyncMovieDealer:
+    dealer: MovieDealer = field(default_factory=MovieDealer)
+    max_concurrency: int = 16
+    __state: dict = field(default_factory=dict, repr=False, compare=False, init=False)
+    __lock: Any = field(default_factory=threading.Lock, repr=False, compare=False, init=False)
+
+    def __post_init__(self):
+        validate('max_concurrency', self.max_concurrency, min_value=1,
+                 help_msg="At least one request must be allowed to run at once.")
+
+    @staticmethod
+    def create(max_concurrency: int = 16, api_server: str = 'http://localhost:8000/api/v1') -> 'AsyncMovieDealer':
+        pool = HttpPool(PoolConfig(pool_maxsize=max_concurrency))
+        return AsyncMovieDealer(MovieDealer(pool, api_server), max_concurrency)
+
+    def __executor(self) -> ThreadPoolExecutor:
+        with self.__lock:
+            if 'executor' not in self.__state:
+                self.__state['executor'] = ThreadPoolExecutor(max_workers=self.max_concurrency,
+                                                              thread_name_prefix='movie-dealer')
+            return self.__state['executor']
+
+    def __semaphore(self) -> asyncio.Semaphore:
+        # asyncio primitives belong to one loop, so every loop gets its own limiter
+        loop = asyncio.get_running_loop()
+        with self.__lock:
+            semaphores = self.__state.setdefault('semaphores', weakref.WeakKeyDictionary())
+            if loop not in semaphores:
+                semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+            return semaphores[loop]
+
+    async def __run(self, call: Callable, *args) -> Any:
+        async with self.__semaphore():
+            return await asyncio.get_running_loop().run_in_executor(self.__executor(),
+                                                                    functools.partial(call, *args))
+
+    async def sign_up(self, username: Username, email: Email, password: Password, confirm_password: Password):
+        return await self.__run(self.dealer.sign_up, username, email, password, confirm_password)
+
+    async def login(self, username: Username, password: Password) -> str | None:
+        return await self.__run(self.dealer.login, username, password)
+
+    async def logout(self, key: str) -> bool:
+        return await self.__run(self.dealer.logout, key)
+
+    async def is_admin_user(self, key: str) -> bool:
+        return await self.__run(self.dealer.is_admin_user, key)
+
+    async def add_like(self, key: str, movie_id: Id) -> bool:
+        return await self.__run(self.dealer.add_like, key, movie_id)
+
+    async def remove_like(self, key: str, movie_id: Id) -> bool:
+        return await self.__run(self.dealer.remove_like, key, movie_id)
+
+    async def add_likes(self, key: str, movie_ids: List[Id]) -> Dict[int, bool]:
+        return await self.__run(self.dealer.add_likes, key, movie_ids, self.max_concurrency)
+
+    async def remove_likes(self, key: str, movie_ids: List[Id]) -> Dict[int, bool]:
+        return await self.__run(self.dealer.remove_likes, key, movie_ids, self.max_concurrency)
+
+    async def add_movie(self, key: str, title: Title, description: Description, year: Year, category: Category,
+                        director: Director, image_url: ImageUrl) -> bool:
+        return await self.__run(self.dealer.add_movie, key, title, description, year, category, director, image_url)
+
+    async def update_movie(self, key: str, movie: Any) -> bool:
+        return await self.__run(self.dealer.update_movie, key, movie)
+
+    async def patch_movie(self, key: str, original: Dict[str, Any], movie: Dict[str, Any]) -> UpdateOutcome:
+        return await self.__run(self.dealer.patch_movie, key, original, movie)
+
+    async def remove_movie(self, key: str, movie_id: Id) -> bool:
+        return await self.__run(self.dealer.remove_movie, key, movie_id)
+
+    async def get_movies(self):
+        return await self.__run(self.dealer.get_movies)
+
+    async def get_movie(self, movie_id: Id):
+        return await self.__run(self.dealer.get_movie, movie_id)
+
+    async def sort_movies_by_title(self):
+        return await self.__run(self.dealer.sort_movies_by_title)
+
+    async def get_liked_movies(self, key: str):
+        return await self.__run(self.dealer.get_liked_movies, key)
+
+    async def filter_movies_by_director(self, director: Director):
+        return await self.__run(self.dealer.filter_movies_by_director, director)
+
+    async def aclose(self) -> None:
+        with self.__lock:
+            executor = self.__state.pop('executor', None)
+        if executor is not None:
+            await asyncio.get_running_loop().run_in_executor(None, executor.shutdown)
+        self.dealer.close()
+
+    async def __aenter__(self) -> 'AsyncMovieDealer':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
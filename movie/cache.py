@@ -0,0 +1,228 @@
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+from typeguard import typechecked
+from valid8 import validate
+
+from validation.dataclasses import validate_dataclass
+
+
+@dataclass(frozen=True)
+@typechecked
+class CacheConfig:
+    ttl: float = 30.0
+    max_stale: float = 300.0
+    serve_stale: bool = True
+
+    def __post_init__(self):
+        validate_dataclass(self)
+        validate('ttl', self.ttl, min_value=0.0, help_msg="The cache TTL cannot be negative.")
+        validate('max_stale', self.max_stale, min_value=0.0, help_msg="The stale window cannot be negative.")
+
+
+@dataclass(frozen=True)
+@typechecked
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    revalidated: int = 0
+    stale: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+@dataclass
+class CacheEntry:
+    value: Any
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    stored_at: float = field(default_factory=time.monotonic)
+
+    def age(self) -> float:
+        return time.monotonic() - self.stored_at
+
+    def conditional_headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag is not None:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified is not None:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    def __init__(self, config: Optional[CacheConfig] = None):
+        self.config = config or CacheConfig()
+        self.__lock = threading.Lock()
+        self.__entries: Dict[str, CacheEntry] = {}
+        self.__refreshing: Dict[str, threading.Thread] = {}
+        self.__generation = 0
+        self.__counters = {'hits': 0, 'misses': 0, 'revalidated': 0, 'stale': 0}
+
+    @property
+    def stats(self) -> CacheStats:
+        with self.__lock:
+            return CacheStats(**self.__counters)
+
+    def __count(self, counter: str) -> None:
+        with self.__lock:
+            self.__counters[counter] += 1
+
+    @property
+    def generation(self) -> int:
+        with self.__lock:
+            return self.__generation
+
+    def peek(self, key: str) -> Optional[CacheEntry]:
+        with self.__lock:
+            return self.__entries.get(key)
+
+    def fresh(self, key: str) -> Any:
+        entry = self.peek(key)
+        if entry is None or entry.age() >= self.config.ttl:
+            return None
+        self.__count('hits')
+        return entry.value
+
+    def store(self, key: str, value: Any, etag: Optional[str] = None, last_modified: Optional[str] = None,
+              generation: Optional[int] = None) -> None:
+        with self.__lock:
+            # a response fetched before an invalidation must not bring the old data back
+            if generation is None or generation == self.__generation:
+                self.__entries[key] = CacheEntry(value, etag, last_modified)
+
+    def replace(self, key: str, old: Any, new: Any) -> bool:
+        # swaps the value of an entry for an equivalent one, keeping its validators and age
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None or entry.value is not old:
+                return False
+            entry.value = new
+            return True
+
+    def get(self, key: str, fetch: Callable[[Dict[str, str]], Any]) -> Any:
+        # `fetch` receives the conditional headers and returns a requests.Response
+        value = self.fresh(key)
+        if value is not None:
+            return value
+        entry = self.peek(key)
+        if entry is not None:
+            if self.config.serve_stale and entry.age() < self.config.ttl + self.config.max_stale:
+                self.__count('stale')
+                self.__refresh_in_background(key, entry, fetch)
+                return entry.value
+        return self.__revalidate(key, entry, fetch)
+
+    def __revalidate(self, key: str, entry: Optional[CacheEntry], fetch: Callable[[Dict[str, str]], Any]) -> Any:
+        generation = self.generation
+        res = fetch(entry.conditional_headers() if entry is not None else {})
+        if res.status_code == 304 and entry is not None:
+            self.__count('hits')
+            self.__count('revalidated')
+            entry.stored_at = time.monotonic()
+            return entry.value
+        self.__count('misses')
+        if res.status_code != 200:
+            return None
+        value = res.json()
+        self.store(key, value, res.headers.get('ETag'), res.headers.get('Last-Modified'), generation)
+        return value
+
+    def __refresh_in_background(self, key: str, entry: CacheEntry, fetch: Callable[[Dict[str, str]], Any]) -> None:
+        def refresh():
+            try:
+                self.__revalidate(key, entry, fetch)
+            except Exception:
+                # a failed refresh keeps serving the stale entry until it expires
+                pass
+            finally:
+                with self.__lock:
+                    self.__refreshing.pop(key, None)
+
+        with self.__lock:
+            if key in self.__refreshing:
+                return
+            thread = threading.Thread(target=refresh, name=f'cache-refresh {key}', daemon=True)
+            self.__refreshing[key] = thread
+        thread.start()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        with self.__lock:
+            threads = list(self.__refreshing.values())
+        for thread in threads:
+            thread.join(timeout)
+
+    def invalidate(self, prefix: str = '') -> None:
+        with self.__lock:
+            self.__generation += 1
+            for key in [k for k in self.__entries if k.startswith(prefix)]:
+                del self.__entries[key]
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return len(self.__entries)
+
+
+class RoleCache:
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__roles: Dict[str, str] = {}
+        self.__pending: Dict[str, threading.Event] = {}
+
+    def get(self, token: str, wait: float = 0.0) -> Optional[str]:
+        with self.__lock:
+            role, pending = self.__roles.get(token), self.__pending.get(token)
+        if role is None and pending is not None and wait > 0:
+            pending.wait(wait)
+            with self.__lock:
+                role = self.__roles.get(token)
+        return role
+
+    def put(self, token: str, role: str) -> None:
+        with self.__lock:
+            self.__roles[token] = role
+
+    def drop(self, token: str) -> None:
+        with self.__lock:
+            self.__roles.pop(token, None)
+            pending = self.__pending.pop(token, None)
+        if pending is not None:
+            pending.set()
+
+    def prefetch(self, token: str, fetch: Callable[[], Optional[str]]) -> None:
+        event = threading.Event()
+
+        def run():
+            try:
+                role = fetch()
+            except Exception:
+                # the role is fetched again on first use
+                role = None
+            with self.__lock:
+                # a token dropped while the request was in flight must stay dropped
+                if self.__pending.get(token) is event:
+                    del self.__pending[token]
+                    if role is not None:
+                        self.__roles[token] = role
+            event.set()
+
+        with self.__lock:
+            if token in self.__roles or token in self.__pending:
+                return
+            self.__pending[token] = event
+        threading.Thread(target=run, name='role-prefetch', daemon=True).start()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        with self.__lock:
+            events = list(self.__pending.values())
+        for event in events:
+            event.wait(timeout)
+
+    def __contains__(self, token: str) -> bool:
+        with self.__lock:
+            return token in self.__roles
@@ -0,0 +1,183 @@
+import array
+import bisect
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from movie.columns import ColumnStore, MovieTable
+
+
+def normalize_name(value: str) -> str:
+    return ' '.join(value.split()).casefold()
+
+
+class DirectorIndex:
+    def __init__(self):
+        # an insertion ordered dict works as an ordered set with O(1) removal
+        self.__ids: Dict[str, Dict[int, None]] = {}
+        self.__names: List[str] = []
+        self.__surnames: Dict[str, Dict[str, None]] = {}
+
+    @staticmethod
+    def build(entries: Iterable[Tuple[int, str]]) -> 'DirectorIndex':
+        index = DirectorIndex()
+        for movie_id, director in entries:
+            index.__ids.setdefault(normalize_name(director), {})[movie_id] = None
+        index.__names = sorted(index.__ids)
+        for name in index.__names:
+            index.__surnames.setdefault(name.rsplit(' ', 1)[-1], {})[name] = None
+        return index
+
+    def add(self, movie_id: int, director: str) -> None:
+        name = normalize_name(director)
+        ids = self.__ids.get(name)
+        if ids is None:
+            ids = self.__ids[name] = {}
+            bisect.insort(self.__names, name)
+            self.__surnames.setdefault(name.rsplit(' ', 1)[-1], {})[name] = None
+        ids[movie_id] = None
+
+    def remove(self, movie_id: int, director: str) -> None:
+        name = normalize_name(director)
+        ids = self.__ids.get(name)
+        if ids is None:
+            return
+        ids.pop(movie_id, None)
+        if not ids:
+            del self.__ids[name]
+            del self.__names[bisect.bisect_left(self.__names, name)]
+            surname = name.rsplit(' ', 1)[-1]
+            del self.__surnames[surname][name]
+            if not self.__surnames[surname]:
+                del self.__surnames[surname]
+
+    def exact(self, director: str) -> List[int]:
+        return list(self.__ids.get(normalize_name(director), ()))
+
+    def prefix(self, prefix: str) -> List[int]:
+        prefix = normalize_name(prefix)
+        res = []
+        for i in range(bisect.bisect_left(self.__names, prefix), len(self.__names)):
+            name = self.__names[i]
+            if not name.startswith(prefix):
+                break
+            res.extend(self.__ids[name])
+        return res
+
+    def surname(self, surname: str) -> List[int]:
+        res = []
+        for name in self.__surnames.get(normalize_name(surname), ()):
+            res.extend(self.__ids[name])
+        return res
+
+    def lookup(self, director: str) -> List[int]:
+        return self.exact(director) or self.surname(director) or self.prefix(director)
+
+    def __len__(self) -> int:
+        return len(self.__names)
+
+
+class LocalCatalog:
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__source: Optional[Sequence[Dict[str, Any]]] = None
+        self.__loaded_at: Optional[float] = None
+        self.__store = ColumnStore()
+        # a store handed out through a view is copied before the next change
+        self.__shared = False
+        self.__orders: Dict[str, array.array] = {}
+        self.__directors = DirectorIndex()
+
+    def load(self, movies: Sequence[Dict[str, Any]], loaded_at: Optional[float] = None) -> None:
+        loaded_at = time.monotonic() if loaded_at is None else loaded_at
+        with self.__lock:
+            if isinstance(movies, MovieTable) and movies.positions is None:
+                if movies.store is not self.__store:
+                    self.__use(movies.store, shared=True)
+            elif movies is not self.__source:
+                store = ColumnStore()
+                for movie in movies:
+                    store.put(movie)
+                self.__use(store, shared=False)
+            self.__source = movies
+            self.__loaded_at = loaded_at
+
+    def __use(self, store: ColumnStore, shared: bool) -> None:
+        self.__store, self.__shared, self.__orders = store, shared, {}
+        self.__directors = DirectorIndex.build((movie_id, director) for movie_id, director in store.values('director')
+                                               if isinstance(director, str))
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__source, self.__loaded_at = None, None
+            self.__use(ColumnStore(), shared=False)
+
+    def upsert(self, movie: Dict[str, Any]) -> None:
+        with self.__lock:
+            if not self.is_loaded:
+                return
+            store = self.__writable()
+            self.__discard_director(store, movie['id'])
+            store.put(movie)
+            if isinstance(movie.get('director'), str):
+                self.__directors.add(movie['id'], movie['director'])
+
+    def remove(self, movie_id: int) -> None:
+        with self.__lock:
+            store = self.__writable()
+            self.__discard_director(store, movie_id)
+            store.remove(movie_id)
+
+    def __writable(self) -> ColumnStore:
+        if self.__shared:
+            self.__store, self.__shared = self.__store.copy(), False
+        self.__source, self.__orders = None, {}
+        return self.__store
+
+    def __discard_director(self, store: ColumnStore, movie_id: int) -> None:
+        movie = store.get(movie_id)
+        if movie is not None and isinstance(movie.get('director'), str):
+            self.__directors.remove(movie_id, movie['director'])
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.__loaded_at is not None
+
+    def is_fresh(self, max_age: float) -> bool:
+        loaded_at = self.__loaded_at
+        return loaded_at is not None and time.monotonic() - loaded_at < max_age
+
+    def __view(self, positions: Optional[array.array] = None) -> MovieTable:
+        self.__shared = True
+        return MovieTable(self.__store, positions)
+
+    def table(self) -> MovieTable:
+        with self.__lock:
+            return self.__view()
+
+    def get(self, movie_id: int) -> Optional[Dict[str, Any]]:
+        with self.__lock:
+            return self.__store.get(movie_id)
+
+    def sorted_by(self, key: str) -> MovieTable:
+        with self.__lock:
+            order = self.__orders.get(key)
+            if order is None:
+                order = self.__orders[key] = self.__store.order_by(key)
+            return self.__view(order)
+
+    def sorted_by_title(self) -> MovieTable:
+        return self.sorted_by('title')
+
+    def filter_by_director(self, director: str) -> MovieTable:
+        with self.__lock:
+            position = self.__store.position
+            return self.__view(array.array('I', (position(movie_id) for movie_id in self.__directors.lookup(director))))
+
+    def select(self, category: Optional[str] = None, min_year: Optional[int] = None,
+               max_year: Optional[int] = None) -> MovieTable:
+        with self.__lock:
+            return self.__view(self.__store.select(category, min_year, max_year))
+
+    def __len__(self) -> int:
+        return len(self.__store)
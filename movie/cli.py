@@ -0,0 +1,205 @@
+import argparse
+import contextlib
+import json
+import os
+import shlex
+import sys
+from typing import Any, Callable, Dict, List, Optional, TextIO, Tuple
+
+from requests.exceptions import RequestException
+from valid8 import ValidationError
+
+from movie.domain import Director, Id, MovieDealer, Password, Username, parse_id_list
+from movie.importer import ImportConfig, MovieImporter
+
+LISTINGS = ('list', 'sort', 'filter', 'liked')
+
+
+class CommandError(Exception):
+    pass
+
+
+class _Parser(argparse.ArgumentParser):
+    # a bad line of a script must not end the whole run
+    def error(self, message: str):
+        raise CommandError(message)
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = _Parser(prog='app.py', description='Secure Movie Application command line. '
+                                                'Results are written as JSON to standard output.')
+    parser.add_argument('--api-server', default='http://localhost:8000/api/v1')
+    parser.add_argument('--replica', default=os.environ.get('MOVIE_REPLICA'),
+                        help='SQLite file that keeps a local copy of the catalog')
+    parser.add_argument('--format', choices=('json', 'jsonl'), default='json',
+                        help='json writes one document per command, jsonl one line per movie or operation')
+    commands = parser.add_subparsers(dest='command', required=True, parser_class=_Parser)
+    commands.add_parser('list', help='list every movie')
+    commands.add_parser('sort', help='list the movies sorted by title')
+    commands.add_parser('filter', help='list the movies of a director').add_argument('--director', required=True)
+    commands.add_parser('get', help='show one movie').add_argument('id', type=int)
+    commands.add_parser('liked', help='list the movies liked by the logged user')
+    commands.add_parser('like', help='like movies, e.g. 1,5,10-40').add_argument('ids')
+    commands.add_parser('unlike', help='remove likes, e.g. 1,5,10-40').add_argument('ids')
+    import_parser = commands.add_parser('import', help='import movies from a .csv or .jsonl file')
+    import_parser.add_argument('file')
+    import_parser.add_argument('--workers', type=int, default=ImportConfig().workers)
+    import_parser.add_argument('--checkpoint', help='file that lets an interrupted import resume')
+    commands.add_parser('run', help='run the commands of a script file, one per line ("-" reads stdin)') \
+        .add_argument('script')
+    return parser
+
+
+class CommandLine:
+    # runs the menu operations without the menu; every command shares one dealer, so one warm session
+    def __init__(self, dealer: MovieDealer, out: TextIO = sys.stdout, json_lines: bool = False,
+                 token: Optional[str] = None, credentials: Optional[Tuple[str, str]] = None):
+        self.dealer = dealer
+        self.__out = out
+        self.__json_lines = json_lines
+        self.__token = token
+        self.__credentials = credentials
+        self.__parser = _parser()
+        self.__commands: Dict[str, Callable[[argparse.Namespace], Any]] = {
+            'list': lambda args: self.dealer.iter_movies(),
+            'sort': lambda args: self.dealer.sort_movies_by_title(),
+            'filter': lambda args: self.dealer.filter_movies_by_director(Director(args.director)),
+            'get': self.__get,
+            'liked': lambda args: self.dealer.get_liked_movies(self.__login()),
+            'like': lambda args: self.__likes(self.dealer.add_likes, args.ids),
+            'unlike': lambda args: self.__likes(self.dealer.remove_likes, args.ids),
+            'import': self.__import,
+        }
+
+    def execute(self, argv: List[str]) -> Dict[str, Any]:
+        # one operation, as the dict written for it; a failing command does not raise
+        try:
+            args = self.__parser.parse_args(argv)
+        except CommandError as e:
+            return {'command': argv[0] if argv else None, 'ok': False, 'error': str(e)}
+        return self.__execute(args)
+
+    def __execute(self, args: argparse.Namespace, stream: bool = False) -> Dict[str, Any]:
+        try:
+            if args.command == 'run':
+                raise CommandError('run cannot be used inside a script')
+            result = self.__commands[args.command](args)
+            if args.command in LISTINGS and not stream:
+                result = list(result)
+            return {'command': args.command, 'ok': True, 'result': result}
+        except ValidationError as e:
+            return {'command': args.command, 'ok': False, 'error': e.help_msg or str(e)}
+        except (CommandError, RequestException, ValueError, KeyError, TypeError) as e:
+            return {'command': args.command, 'ok': False, 'error': str(e) or type(e).__name__}
+
+    def run(self, argv: List[str]) -> int:
+        try:
+            args = self.__parser.parse_args(argv)
+        except CommandError as e:
+            self.__parser.print_usage(sys.stderr)
+            print(f'{self.__parser.prog}: error: {e}', file=sys.stderr)
+            return 2
+        self.__json_lines = self.__json_lines or args.format == 'jsonl'
+        if args.command == 'run':
+            return self.run_script(args.script)
+        if args.command in LISTINGS:
+            return self.__stream(args)
+        res = self.__execute(args)
+        self.__write(res)
+        return 0 if res['ok'] else 1
+
+    def run_script(self, path: str) -> int:
+        # one JSON line per operation, numbered by script line; blank lines and # comments are skipped
+        failed = 0
+        with open(path, encoding='utf-8') if path != '-' else contextlib.nullcontext(sys.stdin) as script:
+            for number, line in enumerate(script, start=1):
+                try:
+                    argv = shlex.split(line, comments=True)
+                except ValueError as e:
+                    argv, res = None, {'command': None, 'ok': False, 'error': str(e)}
+                if argv == []:
+                    continue
+                if argv is not None:
+                    res = self.execute(argv)
+                failed += not res['ok']
+                self.__write_line({'line': number, **res})
+        return 0 if not failed else 1
+
+    def __stream(self, args: argparse.Namespace) -> int:
+        # listings are written while they are read, so a large catalog is never held as one document
+        res = self.__execute(args, stream=True)
+        if not res['ok']:
+            self.__write(res)
+            return 1
+        movies = iter(res['result'])
+        try:
+            if self.__json_lines:
+                for movie in movies:
+                    self.__write_line(movie)
+            else:
+                self.__out.write('[')
+                for i, movie in enumerate(movies):
+                    self.__out.write(',\n' if i else '\n')
+                    self.__out.write(json.dumps(movie, default=str))
+                self.__out.write('\n]\n')
+        except RequestException as e:
+            # the output stops short of the end, the exit status and stderr say why
+            print(f'{self.__parser.prog}: error: {e}', file=sys.stderr)
+            return 1
+        return 0
+
+    def __write(self, res: Dict[str, Any]) -> None:
+        self.__out.write(json.dumps(res, default=str, indent=None if self.__json_lines else 2) + '\n')
+
+    def __write_line(self, res: Any) -> None:
+        self.__out.write(json.dumps(res, default=str) + '\n')
+
+    def __login(self) -> str:
+        if self.__token is None and self.__credentials is not None:
+            username, password = self.__credentials
+            self.__token = self.dealer.login(Username(username), Password(password))
+            if self.__token is None:
+                self.__credentials = None
+                raise CommandError('Login failed')
+        if self.__token is None:
+            raise CommandError('Login required: set MOVIE_TOKEN, or MOVIE_USERNAME and MOVIE_PASSWORD')
+        return self.__token
+
+    def __get(self, args: argparse.Namespace) -> Any:
+        movie = self.dealer.get_movie(Id(args.id))
+        if movie is None:
+            raise CommandError(f'Movie with id {args.id} not found')
+        return movie
+
+    def __likes(self, call: Callable[[str, List[Id]], Dict[int, bool]], ids: str) -> Dict[str, Any]:
+        results = call(self.__login(), parse_id_list(ids))
+        failed = [movie_id for movie_id, ok in results.items() if not ok]
+        if failed:
+            raise CommandError(f'Failed for the movies with ids {", ".join(map(str, failed))}')
+        return {'done': list(results)}
+
+    def __import(self, args: argparse.Namespace) -> Dict[str, Any]:
+        token = self.__login()
+        if not self.dealer.is_admin_user(token):
+            raise CommandError('You must be admin to import movies')
+        if not os.path.isfile(args.file):
+            raise CommandError(f'File {args.file} not found')
+        report = MovieImporter(self.dealer, token, ImportConfig(workers=args.workers),
+                               checkpoint_path=args.checkpoint).run(args.file)
+        return {'imported': report.imported, 'failed': report.failed, 'skipped': report.skipped,
+                'elapsed': report.elapsed, 'rows_per_second': report.rows_per_second,
+                'errors': [{'line': e.line, 'stage': e.stage, 'message': e.message} for e in report.errors]}
+
+
+def main(argv: List[str], out: TextIO = sys.stdout) -> int:
+    try:
+        args = _parser().parse_args(argv)
+    except CommandError as e:
+        print(f'app.py: error: {e}', file=sys.stderr)
+        return 2
+    dealer = MovieDealer.with_replica(args.replica, args.api_server) if args.replica \
+        else MovieDealer(api_server=args.api_server)
+    username, password = os.environ.get('MOVIE_USERNAME'), os.environ.get('MOVIE_PASSWORD')
+    credentials = (username, password) if username and password else None
+    with dealer:
+        return CommandLine(dealer, out, token=os.environ.get('MOVIE_TOKEN'), credentials=credentials).run(argv)
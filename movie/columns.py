@@ -0,0 +1,258 @@
+import array
+from collections.abc import Sequence
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import numpy
+except ImportError:  # the array module paths below do the same work without it
+    numpy = None
+
+INT_COLUMNS = {'id': 'q', 'year': 'i'}
+CODE_COLUMNS = ('category', 'director')
+TEXT_COLUMNS = ('title', 'description', 'image_url')
+KEYS = ('id', 'title', 'description', 'year', 'category', 'director', 'image_url')
+
+_NO_INT = {'q': -2 ** 63, 'i': -2 ** 31}
+_ABSENT = object()
+
+
+class StringTable:
+    # dictionary encoding for columns with few distinct values, code 0 marks a missing value
+    def __init__(self):
+        self.__codes: Dict[str, int] = {}
+        self.__values: List[Optional[str]] = [None]
+
+    def encode(self, value: str) -> int:
+        code = self.__codes.get(value)
+        if code is None:
+            code = self.__codes[value] = len(self.__values)
+            self.__values.append(value)
+        return code
+
+    def code(self, value: str) -> Optional[int]:
+        return self.__codes.get(value)
+
+    def decode(self, code: int) -> Optional[str]:
+        return self.__values[code]
+
+    def ranks(self) -> array.array:
+        # position of every code in the sorted order of the values
+        res = array.array('I', bytes(4 * len(self.__values)))
+        for rank, code in enumerate(sorted(self.__codes.values(), key=self.__values.__getitem__), start=1):
+            res[code] = rank
+        return res
+
+    def copy(self) -> 'StringTable':
+        res = StringTable()
+        res.__codes, res.__values = dict(self.__codes), list(self.__values)
+        return res
+
+    def __len__(self) -> int:
+        return len(self.__codes)
+
+
+class ColumnStore:
+    def __init__(self):
+        self.__ints = {key: array.array(typecode) for key, typecode in INT_COLUMNS.items()}
+        self.__codes = {key: array.array('I') for key in CODE_COLUMNS}
+        self.__tables = {key: StringTable() for key in CODE_COLUMNS}
+        self.__texts: Dict[str, List[Any]] = {key: [] for key in TEXT_COLUMNS}
+        # values that do not fit their typed column and unknown keys, by position
+        self.__extra: Dict[int, Dict[str, Any]] = {}
+        self.__positions: Dict[Any, int] = {}
+
+    def put(self, movie: Dict[str, Any]) -> None:
+        movie_id = movie['id']
+        pos = self.__positions.get(movie_id)
+        if pos is None:
+            pos = self.__positions[movie_id] = len(self.__positions)
+            for key, column in self.__ints.items():
+                column.append(_NO_INT[column.typecode])
+            for column in self.__codes.values():
+                column.append(0)
+            for column in self.__texts.values():
+                column.append(_ABSENT)
+        extra = {key: value for key, value in movie.items() if key not in KEYS}
+        for key, column in self.__ints.items():
+            value = movie.get(key, _ABSENT)
+            column[pos] = _NO_INT[column.typecode]
+            if type(value) is int and value != _NO_INT[column.typecode]:
+                try:
+                    column[pos] = value
+                    continue
+                except OverflowError:
+                    pass
+            if value is not _ABSENT:
+                extra[key] = value
+        for key, column in self.__codes.items():
+            value = movie.get(key, _ABSENT)
+            column[pos] = self.__tables[key].encode(value) if isinstance(value, str) else 0
+            if value is not _ABSENT and not isinstance(value, str):
+                extra[key] = value
+        for key, column in self.__texts.items():
+            column[pos] = movie.get(key, _ABSENT)
+        if extra:
+            self.__extra[pos] = extra
+        else:
+            self.__extra.pop(pos, None)
+
+    def remove(self, movie_id: Any) -> None:
+        pos = self.__positions.pop(movie_id, None)
+        if pos is None:
+            return
+        last = len(self.__positions)
+        if pos != last:
+            # the last row takes the place of the removed one, so removal does not shift the columns
+            self.__positions[self.__id_at(last)] = pos
+            for column in (*self.__ints.values(), *self.__codes.values(), *self.__texts.values()):
+                column[pos] = column[last]
+            extra = self.__extra.pop(last, None)
+            if extra is not None:
+                self.__extra[pos] = extra
+            else:
+                self.__extra.pop(pos, None)
+        for column in (*self.__ints.values(), *self.__codes.values(), *self.__texts.values()):
+            column.pop()
+        self.__extra.pop(last, None)
+
+    def __id_at(self, pos: int) -> Any:
+        movie_id = self.__ints['id'][pos]
+        return movie_id if movie_id != _NO_INT['q'] else self.__extra[pos]['id']
+
+    def position(self, movie_id: Any) -> Optional[int]:
+        return self.__positions.get(movie_id)
+
+    def get(self, movie_id: Any) -> Optional[Dict[str, Any]]:
+        pos = self.__positions.get(movie_id)
+        return self.row(pos) if pos is not None else None
+
+    def row(self, pos: int) -> Dict[str, Any]:
+        res = {}
+        for key in KEYS:
+            if key in INT_COLUMNS:
+                value = self.__ints[key][pos]
+                if value != _NO_INT[INT_COLUMNS[key]]:
+                    res[key] = value
+            elif key in self.__codes:
+                code = self.__codes[key][pos]
+                if code:
+                    res[key] = self.__tables[key].decode(code)
+            else:
+                value = self.__texts[key][pos]
+                if value is not _ABSENT:
+                    res[key] = value
+        extra = self.__extra.get(pos)
+        if extra is not None:
+            res.update(extra)
+        return res
+
+    def values(self, key: str) -> Iterator[Tuple[Any, Any]]:
+        # (id, value) pairs of the rows that hold a value for `key`
+        for movie_id, pos in self.__positions.items():
+            value = self.row(pos).get(key, _ABSENT) if pos in self.__extra else self.__value(key, pos)
+            if value is not _ABSENT:
+                yield movie_id, value
+
+    def __value(self, key: str, pos: int) -> Any:
+        if key in self.__ints:
+            value = self.__ints[key][pos]
+            return value if value != _NO_INT[INT_COLUMNS[key]] else _ABSENT
+        if key in self.__codes:
+            code = self.__codes[key][pos]
+            return self.__tables[key].decode(code) if code else _ABSENT
+        return self.__texts[key][pos]
+
+    def order_by(self, key: str) -> array.array:
+        # row positions sorted by `key` and then by id, rows without the value come first
+        ids = self.__ints['id']
+        if key in self.__texts:
+            texts = self.__texts[key]
+            return array.array('I', sorted(range(len(self)), key=lambda pos: (
+                texts[pos] if isinstance(texts[pos], str) else '', ids[pos])))
+        if key in self.__codes:
+            ranks = self.__tables[key].ranks()
+            codes = self.__codes[key]
+            if numpy is not None and len(self):
+                order = numpy.lexsort((_view(ids), _view(ranks)[_view(codes)]))
+                return array.array('I', order.astype('I').tobytes())
+            return array.array('I', sorted(range(len(self)), key=lambda pos: (ranks[codes[pos]], ids[pos])))
+        values = self.__ints[key]
+        if numpy is not None and len(self):
+            return array.array('I', numpy.lexsort((_view(ids), _view(values))).astype('I').tobytes())
+        return array.array('I', sorted(range(len(self)), key=lambda pos: (values[pos], ids[pos])))
+
+    def select(self, category: Optional[str] = None, min_year: Optional[int] = None,
+               max_year: Optional[int] = None) -> array.array:
+        # row positions, in storage order, of the movies that match every given filter
+        code = None
+        if category is not None:
+            code = self.__tables['category'].code(category)
+            if code is None:
+                return array.array('I')
+        years, codes = self.__ints['year'], self.__codes['category']
+        if numpy is not None and len(self):
+            mask = numpy.ones(len(self), dtype=bool)
+            if code is not None:
+                mask &= _view(codes) == code
+            if min_year is not None or max_year is not None:
+                year_values = _view(years)
+                mask &= year_values != _NO_INT['i']
+                if min_year is not None:
+                    mask &= year_values >= min_year
+                if max_year is not None:
+                    mask &= year_values <= max_year
+            return array.array('I', numpy.flatnonzero(mask).astype('I').tobytes())
+        low = min_year if min_year is not None else _NO_INT['i'] + 1
+        high = max_year if max_year is not None else 2 ** 31 - 1
+        check_years = min_year is not None or max_year is not None
+        return array.array('I', (pos for pos in range(len(self))
+                                 if (code is None or codes[pos] == code) and
+                                 (not check_years or low <= years[pos] <= high)))
+
+    def copy(self) -> 'ColumnStore':
+        res = ColumnStore()
+        res.__ints = {key: column[:] for key, column in self.__ints.items()}
+        res.__codes = {key: column[:] for key, column in self.__codes.items()}
+        res.__tables = {key: table.copy() for key, table in self.__tables.items()}
+        res.__texts = {key: column[:] for key, column in self.__texts.items()}
+        res.__extra = {pos: dict(extra) for pos, extra in self.__extra.items()}
+        res.__positions = dict(self.__positions)
+        return res
+
+    def __len__(self) -> int:
+        return len(self.__positions)
+
+
+def _view(column: array.array) -> Any:
+    return numpy.frombuffer(column, dtype=column.typecode)
+
+
+class MovieTable(Sequence):
+    # a read only list of movie dicts, built one row at a time from a column store
+    def __init__(self, store: ColumnStore, positions: Optional[array.array] = None):
+        self.store = store
+        self.positions = positions
+
+    def __len__(self) -> int:
+        return len(self.positions) if self.positions is not None else len(self.store)
+
+    def __getitem__(self, index):
+        positions = self.positions if self.positions is not None else range(len(self.store))
+        if isinstance(index, slice):
+            return MovieTable(self.store, array.array('I', positions[index]))
+        return self.store.row(positions[index])
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        row = self.store.row
+        for pos in self.positions if self.positions is not None else range(len(self.store)):
+            yield row(pos)
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, Sequence) or isinstance(other, (str, bytes)):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f'MovieTable({len(self)} movies)'
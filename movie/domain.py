@@ -1,75 +1,124 @@
 import json
-from dataclasses import dataclass
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum, unique
-from typing import Any
+from typing import Any, Callable, Dict, Iterable, Iterator, List
 
 import requests
 from requests.exceptions import ConnectionError
 from typeguard import typechecked
 from valid8 import validate
 
-from validation.dataclasses import validate_dataclass
-from validation.regex import pattern
+from movie.cache import ResponseCache, RoleCache
+from movie.catalog import LocalCatalog
+from movie.columns import ColumnStore, MovieTable
+from movie.flight import SingleFlight
+from movie.likes import LikeQueue, LikeQueueConfig
+from movie.metrics import EndpointMetrics
+from movie.replica import Replica, SyncEngine
+from movie.session import HttpPool
+from movie.stream import ListingMetrics, iter_json_array
+from validation.batch import BatchResult, validate_batch
+from validation.compiled import compile_validator, daily
 
 
+TEXT_REGEX = r'^[\w\d]+(\s[\w\d]+)*$'
+DIRECTOR_REGEX = r'^[a-zA-Z]+(\s[a-zA-Z]+\'?[a-zA-Z]*)*$'
+IMAGE_URL_REGEX = r'https://image\.tmdb\.org/t/p/w500/[a-zA-Z\d]{27}\.jpg'
+EMAIL_REGEX = r'^[\w\d\.]+@\w+\.\w+$'
+USERNAME_REGEX = r'^[\w\d_]+$'
+
+
+@dataclass(frozen=True, order=True, slots=True)
 @typechecked
-@dataclass(frozen=True, order=True)
 class Title:
     value: str
 
     def __post_init__(self):
-        validate_dataclass(self)
-        validate('value', self.value, min_len=1, max_len=50, custom=pattern(r'^[\w\d]+(\s[\w\d]+)*$'),
-                 help_msg="Title must be between 1 and 50 characters long.")
+        _TITLE.check(self)
 
     def __str__(self):
         return self.value
 
 
+_TITLE = compile_validator(Title, min_len=1, max_len=50, regex=TEXT_REGEX,
+                           help_msg="Title must be between 1 and 50 characters long.")
+
+
+@dataclass(frozen=True, order=True, slots=True)
 @typechecked
-@dataclass(frozen=True, order=True)
 class Description:
     value: str
 
     def __post_init__(self):
-        validate_dataclass(self)
-        validate('value', self.value, min_len=1, max_len=200, custom=pattern(r'^[\w\d]+(\s[\w\d]+)*$'),
-                 help_msg="Description must be between 1 and 200 characters long.")
+        _DESCRIPTION.check(self)
 
     def __str__(self):
         return self.value
 
 
+_DESCRIPTION = compile_validator(Description, min_len=1, max_len=200, regex=TEXT_REGEX,
+                                 help_msg="Description must be between 1 and 200 characters long.")
+
+
+@dataclass(frozen=True, order=True, slots=True)
 @typechecked
-@dataclass(frozen=True, order=True)
 class Year:
     value: int
 
     def __post_init__(self):
-        validate_dataclass(self)
-        validate('value', self.value, min_value=1900, max_value=datetime.now().year,
-                 help_msg="Year must be between 1900 and current year.")
+        _YEAR.check(self)
 
     def __str__(self):
         return str(self.value)
 
 
+@daily
+def current_year() -> int:
+    return datetime.now().year
+
+
+_YEAR = compile_validator(Year, min_value=1900, max_value=current_year,
+                          help_msg="Year must be between 1900 and current year.")
+
+
+@dataclass(frozen=True, slots=True)
 @typechecked
-@dataclass(frozen=True)
 class Id:
     value: int
 
     def __post_init__(self):
-        validate_dataclass(self)
-        validate('id', self.value, min_value=0, help_msg='Id must be an integer greater than or equal to 0.')
+        _ID.check(self)
 
     def __str__(self) -> str:
         return str(self.value)
 
 
+_ID = compile_validator(Id, name='id', min_value=0, help_msg='Id must be an integer greater than or equal to 0.')
+MAX_ID_LIST = 10_000
+
+
+@typechecked
+def parse_id_list(text: str) -> List[Id]:
+    # "1,5,10-40" -> ids 1, 5 and 10 to 40, without duplicates and in the given order
+    res: Dict[int, None] = {}
+    for part in text.split(','):
+        first, sep, last = part.strip().partition('-')
+        start = int(first)
+        end = int(last) if sep else start
+        if end < start:
+            raise ValueError(f'Invalid range {part.strip()}')
+        if len(res) + end - start + 1 > MAX_ID_LIST:
+            raise ValueError(f'At most {MAX_ID_LIST} ids can be given at once')
+        res.update(dict.fromkeys(range(start, end + 1)))
+    return [Id(value) for value in res]
+
+
+@dataclass(frozen=True, order=True, slots=True, weakref_slot=True)
 @typechecked
-@dataclass(frozen=True, order=True)
 class Category:
     @unique  # Enum class decorator that ensures only one name is bound to any one value.
     class MovieCategory(Enum):
@@ -91,52 +140,71 @@ class Category:
     value: MovieCategory
 
     def __post_init__(self):
-        validate_dataclass(self)
-        validate('value', self.value, custom=self._is_a_valid_category,
-                 help_msg="Category must be chosen from the provided list.")
+        _CATEGORY.check(self)
 
     def __str__(self) -> str:
         return self.value.name
 
-    @typechecked
+    @staticmethod
+    def of(value: 'Category.MovieCategory') -> 'Category':
+        return _CATEGORIES.get(value) or _CATEGORIES.setdefault(value, Category(value))
+
     def _is_a_valid_category(self, value) -> bool:
-        return value in self.MovieCategory.__members__.values()
+        return _is_a_valid_category(value)
+
+
+def _is_a_valid_category(value) -> bool:
+    return value in Category.MovieCategory.__members__.values()
+
 
+_CATEGORY = compile_validator(Category, custom=_is_a_valid_category,
+                              help_msg="Category must be chosen from the provided list.")
+_CATEGORIES: 'weakref.WeakValueDictionary[Category.MovieCategory, Category]' = weakref.WeakValueDictionary()
 
+
+@dataclass(frozen=True, order=True, slots=True, weakref_slot=True)
 @typechecked
-@dataclass(frozen=True, order=True)
 class Director:
     value: str
 
     def __post_init__(self):
-        validate_dataclass(self)
-        validate('value', self.value, min_len=3, max_len=100, custom=pattern(r'^[a-zA-Z]+(\s[a-zA-Z]+\'?[a-zA-Z]*)*$'),
-                 help_msg="Director name an surname must be between 1 and 50 characters long, and"
-                          "can contain only letters and \"'\".")
+        _DIRECTOR.check(self)
 
     def __str__(self) -> str:
         return self.value
 
+    @staticmethod
+    def of(value: str) -> 'Director':
+        # movies by the same director share one instance for as long as any of them is alive
+        return _DIRECTORS.get(value) or _DIRECTORS.setdefault(value, Director(value))
+
 
+_DIRECTOR = compile_validator(Director, min_len=3, max_len=100, regex=DIRECTOR_REGEX,
+                              help_msg="Director name an surname must be between 1 and 50 characters long, and"
+                                       "can contain only letters and \"'\".")
+_DIRECTORS: 'weakref.WeakValueDictionary[str, Director]' = weakref.WeakValueDictionary()
+
+
+@dataclass(frozen=True, order=True, slots=True)
 @typechecked
-@dataclass(frozen=True, order=True)
 class ImageUrl:
     value: str
 
     def __post_init__(self):
-        validate_dataclass(self)
-        validate('value', self.value, max_len=200,
-                 custom=pattern(r'https://image\.tmdb\.org/t/p/w500/[a-zA-Z\d]{27}\.jpg'),
-                 help_msg="Image URL must be at most 200 characters long and "
-                          "must be an URL like this one: "
-                          "https://image.tmdb.org/t/p/w500/abcdefghiABCDEFGH0123456789.jpg")
+        _IMAGE_URL.check(self)
 
     def __str__(self) -> str:
         return self.value
 
 
+_IMAGE_URL = compile_validator(ImageUrl, max_len=200, regex=IMAGE_URL_REGEX,
+                               help_msg="Image URL must be at most 200 characters long and "
+                                        "must be an URL like this one: "
+                                        "https://image.tmdb.org/t/p/w500/abcdefghiABCDEFGH0123456789.jpg")
+
+
+@dataclass(frozen=True, order=True, slots=True)
 @typechecked
-@dataclass(frozen=True, order=True)
 class Movie:
     id: Id
     title: Title
@@ -146,12 +214,17 @@ class Movie:
     director: Director
 
     def __post_init__(self):
-        validate_dataclass(self)
+        _MOVIE.check(self)
 
     @property
     def type(self) -> str:
         return 'MOVIE'
 
+    @staticmethod
+    def create(movie: Dict[str, Any]) -> 'Movie':
+        return Movie(Id(movie['id']), Title(movie['title']), Description(movie['description']), Year(movie['year']),
+                     Category.of(Category.MovieCategory[movie['category']]), Director.of(movie['director']))
+
     def __str__(self) -> str:
         return (f"Id: {self.id}\n"
                 f"Title: {self.title}\n"
@@ -161,44 +234,48 @@ class Movie:
                 f"Director: {self.director}\n")
 
 
+_MOVIE = compile_validator(Movie)
+
+
+@dataclass(frozen=True, order=True, slots=True)
 @typechecked
-@dataclass(frozen=True, order=True)
 class Like:
     user_id: Id
     movie: Movie
 
     def __post_init__(self):
-        validate_dataclass(self)
+        _LIKE.check(self)
 
     def __str__(self):
         return (f"User ID: {self.user_id}\n"
                 f"Movie: {self.movie.title}\n")
 
 
+_LIKE = compile_validator(Like)
+
+
+@dataclass(frozen=True, order=True, slots=True)
 @typechecked
-@dataclass(frozen=True, order=True)
 class Email:
     value: str
 
     def __post_init__(self):
-        validate_dataclass(self)
-        validate('value', self.value, max_len=200, custom=pattern(r'^[\w\d\.]+@\w+\.\w+$'),
-                 help_msg="Email must be a valid email address.")
+        _EMAIL.check(self)
 
     def __str__(self):
         return str(self.value)
 
 
+_EMAIL = compile_validator(Email, max_len=200, regex=EMAIL_REGEX, help_msg="Email must be a valid email address.")
+
+
+@dataclass(frozen=True, slots=True)
 @typechecked
-@dataclass(frozen=True)
 class Password:
     value: str
 
     def __post_init__(self):
-        validate_dataclass(self)
-        validate('value', self.value, min_len=8, max_len=30, custom=lambda res: self._is_valid(self.value),
-                 help_msg="Password must be between 8 and 30 characters long and contain at least one uppercase letter,"
-                          "one lowercase letter, one number and one special character.")
+        _PASSWORD.check(self)
 
     def __str__(self):
         return str(self.value)
@@ -220,31 +297,161 @@ class Password:
         return True
 
 
+_PASSWORD = compile_validator(Password, min_len=8, max_len=30, custom=lambda value: Password._is_valid(value),
+                              help_msg="Password must be between 8 and 30 characters long and contain at least one "
+                                       "uppercase letter,one lowercase letter, one number and one special character.")
+
+
+@dataclass(frozen=True, order=True, slots=True)
 @typechecked
-@dataclass(frozen=True, order=True)
 class Username:
     value: str
 
     def __post_init__(self):
-        validate_dataclass(self)
-        validate('value', self.value, min_len=1, max_len=30, custom=pattern(r'^[\w\d_]+$'),
-                 help_msg="Username must be between 1 and 30 characters long, and can contain letters, "
-                          "numbers and underscores (_).")
+        _USERNAME.check(self)
 
     def __str__(self):
         return str(self.value)
 
 
+_USERNAME = compile_validator(Username, min_len=1, max_len=30, regex=USERNAME_REGEX,
+                              help_msg="Username must be between 1 and 30 characters long, and can contain letters, "
+                                       "numbers and underscores (_).")
+
+
+_BATCH_ACCEPT = {validator.cls: validator.accept for validator in
+                 (_TITLE, _DESCRIPTION, _YEAR, _ID, _CATEGORY, _DIRECTOR, _IMAGE_URL, _EMAIL, _PASSWORD, _USERNAME)}
+
+
 @typechecked
+def validate_column(cls: type, values: Iterable[Any]) -> BatchResult:
+    validate('cls', cls, custom=lambda c: c in _BATCH_ACCEPT,
+             help_msg="Batch validation is available only for single value domain classes.")
+    return validate_batch(cls, values, _BATCH_ACCEPT[cls])
+
+
+@unique
+class UpdateOutcome(Enum):
+    UPDATED = 'updated'
+    UNCHANGED = 'unchanged'
+    CONFLICT = 'conflict'
+    FAILED = 'failed'
+
+
 @dataclass(frozen=True)
+@typechecked
 class MovieDealer:
-    __api_server = 'http://localhost:8000/api/v1'
-
     categories_list = [cat.value for cat in Category.MovieCategory]
     movie_fields = [('title', Title), ('description', Description), ('year', Year), ('category', Category),
                     ('director', Director), ('image_url', ImageUrl)]
 
-    @typechecked
+    pool: HttpPool = field(default_factory=HttpPool, repr=False, compare=False)
+    api_server: str = 'http://localhost:8000/api/v1'
+    cache: ResponseCache = field(default_factory=ResponseCache, repr=False, compare=False)
+    catalog: LocalCatalog = field(default_factory=LocalCatalog, repr=False, compare=False)
+    roles: RoleCache = field(default_factory=RoleCache, repr=False, compare=False)
+    role_wait: float = 5.0
+    listing: ListingMetrics = field(default_factory=ListingMetrics, repr=False, compare=False)
+    flights: SingleFlight = field(default_factory=SingleFlight, repr=False, compare=False)
+    metrics: EndpointMetrics = field(default_factory=EndpointMetrics, repr=False, compare=False)
+    stream_chunk_size: int = 64 * 1024
+    replica: Replica | None = field(default=None, repr=False, compare=False)
+    sync: SyncEngine | None = field(default=None, repr=False, compare=False)
+    write_behind: LikeQueueConfig | None = field(default=None, compare=False)
+    likes: LikeQueue | None = field(default=None, init=False, repr=False, compare=False)
+    # what the server turned out not to support, learnt from its answers
+    __unsupported: set = field(default_factory=set, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        if self.write_behind is not None:
+            object.__setattr__(self, 'likes', LikeQueue(self.__send_like, self.write_behind))
+
+    @staticmethod
+    def with_replica(path: str, api_server: str = 'http://localhost:8000/api/v1',
+                     sync_interval: float = 30.0, write_behind: LikeQueueConfig | None = None) -> 'MovieDealer':
+        pool = HttpPool()
+        replica = Replica(path)
+        return MovieDealer(pool, api_server, replica=replica,
+                           sync=SyncEngine(replica, pool, api_server, interval=sync_interval),
+                           write_behind=write_behind)
+
+    def __send(self, method: str, path: str, **kwargs) -> requests.Response:
+        url = f'{self.api_server}{path}'
+        if method == 'get' and not kwargs.get('stream'):
+            # identical GETs that overlap share one request; the headers carry the auth scope and validators
+            key = (url, tuple(sorted(kwargs.get('headers', {}).items())),
+                   tuple(sorted((k, repr(v)) for k, v in kwargs.items() if k != 'headers')))
+            res = self.flights.do(key, lambda: self.__measured(method, path, url, **kwargs))
+        else:
+            if method != 'get':
+                # a GET already in flight may predate this write, so later reads must not join it
+                self.flights.forget()
+            res = self.__measured(method, path, url, **kwargs)
+        if res.status_code in (401, 403):
+            authorization = kwargs.get('headers', {}).get('Authorization', '')
+            if authorization.startswith('Token '):
+                self.roles.drop(authorization[len('Token '):])
+        return res
+
+    def __measured(self, method: str, path: str, url: str, **kwargs) -> requests.Response:
+        start = time.perf_counter()
+        try:
+            res = self.pool.request(method, url, **kwargs)
+        except requests.RequestException:
+            self.metrics.record(method, path, time.perf_counter() - start, error=True)
+            raise
+        # a streamed body is not read yet; __iter_stream counts it while it arrives
+        received = 0 if kwargs.get('stream') else len(res.content)
+        self.metrics.record(method, path, time.perf_counter() - start, received, error=res.status_code >= 500)
+        return res
+
+    def __get_cached(self, path: str) -> Any:
+        return self.cache.get(path, lambda headers: self.__send('get', path, headers=headers))
+
+    def __local_catalog(self) -> LocalCatalog | None:
+        return self.catalog if self.catalog.is_fresh(self.cache.config.ttl) else None
+
+    def __replica_ready(self) -> bool:
+        # once the replica holds a listing, reads are answered from it and refreshed in the background
+        if self.replica is None or not self.replica.has_movies():
+            return False
+        if self.sync is not None:
+            self.sync.request()
+        return True
+
+    def __owner(self, key: str) -> str | None:
+        return self.sync.owner(key) if self.sync is not None and self.replica is not None else None
+
+    def __send_or_queue(self, key: str, method: str, path: str, **request) -> requests.Response | None:
+        # None means that the server could not be reached and the write waits in the replica outbox
+        headers = {'Authorization': f'Token {key}', **request.get('headers', {})}
+        try:
+            return self.__send(method, path, **{**request, 'headers': headers})
+        except (requests.ConnectionError, requests.Timeout):
+            owner = self.__owner(key)
+            if owner is None:
+                raise
+            self.replica.enqueue(owner, method, path, request)
+            return None
+
+    def warm_up(self) -> bool:
+        return self.pool.warm_up(f'{self.api_server}/')
+
+    def close(self) -> None:
+        if self.likes is not None:
+            self.likes.stop()
+        if self.sync is not None:
+            self.sync.stop()
+        if self.replica is not None:
+            self.replica.close()
+        self.pool.close()
+
+    def __enter__(self) -> 'MovieDealer':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
     def sign_up(self, username: Username, email: Email, password: Password, confirm_password: Password):
         try:
             validate("signup.username", username)
@@ -261,7 +468,7 @@ class MovieDealer:
                 'password1': password.value,
                 'password2': confirm_password.value
             }
-            res = requests.post(url=f'{self.__api_server}/auth/registration', data=my_data)
+            res = self.__send('post', '/auth/registration', data=my_data)
             if res.status_code != 204:
                 return "Something went wrong during user registration"
             else:
@@ -269,55 +476,120 @@ class MovieDealer:
         except ConnectionError:
             return "Couldn't reach server..."
 
-    @typechecked
     def login(self, username: Username, password: Password) -> str | None:
         try:
             validate("login.username", username)
             validate("login.password", password)
-            res = requests.post(url=f'{self.__api_server}/auth/login/',
-                                data={'username': username.value, 'password': password.value})
+            res = self.__send('post', '/auth/login/',
+                              data={'username': username.value, 'password': password.value})
             if res.status_code != 200:
                 return None
         except ConnectionError as e:
             return None
 
         _json = res.json()
-        return _json['key']
+        token = _json['key']
+        self.roles.prefetch(token, lambda: self.__fetch_user_type(token))
+        if self.sync is not None:
+            self.sync.login(token, username.value)
+        return token
 
-    @typechecked
     def logout(self, key: str) -> bool:
-        res = requests.post(url=f'{self.__api_server}/auth/logout/', headers={'Authorization': f'Token {key}'})
+        self.flush_likes(key)
+        if self.likes is not None:
+            self.likes.forget(key)
+        self.roles.drop(key)
+        if self.sync is not None:
+            self.sync.logout(key)
+        res = self.__send('post', '/auth/logout/', headers={'Authorization': f'Token {key}'})
         if res.status_code == 200:
             return True
         else:
             return False
 
-    @typechecked
-    def is_admin_user(self, key: str) -> bool:
-        res = requests.get(url=f'{self.__api_server}/movies/user-type/', headers={'Authorization': f'Token {key}'})
+    def __fetch_user_type(self, key: str) -> str | None:
+        res = self.__send('get', '/movies/user-type/', headers={'Authorization': f'Token {key}'})
+        if res.status_code in (401, 403):
+            return None
         _json = res.json()
-        return _json['user-type'] == 'admin'
+        return _json['user-type']
+
+    def is_admin_user(self, key: str) -> bool:
+        user_type = self.roles.get(key, wait=self.role_wait)
+        if user_type is None:
+            user_type = self.__fetch_user_type(key)
+            if user_type is None:
+                return False
+            self.roles.put(key, user_type)
+        return user_type == 'admin'
 
-    @typechecked
     def add_like(self, key: str, movie_id: Id) -> bool:
-        res = requests.post(url=f'{self.__api_server}/likes/',
-                            headers={'Authorization': f'Token {key}'},
-                            data={'movie': movie_id.value})
-        if res.status_code == 201:
+        if self.likes is not None:
+            self.likes.put(key, movie_id.value, True)
             return True
-        else:
-            return False
+        return self.__send_like(key, movie_id.value, True)
 
-    @typechecked
     def remove_like(self, key: str, movie_id: Id) -> bool:
-        res = requests.delete(url=f'{self.__api_server}/likes/by_movie/{movie_id.value}/',
-                              headers={'Authorization': f'Token {key}'})
-        if res.status_code == 204:
+        if self.likes is not None:
+            self.likes.put(key, movie_id.value, False)
             return True
+        return self.__send_like(key, movie_id.value, False)
+
+    def __send_like(self, key: str, movie_id: int, liked: bool) -> bool:
+        if liked:
+            res = self.__send_or_queue(key, 'post', '/likes/', data={'movie': movie_id})
         else:
+            res = self.__send_or_queue(key, 'delete', f'/likes/by_movie/{movie_id}/')
+        if res is not None and res.status_code != (201 if liked else 204):
             return False
+        owner = self.__owner(key)
+        if owner is not None:
+            if liked:
+                self.replica.like(owner, movie_id)
+            else:
+                self.replica.unlike(owner, movie_id)
+        return True
+
+    def flush_likes(self, key: str | None = None, timeout: float | None = None) -> int:
+        # sends the like changes that are still waiting; returns how many could not be sent
+        return self.likes.flush(key, timeout) if self.likes is not None else 0
+
+    def __liked_movie(self, movie_id: int) -> Dict[str, Any] | None:
+        movie = self.catalog.get(movie_id)
+        if movie is not None:
+            return movie
+        try:
+            return self.get_movie(Id(movie_id))
+        except requests.RequestException:
+            return None
+
+    def add_likes(self, key: str, movie_ids: List[Id], max_concurrency: int = 8) -> Dict[int, bool]:
+        if self.likes is not None:
+            return {movie_id.value: self.add_like(key, movie_id) for movie_id in movie_ids}
+        return self.__for_each(self.add_like, key, movie_ids, max_concurrency)
+
+    def remove_likes(self, key: str, movie_ids: List[Id], max_concurrency: int = 8) -> Dict[int, bool]:
+        if self.likes is not None:
+            return {movie_id.value: self.remove_like(key, movie_id) for movie_id in movie_ids}
+        return self.__for_each(self.remove_like, key, movie_ids, max_concurrency)
+
+    def __for_each(self, call: Callable[[str, Id], bool], key: str, movie_ids: List[Id],
+                   max_concurrency: int) -> Dict[int, bool]:
+        validate('max_concurrency', max_concurrency, min_value=1,
+                 help_msg="At least one request must be allowed to run at once.")
+
+        def run(movie_id: Id) -> bool:
+            try:
+                return call(key, movie_id)
+            except requests.RequestException:
+                return False
+
+        # the calls share the pooled connections, so the cap also bounds the sockets in use
+        with ThreadPoolExecutor(max_workers=min(max_concurrency, len(movie_ids) or 1),
+                                thread_name_prefix='movie-dealer') as executor:
+            results = executor.map(run, movie_ids)
+            return {movie_id.value: result for movie_id, result in zip(movie_ids, results)}
 
-    @typechecked
     def add_movie(self, key: str, title: Title, description: Description, year: Year, category: Category,
                   director: Director, image_url: ImageUrl) -> bool:
         data = {
@@ -328,67 +600,234 @@ class MovieDealer:
             'director': director.value,
             'image_url': image_url.value
         }
-        res = requests.post(url=f'{self.__api_server}/movies/', headers={'Authorization': f'Token {key}',
-                                                                         'Content-Type': 'application/json'},
-                            data=json.dumps(data))
-        return res.status_code == 201
+        res = self.__send_or_queue(key, 'post', '/movies/', headers={'Content-Type': 'application/json'},
+                                   data=json.dumps(data))
+        if res is None:
+            # the movie reaches the replica with its id when the queued request has been replayed
+            return True
+        if res.status_code != 201:
+            return False
+        self.cache.invalidate('/movies/')
+        try:
+            created = res.json()
+        except ValueError:
+            created = None
+        if isinstance(created, dict) and 'id' in created:
+            self.catalog.upsert({**data, **created})
+            if self.replica is not None:
+                self.replica.upsert_movie({**data, **created})
+        else:
+            # without the id of the new movie the local copy is no longer complete
+            self.catalog.clear()
+        return True
 
-    @typechecked
     def update_movie(self, key: str, movie: Any) -> bool:
-        res = requests.put(url=f'{self.__api_server}/movies/{movie["id"]}/',
-                           headers={'Authorization': f'Token {key}',
-                                    'Content-Type': 'application/json'},
-                           data=json.dumps(movie))
-        return res.status_code == 200
+        res = self.__send_or_queue(key, 'put', f'/movies/{movie["id"]}/', headers={'Content-Type': 'application/json'},
+                                   data=json.dumps(movie))
+        if res is not None and res.status_code != 200:
+            return False
+        self.cache.invalidate('/movies/')
+        self.catalog.upsert(movie)
+        if self.replica is not None:
+            self.replica.upsert_movie(movie)
+        return True
+
+    def patch_movie(self, key: str, original: Dict[str, Any], movie: Dict[str, Any]) -> UpdateOutcome:
+        # sends only the fields that differ from `original`, on condition that the server still holds it
+        changes = {k: v for k, v in movie.items() if k != 'id' and (k not in original or original[k] != v)}
+        if not changes:
+            return UpdateOutcome.UNCHANGED
+        path = f'/movies/{original["id"]}/'
+        headers = {'Content-Type': 'application/json'}
+        entry = self.cache.peek(path)
+        if entry is not None and entry.etag is not None:
+            headers['If-Match'] = entry.etag
+        if 'version' in original:
+            changes['version'] = original['version']
+        res = None
+        if 'patch' not in self.__unsupported:
+            res = self.__send_or_queue(key, 'patch', path, headers=headers, data=json.dumps(changes))
+            if res is not None and res.status_code in (405, 501):
+                self.__unsupported.add('patch')
+        if 'patch' in self.__unsupported:
+            full = {**original, **movie}
+            if 'version' in original:
+                full['version'] = original['version']
+            res = self.__send_or_queue(key, 'put', path, headers=headers, data=json.dumps(full))
+        if res is not None and res.status_code in (409, 412):
+            # someone else changed the movie first; the next read has to fetch their version
+            self.cache.invalidate('/movies/')
+            self.catalog.clear()
+            return UpdateOutcome.CONFLICT
+        if res is not None and res.status_code not in (200, 204):
+            return UpdateOutcome.FAILED
+        updated = {**original, **movie}
+        if res is not None and res.status_code == 200:
+            try:
+                body = res.json()
+            except ValueError:
+                body = None
+            if isinstance(body, dict):
+                updated.update(body)
+        self.cache.invalidate('/movies/')
+        self.catalog.upsert(updated)
+        if self.replica is not None:
+            self.replica.upsert_movie(updated)
+        return UpdateOutcome.UPDATED
 
-    @typechecked
     def remove_movie(self, key: str, movie_id: Id) -> bool:
-        res = requests.delete(url=f'{self.__api_server}/movies/{movie_id.value}/',
-                              headers={'Authorization': f'Token {key}'})
-        return res.status_code == 204
+        res = self.__send_or_queue(key, 'delete', f'/movies/{movie_id.value}/')
+        if res is not None and res.status_code != 204:
+            return False
+        self.cache.invalidate('/movies/')
+        self.catalog.remove(movie_id.value)
+        if self.replica is not None:
+            self.replica.remove_movie(movie_id.value)
+        return True
 
-    @typechecked
     def get_movies(self):
-        res = requests.get(url=f'{self.__api_server}/movies/')
-        if res.status_code == 200:
-            _json = res.json()
-            return _json
-        else:
+        if self.__replica_ready():
+            return self.replica.movies()
+        try:
+            movies = self.__get_cached('/movies/')
+        except (requests.ConnectionError, requests.Timeout):
+            if self.replica is None:
+                raise
             return []
+        if movies is None:
+            return []
+        entry = self.cache.peek('/movies/')
+        if self.replica is not None and entry is not None:
+            self.replica.replace_movies(movies, entry.etag)
+        if entry is not None and entry.value is movies:
+            return self.__adopt(movies, entry.stored_at)
+        return movies
+
+    def __adopt(self, movies: Any, stored_at: float) -> Any:
+        # the cached listing is replaced by a view on the columnar catalog, so the JSON rows can be freed
+        try:
+            self.catalog.load(movies, stored_at)
+        except (KeyError, TypeError):
+            self.catalog.clear()
+            return movies
+        table = self.catalog.table()
+        return table if self.cache.replace('/movies/', movies, table) else movies
+
+    def iter_movies(self, page_size: int = 0, retain: bool = True) -> Iterator[Any]:
+        if self.__replica_ready():
+            return self.listing.track(self.replica.iter_movies())
+        cached = self.cache.fresh('/movies/')
+        if cached is not None:
+            return self.listing.track(cached)
+        state = {'pages': 0, 'etag': None, 'last_modified': None}
+        rows = self.__iter_pages(page_size, state) if page_size > 0 else self.__iter_stream(state)
+        if retain:
+            rows = self.__retain(rows, state)
+        return self.listing.track(rows, lambda: state['pages'])
+
+    def __iter_stream(self, state: Dict[str, Any]) -> Iterator[Any]:
+        with self.__send('get', '/movies/', stream=True) as res:
+            if res.status_code != 200:
+                return
+            state.update(pages=1, etag=res.headers.get('ETag'), last_modified=res.headers.get('Last-Modified'))
+            yield from iter_json_array(self.metrics.count_bytes(
+                'get', '/movies/', res.iter_content(chunk_size=self.stream_chunk_size)))
+
+    def __iter_pages(self, page_size: int, state: Dict[str, Any]) -> Iterator[Any]:
+        offset = 0
+        while True:
+            res = self.__send('get', '/movies/', params={'limit': page_size, 'offset': offset})
+            if res.status_code != 200:
+                return
+            page = res.json()
+            state['pages'] += 1
+            # a server without pagination answers with the whole list
+            if isinstance(page, list):
+                yield from page
+                return
+            yield from page['results']
+            offset += len(page['results'])
+            if not page.get('next') or not page['results']:
+                return
+
+    def __retain(self, rows: Iterator[Any], state: Dict[str, Any]) -> Iterator[Any]:
+        # rows go straight into columns while they stream; a row without an id falls back to a plain list
+        generation = self.cache.generation
+        store: ColumnStore | None = ColumnStore()
+        kept: List[Any] = []
+        for row in rows:
+            if store is not None:
+                try:
+                    store.put(row)
+                except (KeyError, TypeError):
+                    kept, store = list(MovieTable(store)), None
+            if store is None:
+                kept.append(row)
+            yield row
+        if state['pages'] == 0:
+            return
+        movies = MovieTable(store) if store is not None else kept
+        self.cache.store('/movies/', movies, state['etag'], state['last_modified'], generation)
+        entry = self.cache.peek('/movies/')
+        if entry is not None and entry.value is movies and store is not None:
+            self.catalog.load(movies, entry.stored_at)
 
-    @typechecked
     def get_movie(self, movie_id: Id):
-        res = requests.get(url=f'{self.__api_server}/movies/{movie_id.value}/')
-        if res.status_code == 200:
-            _json = res.json()
-            return _json
-        else:
-            return None
+        if self.__replica_ready():
+            movie = self.replica.movie(movie_id.value)
+            if movie is not None:
+                return movie
+        movie = self.__get_cached(f'/movies/{movie_id.value}/')
+        # callers edit the returned record, so they must not share the cached one
+        return dict(movie) if movie is not None else None
+
+    def get_listed_movie(self, movie_id: Id):
+        # while the listing is fresh its id index answers, so an unknown id costs no request;
+        # after that the record is read again, conditionally when the server gave it a validator
+        catalog = self.__local_catalog()
+        if catalog is not None and not self.__replica_ready():
+            return catalog.get(movie_id.value)
+        return self.get_movie(movie_id)
 
-    @typechecked
     def sort_movies_by_title(self):
-        res = requests.get(url=f'{self.__api_server}/movies/sort-by-title/')
-        if res.status_code == 200:
-            _json = res.json()
-            return _json
-        else:
-            return []
+        if self.__replica_ready():
+            return self.replica.sorted_by_title()
+        catalog = self.__local_catalog()
+        if catalog is not None:
+            return catalog.sorted_by_title()
+        movies = self.__get_cached('/movies/sort-by-title/')
+        return movies if movies is not None else []
 
-    @typechecked
     def get_liked_movies(self, key: str):
-        res = requests.get(url=f'{self.__api_server}/movies/user_liked_movies/',
-                           headers={'Authorization': f'Token {key}'})
+        owner = self.__owner(key)
+        if owner is not None and self.replica.has_likes(owner):
+            self.sync.request()
+            return self.__with_pending_likes(key, self.replica.liked_movies(owner))
+        try:
+            res = self.__send('get', '/movies/user_liked_movies/',
+                              headers={'Authorization': f'Token {key}'})
+        except (requests.ConnectionError, requests.Timeout):
+            if owner is None:
+                raise
+            return self.__with_pending_likes(key, self.replica.liked_movies(owner))
         if res.status_code == 200:
             _json = res.json()
-            return _json
+            if owner is not None:
+                self.replica.replace_likes(owner, _json)
+            if self.likes is not None:
+                self.likes.seed(key, (movie['id'] for movie in _json if 'id' in movie))
+            return self.__with_pending_likes(key, _json)
         else:
             return []
 
-    @typechecked
+    def __with_pending_likes(self, key: str, movies: List[Any]) -> List[Any]:
+        return self.likes.overlay(key, movies, self.__liked_movie) if self.likes is not None else movies
+
     def filter_movies_by_director(self, director: Director):
-        res = requests.get(url=f'{self.__api_server}/movies/filter-by-director/{director.value}/')
-        if res.status_code == 200:
-            _json = res.json()
-            return _json
-        else:
-            return []
+        if self.__replica_ready():
+            return self.replica.filter_by_director(director.value)
+        catalog = self.__local_catalog()
+        if catalog is not None:
+            return catalog.filter_by_director(director.value)
+        movies = self.__get_cached(f'/movies/filter-by-director/{director.value}/')
+        return movies if movies is not None else []
@@ -0,0 +1,71 @@
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from typeguard import typechecked
+
+
+@dataclass(frozen=True)
+@typechecked
+class FlightStats:
+    # calls that went to the server and calls that were answered by one already in flight
+    sent: int = 0
+    saved: int = 0
+
+    @property
+    def saved_ratio(self) -> float:
+        total = self.sent + self.saved
+        return self.saved / total if total else 0.0
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    # concurrent calls with the same key wait for the first one and share its result
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__calls: Dict[Hashable, _Call] = {}
+        self.__counters = {'sent': 0, 'saved': 0}
+
+    @property
+    def stats(self) -> FlightStats:
+        with self.__lock:
+            return FlightStats(**self.__counters)
+
+    def do(self, key: Hashable, fetch: Callable[[], Any]) -> Any:
+        with self.__lock:
+            call = self.__calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.__calls[key] = _Call()
+            self.__counters['sent' if leader else 'saved'] += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fetch()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.__lock:
+                if self.__calls.get(key) is call:
+                    del self.__calls[key]
+            call.done.set()
+        return call.result
+
+    def forget(self) -> None:
+        # calls made from now on start their own request; waiters of the current ones still get their result
+        with self.__lock:
+            self.__calls.clear()
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return len(self.__calls)
@@ -0,0 +1,226 @@
+import csv
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from requests.exceptions import RequestException
+from typeguard import typechecked
+from valid8 import ValidationError, validate
+
+from movie.domain import MovieDealer, Title, Description, Year, Category, Director, ImageUrl
+from movie.session import HttpPool, PoolConfig
+from validation.dataclasses import validate_dataclass
+
+MovieFields = Tuple[Title, Description, Year, Category, Director, ImageUrl]
+
+
+@dataclass(frozen=True)
+@typechecked
+class ImportConfig:
+    workers: int = 8
+    max_in_flight: int = 64
+    checkpoint_every: int = 100
+
+    def __post_init__(self):
+        validate_dataclass(self)
+        validate('workers', self.workers, min_value=1, help_msg="At least one upload worker is needed.")
+        validate('max_in_flight', self.max_in_flight, min_value=1,
+                 help_msg="At least one upload must be allowed to wait for a worker.")
+        validate('checkpoint_every', self.checkpoint_every, min_value=1,
+                 help_msg="The checkpoint must be written at least every row.")
+
+
+@dataclass(frozen=True)
+@typechecked
+class RowError:
+    line: int
+    stage: str
+    message: str
+
+
+@dataclass(frozen=True)
+@typechecked
+class ImportReport:
+    imported: int
+    failed: int
+    skipped: int
+    elapsed: float
+    errors: Tuple[RowError, ...] = ()
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.imported / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self) -> str:
+        return (f'Imported {self.imported} movies, {self.failed} failed, {self.skipped} skipped '
+                f'in {self.elapsed:.1f} s ({self.rows_per_second:.1f} movies/s)')
+
+
+def read_rows(path: str) -> Iterator[Tuple[int, Any]]:
+    # (line, row) pairs; a row that cannot be read is returned as the exception that says why
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, newline='', encoding='utf-8') as file:
+        if extension == '.csv':
+            reader = csv.DictReader(file)
+            for row in reader:
+                yield reader.line_num, row
+        elif extension in ('.jsonl', '.ndjson'):
+            for line, text in enumerate(file, start=1):
+                if not text.strip():
+                    continue
+                try:
+                    row = json.loads(text)
+                except ValueError as e:
+                    yield line, e
+                    continue
+                yield line, row if isinstance(row, dict) else ValueError('Expected a JSON object')
+        else:
+            raise ValueError(f'Unsupported file type {extension!r}, use .csv or .jsonl')
+
+
+def parse_movie(row: Dict[str, Any]) -> MovieFields:
+    year, category = row['year'], row['category']
+    name = category.strip().upper() if isinstance(category, str) else category
+    if name not in Category.MovieCategory.__members__:
+        raise ValueError(f'Unknown category {category!r}')
+    return (Title(row['title']), Description(row['description']),
+            Year(int(year.strip()) if isinstance(year, str) else year),
+            Category.of(Category.MovieCategory[name]), Director.of(row['director']), ImageUrl(row['image_url']))
+
+
+def _describe(error: Exception) -> str:
+    if isinstance(error, ValidationError):
+        return error.help_msg or str(error)
+    if isinstance(error, KeyError):
+        return f'Missing field {error.args[0]!r}'
+    return str(error) or type(error).__name__
+
+
+class Checkpoint:
+    # rows are counted from 0 in file order; everything below `next` and every row in `done` is finished
+    def __init__(self, path: Optional[str], source: str):
+        self.__path = path
+        self.__source = os.path.abspath(source)
+        self.__next = 0
+        self.__done: Set[int] = set()
+        if path is not None and os.path.exists(path):
+            with open(path, encoding='utf-8') as file:
+                state = json.load(file)
+            if state.get('source') == self.__source:
+                self.__next, self.__done = state['next'], set(state['done'])
+
+    def is_done(self, row: int) -> bool:
+        return row < self.__next or row in self.__done
+
+    def mark(self, row: int) -> None:
+        self.__done.add(row)
+        while self.__next in self.__done:
+            self.__done.remove(self.__next)
+            self.__next += 1
+
+    def save(self) -> None:
+        if self.__path is None:
+            return
+        temporary = f'{self.__path}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as file:
+            json.dump({'source': self.__source, 'next': self.__next, 'done': sorted(self.__done)}, file)
+        os.replace(temporary, self.__path)
+
+    def remove(self) -> None:
+        if self.__path is not None and os.path.exists(self.__path):
+            os.remove(self.__path)
+
+
+class MovieImporter:
+    def __init__(self, dealer: MovieDealer, token: str, config: Optional[ImportConfig] = None,
+                 checkpoint_path: Optional[str] = None, on_progress: Callable[[int, int], None] = lambda ok, ko: None):
+        self.dealer = dealer
+        self.config = config or ImportConfig()
+        self.__token = token
+        self.__checkpoint_path = checkpoint_path
+        self.__on_progress = on_progress
+
+    @staticmethod
+    def create(token: str, config: Optional[ImportConfig] = None, checkpoint_path: Optional[str] = None,
+               api_server: str = 'http://localhost:8000/api/v1') -> 'MovieImporter':
+        config = config or ImportConfig()
+        pool = HttpPool(PoolConfig(pool_maxsize=config.workers))
+        return MovieImporter(MovieDealer(pool, api_server), token, config, checkpoint_path)
+
+    def __upload(self, movie: MovieFields) -> Optional[str]:
+        try:
+            return None if self.dealer.add_movie(self.__token, *movie) else 'The server rejected the movie'
+        except RequestException as e:
+            return _describe(e)
+
+    def run(self, path: str) -> ImportReport:
+        checkpoint = Checkpoint(self.__checkpoint_path, path)
+        errors: List[RowError] = []
+        counts = {'imported': 0, 'failed': 0, 'skipped': 0, 'since_save': 0}
+        pending: Dict[Future, Tuple[int, int]] = {}
+        start = time.perf_counter()
+
+        def finished(row: int, line: int, error: Optional[Tuple[str, str]]) -> None:
+            if error is None:
+                counts['imported'] += 1
+            else:
+                counts['failed'] += 1
+                errors.append(RowError(line, *error))
+            # upload errors stay open so that a resumed import tries them again
+            if error is None or error[0] != 'upload':
+                checkpoint.mark(row)
+            counts['since_save'] += 1
+            if counts['since_save'] >= self.config.checkpoint_every:
+                checkpoint.save()
+                counts['since_save'] = 0
+            self.__on_progress(counts['imported'], counts['failed'])
+
+        def collect(block: bool) -> None:
+            done, _ = wait(pending, timeout=None if block else 0, return_when=FIRST_COMPLETED)
+            for future in done:
+                row, line = pending.pop(future)
+                message = future.result()
+                finished(row, line, ('upload', message) if message is not None else None)
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.config.workers, thread_name_prefix='movie-import') as executor:
+                for row, (line, data) in enumerate(read_rows(path)):
+                    if checkpoint.is_done(row):
+                        counts['skipped'] += 1
+                        continue
+                    if isinstance(data, Exception):
+                        finished(row, line, ('read', _describe(data)))
+                        continue
+                    try:
+                        movie = parse_movie(data)
+                    except (ValidationError, KeyError, TypeError, ValueError) as e:
+                        finished(row, line, ('validation', _describe(e)))
+                        continue
+                    pending[executor.submit(self.__upload, movie)] = (row, line)
+                    # reading stops while the uploads are this far behind, so memory stays bounded
+                    if len(pending) >= self.config.max_in_flight:
+                        collect(block=True)
+                    elif pending:
+                        collect(block=False)
+                while pending:
+                    collect(block=True)
+        finally:
+            checkpoint.save()
+
+        errors.sort(key=lambda error: error.line)
+        report = ImportReport(counts['imported'], counts['failed'], counts['skipped'], time.perf_counter() - start,
+                              tuple(errors))
+        if not any(error.stage == 'upload' for error in errors):
+            checkpoint.remove()
+        return report
+
+
+def write_error_report(report: ImportReport, path: str) -> None:
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(['line', 'stage', 'message'])
+        for error in report.errors:
+            writer.writerow([error.line, error.stage, error.message])
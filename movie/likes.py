@@ -0,0 +1,224 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import requests
+from typeguard import typechecked
+from valid8 import validate
+
+from validation.dataclasses import validate_dataclass
+
+
+@dataclass(frozen=True)
+@typechecked
+class LikeQueueConfig:
+    # how long a change waits for later changes to join its batch
+    delay: float = 0.5
+    max_batch: int = 64
+    max_concurrency: int = 8
+    max_attempts: int = 5
+    retry_backoff: float = 0.5
+    flush_timeout: float = 10.0
+
+    def __post_init__(self):
+        validate_dataclass(self)
+        validate('delay', self.delay, min_value=0.0, help_msg="The delay cannot be negative.")
+        validate('max_batch', self.max_batch, min_value=1, help_msg="A batch must hold at least one change.")
+        validate('max_concurrency', self.max_concurrency, min_value=1,
+                 help_msg="At least one request must be allowed to run at once.")
+        validate('max_attempts', self.max_attempts, min_value=1, help_msg="Every change must be tried at least once.")
+        validate('retry_backoff', self.retry_backoff, min_value=0.0, help_msg="The backoff cannot be negative.")
+        validate('flush_timeout', self.flush_timeout, min_value=0.0, help_msg="The timeout cannot be negative.")
+
+
+@dataclass(frozen=True)
+@typechecked
+class LikeQueueStats:
+    queued: int = 0
+    coalesced: int = 0
+    sent: int = 0
+    retried: int = 0
+    failed: int = 0
+
+
+@dataclass
+class _Change:
+    liked: bool
+    attempts: int = 0
+    not_before: float = 0.0
+
+
+Send = Callable[[str, int, bool], bool]
+
+
+class LikeQueue:
+    # likes and unlikes are answered at once and sent later; only the last change per (user, movie) is kept
+    def __init__(self, send: Send, config: Optional[LikeQueueConfig] = None):
+        self.config = config or LikeQueueConfig()
+        self.__send = send
+        self.__changed = threading.Condition()
+        self.__pending: 'OrderedDict[Tuple[str, int], _Change]' = OrderedDict()
+        self.__in_flight: Dict[Tuple[str, int], _Change] = {}
+        # what the server is known to hold; users whose whole list was seen default to not liked
+        self.__known: Dict[str, Dict[int, bool]] = {}
+        self.__complete: Set[str] = set()
+        self.__counters = {'queued': 0, 'coalesced': 0, 'sent': 0, 'retried': 0, 'failed': 0}
+        self.__stopped = False
+        self.__thread: Optional[threading.Thread] = None
+
+    @property
+    def stats(self) -> LikeQueueStats:
+        with self.__changed:
+            return LikeQueueStats(**self.__counters)
+
+    def put(self, key: str, movie_id: int, liked: bool) -> None:
+        with self.__changed:
+            change_key = (key, movie_id)
+            if self.__pending.pop(change_key, None) is not None:
+                self.__counters['coalesced'] += 1
+            if change_key not in self.__in_flight and self.__known_state(key, movie_id) == liked:
+                # the change undoes one that never left, so there is nothing to send
+                self.__counters['coalesced'] += 1
+            else:
+                self.__pending[change_key] = _Change(liked)
+                self.__counters['queued'] += 1
+            self.__start()
+            self.__changed.notify_all()
+
+    def pending(self, key: str) -> Dict[int, bool]:
+        with self.__changed:
+            # changes being sent count too, the server may not have them yet
+            changes = (*self.__in_flight.items(), *self.__pending.items())
+            return {movie_id: change.liked for (owner, movie_id), change in changes if owner == key}
+
+    def seed(self, key: str, liked_ids: Iterable[int]) -> None:
+        # the liked list just read from the server
+        with self.__changed:
+            self.__known[key] = {movie_id: True for movie_id in liked_ids}
+            self.__complete.add(key)
+
+    def overlay(self, key: str, movies: List[Dict[str, Any]],
+                lookup: Callable[[int], Optional[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        # the server's liked list as it will be once the pending changes are sent
+        changes = self.pending(key)
+        if not changes:
+            return movies
+        res = [movie for movie in movies if changes.get(movie.get('id'), True)]
+        present = {movie.get('id') for movie in res}
+        for movie_id, liked in changes.items():
+            if liked and movie_id not in present:
+                movie = lookup(movie_id)
+                if movie is not None:
+                    res.append(movie)
+        return res
+
+    def forget(self, key: str) -> None:
+        with self.__changed:
+            self.__known.pop(key, None)
+            self.__complete.discard(key)
+
+    def flush(self, key: Optional[str] = None, timeout: Optional[float] = None) -> int:
+        # sends the changes of `key` (or of everyone) without waiting for the batch delay;
+        # returns how many changes are still unsent when the timeout expires
+        deadline = time.monotonic() + (self.config.flush_timeout if timeout is None else timeout)
+        while True:
+            with self.__changed:
+                while any(key is None or owner == key for owner, _ in self.__in_flight):
+                    if not self.__changed.wait(max(0.0, deadline - time.monotonic())):
+                        break
+                batch = self.__take(key, time.monotonic())
+                left = sum(1 for owner, _ in (*self.__pending, *self.__in_flight) if key is None or owner == key)
+            if batch:
+                self.__run(batch)
+                continue
+            if not left or time.monotonic() >= deadline:
+                return left
+            with self.__changed:
+                wake = min((c.not_before for (owner, _), c in self.__pending.items() if key is None or owner == key),
+                           default=deadline)
+                self.__changed.wait(max(0.0, min(wake, deadline) - time.monotonic()))
+
+    def stop(self, timeout: Optional[float] = None) -> int:
+        left = self.flush(timeout=timeout)
+        with self.__changed:
+            self.__stopped = True
+            self.__changed.notify_all()
+        thread = self.__thread
+        if thread is not None:
+            thread.join(timeout)
+        return left
+
+    def __known_state(self, key: str, movie_id: int) -> Optional[bool]:
+        state = self.__known.get(key, {}).get(movie_id)
+        if state is None and key in self.__complete:
+            return False
+        return state
+
+    def __start(self) -> None:
+        if self.__thread is None and not self.__stopped:
+            self.__thread = threading.Thread(target=self.__loop, name='like-writer', daemon=True)
+            self.__thread.start()
+
+    def __take(self, key: Optional[str], now: float) -> List[Tuple[str, int, _Change]]:
+        batch = []
+        for (owner, movie_id), change in list(self.__pending.items()):
+            if len(batch) >= self.config.max_batch:
+                break
+            if (key is None or owner == key) and change.not_before <= now and (owner, movie_id) not in self.__in_flight:
+                del self.__pending[(owner, movie_id)]
+                self.__in_flight[(owner, movie_id)] = change
+                batch.append((owner, movie_id, change))
+        return batch
+
+    def __loop(self) -> None:
+        while True:
+            with self.__changed:
+                while not self.__stopped and not self.__pending:
+                    self.__changed.wait()
+                if self.__stopped:
+                    return
+                # later changes get `delay` seconds to join the batch or cancel out
+                self.__changed.wait(self.config.delay)
+                now = time.monotonic()
+                batch = self.__take(None, now)
+                if not batch:
+                    wake = min((c.not_before for c in self.__pending.values()), default=now)
+                    self.__changed.wait(max(0.0, wake - now))
+                    continue
+            self.__run(batch)
+
+    def __run(self, batch: List[Tuple[str, int, _Change]]) -> None:
+        def send(item: Tuple[str, int, _Change]) -> Optional[bool]:
+            owner, movie_id, change = item
+            try:
+                return self.__send(owner, movie_id, change.liked)
+            except requests.RequestException:
+                return None
+
+        with ThreadPoolExecutor(max_workers=min(self.config.max_concurrency, len(batch)),
+                                thread_name_prefix='like-writer') as executor:
+            results = list(executor.map(send, batch))
+
+        with self.__changed:
+            for (owner, movie_id, change), result in zip(batch, results):
+                change_key = (owner, movie_id)
+                self.__in_flight.pop(change_key, None)
+                if result:
+                    self.__counters['sent'] += 1
+                    self.__known.setdefault(owner, {})[movie_id] = change.liked
+                elif result is None and change.attempts + 1 < self.config.max_attempts:
+                    # a newer change for the same movie replaces the one that failed
+                    if change_key not in self.__pending:
+                        change.attempts += 1
+                        change.not_before = time.monotonic() + self.config.retry_backoff * 2 ** (change.attempts - 1)
+                        self.__pending[change_key] = change
+                        self.__pending.move_to_end(change_key, last=False)
+                        self.__counters['retried'] += 1
+                else:
+                    self.__counters['failed'] += 1
+                    self.__known.get(owner, {}).pop(movie_id, None)
+                    self.__complete.discard(owner)
+            self.__changed.notify_all()
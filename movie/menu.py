@@ -4,35 +4,43 @@ from typing import Callable, List, Dict, Optional, Any
 from typeguard import typechecked
 from valid8 import validate
 
-from validation.regex import pattern
+from validation.compiled import compile_validator
 
 
-@typechecked
 @dataclass(order=True, frozen=True)
+@typechecked
 class MenuDescription:
     value: str
 
     def __post_init__(self):
-        validate('Description.value', self.value, min_len=1, max_len=1000, custom=pattern(r'[0-9A-Za-z ;.,_-]*'))
+        _MENU_DESCRIPTION.check(self)
 
     def __str__(self):
         return self.value
 
 
-@typechecked
+# the menus are built from literals at startup, so valid values skip valid8 altogether
+_MENU_DESCRIPTION = compile_validator(MenuDescription, name='Description.value', min_len=1, max_len=1000,
+                                      regex=r'[0-9A-Za-z ;.,_-]*')
+
+
 @dataclass(order=True, frozen=True)
+@typechecked
 class Key:
     value: str
 
     def __post_init__(self):
-        validate('Key.value', self.value, min_len=1, max_len=10, custom=pattern(r'[0-9A-Za-z_-]*'))
+        _KEY.check(self)
 
     def __str__(self):
         return self.value
 
 
-@typechecked
+_KEY = compile_validator(Key, name='Key.value', min_len=1, max_len=10, regex=r'[0-9A-Za-z_-]*')
+
+
 @dataclass(frozen=True)
+@typechecked
 class Entry:
     key: Key
     description: MenuDescription
@@ -45,8 +53,8 @@ class Entry:
         return Entry(Key(key), MenuDescription(description), on_selected, is_exit)
 
 
-@typechecked
 @dataclass(frozen=True)
+@typechecked
 class Menu:
     description: MenuDescription
     auto_select: Callable[[], None] = field(default=lambda: None)
@@ -95,8 +103,8 @@ class Menu:
             if is_exit:
                 return
 
-    @typechecked
     @dataclass()
+    @typechecked
     class Builder:
         __menu: Optional['Menu']
         __create_key = object()
@@ -0,0 +1,155 @@
+import json
+import re
+import threading
+import time
+from bisect import bisect_left
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from typeguard import typechecked
+
+# upper bounds of the latency buckets in seconds, as in a Prometheus histogram; the last bucket is unbounded
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# ids and director names would give one series per movie, so they are folded into placeholders
+_TEMPLATES = ((re.compile(r'/filter-by-director/[^/]+/'), '/filter-by-director/{director}/'),
+              (re.compile(r'/\d+(?=/|$)'), '/{id}'))
+
+
+def endpoint(method: str, path: str) -> Tuple[str, str]:
+    path = path.split('?', 1)[0]
+    for regex, template in _TEMPLATES:
+        path = regex.sub(template, path)
+    return method.upper(), path
+
+
+@dataclass(frozen=True)
+@typechecked
+class EndpointStats:
+    method: str
+    path: str
+    count: int = 0
+    errors: int = 0
+    bytes: int = 0
+    p50: float = 0.0
+    p95: float = 0.0
+    p99: float = 0.0
+    total: float = 0.0
+
+    @property
+    def error_ratio(self) -> float:
+        return self.errors / self.count if self.count else 0.0
+
+
+class _Series:
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.bytes = 0
+        self.total = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+
+    def quantile(self, q: float) -> float:
+        # linear interpolation inside the bucket that holds the q-th observation
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            if n and seen + n >= rank:
+                low = BUCKETS[i - 1] if i else 0.0
+                high = BUCKETS[i] if i < len(BUCKETS) else BUCKETS[-1]
+                return low + (high - low) * (rank - seen) / n
+            seen += n
+        return 0.0
+
+
+class EndpointMetrics:
+    # what every request cost, per method and path template; an error is a failed request or a 5xx answer
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__series: Dict[Tuple[str, str], _Series] = {}
+        self.started = time.time()
+
+    def record(self, method: str, path: str, seconds: float, received: int = 0, error: bool = False) -> None:
+        key = endpoint(method, path)
+        with self.__lock:
+            series = self.__series.get(key)
+            if series is None:
+                series = self.__series[key] = _Series()
+            series.count += 1
+            series.errors += error
+            series.bytes += received
+            series.total += seconds
+            series.buckets[bisect_left(BUCKETS, seconds)] += 1
+
+    def add_bytes(self, method: str, path: str, received: int) -> None:
+        key = endpoint(method, path)
+        with self.__lock:
+            if key in self.__series:
+                self.__series[key].bytes += received
+
+    def count_bytes(self, method: str, path: str, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        # a streamed body arrives after its request was recorded, so its size is added as it is read
+        received = 0
+        try:
+            for chunk in chunks:
+                received += len(chunk)
+                yield chunk
+        finally:
+            self.add_bytes(method, path, received)
+
+    def snapshot(self) -> List[EndpointStats]:
+        with self.__lock:
+            return [EndpointStats(method, path, s.count, s.errors, s.bytes, s.quantile(0.5), s.quantile(0.95),
+                                  s.quantile(0.99), s.total)
+                    for (method, path), s in sorted(self.__series.items(), key=lambda item: (item[0][1], item[0][0]))]
+
+    def reset(self) -> None:
+        with self.__lock:
+            self.__series.clear()
+            self.started = time.time()
+
+    def to_json(self) -> str:
+        return json.dumps({'started': self.started, 'endpoints': [asdict(stats) for stats in self.snapshot()]},
+                          indent=2)
+
+    def to_prometheus(self) -> str:
+        with self.__lock:
+            series = sorted(self.__series.items())
+            lines = ['# HELP movie_requests_total Requests sent to the API server.',
+                     '# TYPE movie_requests_total counter']
+            lines += [f'movie_requests_total{{{_labels(key)}}} {s.count}' for key, s in series]
+            lines += ['# HELP movie_request_errors_total Requests that failed or got a 5xx answer.',
+                      '# TYPE movie_request_errors_total counter']
+            lines += [f'movie_request_errors_total{{{_labels(key)}}} {s.errors}' for key, s in series]
+            lines += ['# HELP movie_response_bytes_total Bytes of response bodies received.',
+                      '# TYPE movie_response_bytes_total counter']
+            lines += [f'movie_response_bytes_total{{{_labels(key)}}} {s.bytes}' for key, s in series]
+            lines += ['# HELP movie_request_duration_seconds Time until the response headers arrived.',
+                      '# TYPE movie_request_duration_seconds histogram']
+            for key, s in series:
+                cumulative = 0
+                for bound, n in zip(BUCKETS + (None,), s.buckets):
+                    cumulative += n
+                    le = '+Inf' if bound is None else repr(bound)
+                    lines.append(f'movie_request_duration_seconds_bucket{{{_labels(key)},le="{le}"}} {cumulative}')
+                lines.append(f'movie_request_duration_seconds_sum{{{_labels(key)}}} {s.total}')
+                lines.append(f'movie_request_duration_seconds_count{{{_labels(key)}}} {s.count}')
+        return '\n'.join(lines) + '\n'
+
+    def export(self, path: str, fmt: Optional[str] = None) -> str:
+        # the format follows the file extension unless given: .prom and .txt are Prometheus text, anything else JSON
+        fmt = fmt or ('prometheus' if path.endswith(('.prom', '.txt')) else 'json')
+        if fmt not in ('json', 'prometheus'):
+            raise ValueError(f'Unknown metrics format {fmt}')
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(self.to_json() if fmt == 'json' else self.to_prometheus())
+        return fmt
+
+
+def _labels(key: Tuple[str, str]) -> str:
+    method, path = key
+    return f'method="{method}",path="{_escape(path)}"'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
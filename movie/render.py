@@ -0,0 +1,107 @@
+import time
+from dataclasses import dataclass
+from operator import itemgetter
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+from typeguard import typechecked
+from valid8 import validate
+
+from validation.dataclasses import validate_dataclass
+
+
+@dataclass(frozen=True)
+@typechecked
+class Column:
+    key: str
+    header: str
+    width: int
+    numeric: bool = False
+
+    def __post_init__(self):
+        validate_dataclass(self)
+        validate('width', self.width, min_value=1, help_msg="A column must be at least 1 character wide.")
+
+
+MOVIE_COLUMNS = (Column('id', 'ID', 4, numeric=True), Column('title', 'TITLE', 40),
+                 Column('director', 'DIRECTOR', 25), Column('category', 'CATEGORY', 15),
+                 Column('year', 'YEAR', 4, numeric=True))
+
+
+def _write(text: str) -> None:
+    print(text, end='')
+
+
+class TableRenderer:
+    def __init__(self, columns: Tuple[Column, ...] = MOVIE_COLUMNS, write: Callable[[str], None] = _write,
+                 batch_rows: int = 4096, flush_interval: float = 0.05, line_width: int = 120,
+                 max_cached_rows: int = 500_000):
+        self.columns = columns
+        self.__write = write
+        self.__batch_rows = batch_rows
+        self.__flush_interval = flush_interval
+        self.__line_width = line_width
+        self.__max_cached_rows = max_cached_rows
+        values = itemgetter(*(column.key for column in columns))
+        self.__values = values if len(columns) > 1 else lambda movie: (values(movie),)
+        self.__widths = tuple(column.width for column in columns)
+        self.__fmt = '\t'.join('{:%d}' % width for width in self.__widths)
+        self.__text = tuple((i, column.width) for i, column in enumerate(columns) if not column.numeric)
+        self.__rows: Dict[Tuple[Any, Any], str] = {}
+
+    @property
+    def header(self) -> str:
+        return self.__fmt.format(*(column.header for column in self.columns))
+
+    def format_row(self, movie: Dict[str, Any]) -> str:
+        values = self.__values(movie)
+        version = movie.get('version')
+        cache_key = (values[0], version) if version is not None else values
+        row = self.__rows.get(cache_key)
+        if row is None:
+            for i, width in self.__text:
+                if len(values[i]) > width:
+                    # overlong text is cut so that every row keeps the column layout
+                    values = tuple(value[:width - 1] + '…' if isinstance(value, str) and len(value) > width
+                                   else value for value, width in zip(values, self.__widths))
+                    break
+            row = self.__fmt.format(*values) + '\n'
+            if len(self.__rows) >= self.__max_cached_rows:
+                self.__rows.clear()
+            self.__rows[cache_key] = row
+        return row
+
+    def render(self, movies: Iterable[Dict[str, Any]], title: str) -> int:
+        def sep():
+            print('-' * self.__line_width)
+
+        print()
+        sep()
+        print(title)
+        sep()
+        print(self.header)
+        sep()
+        count = self.write_rows(movies)
+        sep()
+        print()
+        return count
+
+    def write_rows(self, movies: Iterable[Dict[str, Any]]) -> int:
+        # the first row goes out at once, later rows in large batches or when the source slows down
+        buffer: List[str] = []
+        count, flushed_at = 0, None
+        format_row = self.format_row
+        for movie in movies:
+            buffer.append(format_row(movie))
+            count += 1
+            if flushed_at is None or len(buffer) >= self.__batch_rows or \
+                    (count & 63 == 0 or self.__flush_interval <= 0) and \
+                    time.monotonic() - flushed_at >= self.__flush_interval:
+                self.__write(''.join(buffer))
+                buffer.clear()
+                flushed_at = time.monotonic()
+        if buffer:
+            self.__write(''.join(buffer))
+        return count
+
+    def clear_cache(self) -> None:
+        self.__rows.clear()
@@ -0,0 +1,359 @@
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import requests
+from typeguard import typechecked
+
+from movie.catalog import normalize_name
+from movie.session import HttpPool
+from movie.stream import iter_json_array
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS movies (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    director_key TEXT NOT NULL,
+    surname TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS movies_by_title ON movies (title, id);
+CREATE INDEX IF NOT EXISTS movies_by_director ON movies (director_key, id);
+CREATE INDEX IF NOT EXISTS movies_by_surname ON movies (surname, id);
+CREATE TABLE IF NOT EXISTS likes (
+    owner TEXT NOT NULL,
+    movie_id INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (owner, movie_id)
+);
+CREATE TABLE IF NOT EXISTS outbox (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    owner TEXT NOT NULL,
+    method TEXT NOT NULL,
+    path TEXT NOT NULL,
+    request TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+'''
+
+
+@dataclass(frozen=True)
+@typechecked
+class QueuedWrite:
+    seq: int
+    owner: str
+    method: str
+    path: str
+    request: Dict[str, Any]
+
+
+@dataclass(frozen=True)
+@typechecked
+class SyncStats:
+    syncs: int = 0
+    failures: int = 0
+    replayed: int = 0
+    rejected: int = 0
+    online: Optional[bool] = None
+
+
+def _movie_row(movie: Dict[str, Any]) -> tuple:
+    director = normalize_name(str(movie.get('director', '')))
+    return (movie['id'], str(movie.get('title', '')), director, director.rsplit(' ', 1)[-1],
+            json.dumps(movie, separators=(',', ':')))
+
+
+class Replica:
+    # a local SQLite copy of the catalog, of each user's likes and of the writes waiting for the server
+    def __init__(self, path: str = ':memory:'):
+        self.path = path
+        # every thread reads through its own connection, so in WAL mode a running sync never blocks a read
+        self.__uri = f'file:replica-{id(self)}?mode=memory&cache=shared' if path == ':memory:' else path
+        self.__local = threading.local()
+        self.__lock = threading.RLock()
+        self.__connections: List[sqlite3.Connection] = []
+        db = self.__connection()
+        if path != ':memory:':
+            db.execute('PRAGMA journal_mode=WAL')
+        db.executescript(_SCHEMA)
+
+    def __connection(self) -> sqlite3.Connection:
+        db = getattr(self.__local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.__uri, uri=self.path == ':memory:', check_same_thread=False,
+                                 isolation_level=None, timeout=30.0)
+            db.execute('PRAGMA synchronous=NORMAL')
+            self.__local.db = db
+            with self.__lock:
+                self.__connections.append(db)
+        return db
+
+    def close(self) -> None:
+        with self.__lock:
+            for db in self.__connections:
+                db.close()
+            self.__connections.clear()
+
+    def __query(self, sql: str, *args) -> List[tuple]:
+        return self.__connection().execute(sql, args).fetchall()
+
+    def __write(self, sql: str, *args) -> sqlite3.Cursor:
+        with self.__lock:
+            return self.__connection().execute(sql, args)
+
+    def __transaction(self, statements) -> Any:
+        # writes are serialised here; readers keep using the last committed state meanwhile
+        with self.__lock:
+            db = self.__connection()
+            db.execute('BEGIN IMMEDIATE')
+            try:
+                res = statements(db)
+                db.execute('COMMIT')
+                return res
+            except BaseException:
+                db.execute('ROLLBACK')
+                raise
+
+    def __movies(self, sql: str, *args) -> List[Dict[str, Any]]:
+        return [json.loads(data) for data, in self.__query(sql, *args)]
+
+    def get_meta(self, key: str) -> Optional[str]:
+        rows = self.__query('SELECT value FROM meta WHERE key = ?', key)
+        return rows[0][0] if rows else None
+
+    def set_meta(self, key: str, value: Optional[str]) -> None:
+        if value is None:
+            self.__write('DELETE FROM meta WHERE key = ?', key)
+        else:
+            self.__write('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', key, value)
+
+    def has_movies(self) -> bool:
+        return self.get_meta('movies_synced_at') is not None
+
+    def replace_movies(self, movies: Iterable[Dict[str, Any]], etag: Optional[str] = None) -> int:
+        # the whole listing is swapped in one transaction, readers never see half of it
+        def replace(db: sqlite3.Connection) -> int:
+            db.execute('DELETE FROM movies')
+            count = db.executemany('INSERT OR REPLACE INTO movies VALUES (?, ?, ?, ?, ?)',
+                                   map(_movie_row, movies)).rowcount
+            db.execute('INSERT OR REPLACE INTO meta VALUES (?, ?)', ('movies_synced_at', str(time.time())))
+            db.execute('DELETE FROM meta WHERE key = ?', ('movies_etag',))
+            if etag is not None:
+                db.execute('INSERT INTO meta VALUES (?, ?)', ('movies_etag', etag))
+            return count
+
+        return self.__transaction(replace)
+
+    def upsert_movie(self, movie: Dict[str, Any]) -> None:
+        # liked copies follow the movie so that a changed title shows up in every list
+        def upsert(db: sqlite3.Connection) -> None:
+            row = _movie_row(movie)
+            db.execute('INSERT OR REPLACE INTO movies VALUES (?, ?, ?, ?, ?)', row)
+            db.execute('UPDATE likes SET data = ? WHERE movie_id = ?', (row[-1], movie['id']))
+
+        self.__transaction(upsert)
+
+    def remove_movie(self, movie_id: int) -> None:
+        def remove(db: sqlite3.Connection) -> None:
+            db.execute('DELETE FROM movies WHERE id = ?', (movie_id,))
+            db.execute('DELETE FROM likes WHERE movie_id = ?', (movie_id,))
+
+        self.__transaction(remove)
+
+    def movies(self) -> List[Dict[str, Any]]:
+        return self.__movies('SELECT data FROM movies ORDER BY id')
+
+    def iter_movies(self, batch: int = 1000) -> Iterator[Dict[str, Any]]:
+        last = None
+        while True:
+            if last is None:
+                rows = self.__query('SELECT id, data FROM movies ORDER BY id LIMIT ?', batch)
+            else:
+                rows = self.__query('SELECT id, data FROM movies WHERE id > ? ORDER BY id LIMIT ?', last, batch)
+            for movie_id, data in rows:
+                last = movie_id
+                yield json.loads(data)
+            if len(rows) < batch:
+                return
+
+    def movie(self, movie_id: int) -> Optional[Dict[str, Any]]:
+        rows = self.__movies('SELECT data FROM movies WHERE id = ?', movie_id)
+        return rows[0] if rows else None
+
+    def sorted_by_title(self) -> List[Dict[str, Any]]:
+        return self.__movies('SELECT data FROM movies ORDER BY title, id')
+
+    def filter_by_director(self, director: str) -> List[Dict[str, Any]]:
+        # same precedence as the in-memory director index: exact name, then surname, then name prefix
+        key = normalize_name(director)
+        return (self.__movies('SELECT data FROM movies WHERE director_key = ? ORDER BY id', key) or
+                self.__movies('SELECT data FROM movies WHERE surname = ? ORDER BY director_key, id', key) or
+                self.__movies("SELECT data FROM movies WHERE director_key >= ? AND director_key < ? "
+                              "ORDER BY director_key, id", key, key + '\U0010ffff'))
+
+    def has_likes(self, owner: str) -> bool:
+        return self.get_meta(f'likes_synced_at:{owner}') is not None
+
+    def replace_likes(self, owner: str, movies: Iterable[Dict[str, Any]]) -> None:
+        def replace(db: sqlite3.Connection) -> None:
+            db.execute('DELETE FROM likes WHERE owner = ?', (owner,))
+            db.executemany('INSERT OR REPLACE INTO likes VALUES (?, ?, ?)',
+                           ((owner, movie['id'], json.dumps(movie)) for movie in movies))
+            db.execute('INSERT OR REPLACE INTO meta VALUES (?, ?)', (f'likes_synced_at:{owner}', str(time.time())))
+
+        self.__transaction(replace)
+
+    def like(self, owner: str, movie_id: int) -> None:
+        movie = self.movie(movie_id)
+        self.__write('INSERT OR REPLACE INTO likes VALUES (?, ?, ?)',
+                     owner, movie_id, json.dumps(movie if movie is not None else {'id': movie_id}))
+
+    def unlike(self, owner: str, movie_id: int) -> None:
+        self.__write('DELETE FROM likes WHERE owner = ? AND movie_id = ?', owner, movie_id)
+
+    def liked_movies(self, owner: str) -> List[Dict[str, Any]]:
+        return self.__movies('SELECT data FROM likes WHERE owner = ? ORDER BY movie_id', owner)
+
+    def enqueue(self, owner: str, method: str, path: str, request: Dict[str, Any]) -> int:
+        return self.__write('INSERT INTO outbox (owner, method, path, request) VALUES (?, ?, ?, ?)',
+                            owner, method, path, json.dumps(request)).lastrowid
+
+    def pending(self, owner: Optional[str] = None) -> List[QueuedWrite]:
+        if owner is None:
+            rows = self.__query('SELECT seq, owner, method, path, request FROM outbox ORDER BY seq')
+        else:
+            rows = self.__query('SELECT seq, owner, method, path, request FROM outbox WHERE owner = ? ORDER BY seq',
+                                owner)
+        return [QueuedWrite(seq, owner, method, path, json.loads(request))
+                for seq, owner, method, path, request in rows]
+
+    def done(self, seq: int) -> None:
+        self.__write('DELETE FROM outbox WHERE seq = ?', seq)
+
+
+class SyncEngine:
+    def __init__(self, replica: Replica, pool: HttpPool, api_server: str, interval: float = 30.0,
+                 min_interval: float = 2.0, chunk_size: int = 64 * 1024):
+        self.replica = replica
+        self.__pool = pool
+        self.__api_server = api_server
+        self.__interval = interval
+        self.__min_interval = min_interval
+        self.__chunk_size = chunk_size
+        self.__lock = threading.Lock()
+        self.__sync_lock = threading.Lock()
+        self.__sessions: Dict[str, str] = {}
+        self.__counters = {'syncs': 0, 'failures': 0, 'replayed': 0, 'rejected': 0}
+        self.__online: Optional[bool] = None
+        self.__last_attempt = 0.0
+        self.__wake = threading.Event()
+        self.__stopped = threading.Event()
+        self.__thread: Optional[threading.Thread] = None
+
+    @property
+    def stats(self) -> SyncStats:
+        with self.__lock:
+            return SyncStats(**self.__counters, online=self.__online)
+
+    @property
+    def online(self) -> Optional[bool]:
+        return self.__online
+
+    def login(self, token: str, owner: str) -> None:
+        with self.__lock:
+            self.__sessions[token] = owner
+        self.request()
+
+    def logout(self, token: str) -> None:
+        with self.__lock:
+            self.__sessions.pop(token, None)
+
+    def owner(self, token: str) -> Optional[str]:
+        with self.__lock:
+            return self.__sessions.get(token)
+
+    def request(self) -> None:
+        # wakes the background loop, at most once every `min_interval` seconds
+        if time.monotonic() - self.__last_attempt >= self.__min_interval:
+            self.__wake.set()
+
+    def start(self) -> None:
+        with self.__lock:
+            if self.__thread is not None:
+                return
+            self.__thread = threading.Thread(target=self.__loop, name='replica-sync', daemon=True)
+        self.__wake.set()
+        self.__thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self.__stopped.set()
+        self.__wake.set()
+        thread = self.__thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def __loop(self) -> None:
+        while not self.__stopped.is_set():
+            self.__wake.wait(self.__interval)
+            self.__wake.clear()
+            if self.__stopped.is_set():
+                return
+            self.sync_once()
+
+    def sync_once(self) -> bool:
+        with self.__sync_lock:
+            self.__last_attempt = time.monotonic()
+            with self.__lock:
+                sessions = dict(self.__sessions)
+            try:
+                for token, owner in sessions.items():
+                    self.__replay(token, owner)
+                self.__pull_movies()
+                for token, owner in sessions.items():
+                    self.__pull_likes(token, owner)
+            except requests.RequestException:
+                self.__count('failures')
+                self.__online = False
+                return False
+            self.__count('syncs')
+            self.__online = True
+            return True
+
+    def __count(self, counter: str, amount: int = 1) -> None:
+        with self.__lock:
+            self.__counters[counter] += amount
+
+    def __request(self, method: str, path: str, token: Optional[str] = None, **kwargs) -> requests.Response:
+        headers = dict(kwargs.pop('headers', {}))
+        if token is not None:
+            headers['Authorization'] = f'Token {token}'
+        return self.__pool.request(method, f'{self.__api_server}{path}', headers=headers, **kwargs)
+
+    def __replay(self, token: str, owner: str) -> None:
+        for write in self.replica.pending(owner):
+            res = self.__request(write.method, write.path, token, **write.request)
+            if res.status_code >= 500:
+                # the server is back but not healthy, the write waits for the next round
+                return
+            self.replica.done(write.seq)
+            self.__count('replayed' if res.status_code < 400 else 'rejected')
+
+    def __pull_movies(self) -> None:
+        etag = self.replica.get_meta('movies_etag') if self.replica.has_movies() else None
+        with self.__request('get', '/movies/', headers={'If-None-Match': etag} if etag else {}, stream=True) as res:
+            if res.status_code == 304:
+                self.replica.set_meta('movies_synced_at', str(time.time()))
+            elif res.status_code == 200:
+                self.replica.replace_movies(iter_json_array(res.iter_content(chunk_size=self.__chunk_size)),
+                                            res.headers.get('ETag'))
+
+    def __pull_likes(self, token: str, owner: str) -> None:
+        res = self.__request('get', '/movies/user_liked_movies/', token)
+        if res.status_code == 200:
+            self.replica.replace_likes(owner, res.json())
@@ -0,0 +1,162 @@
+import socket
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from typeguard import typechecked
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from valid8 import validate
+
+from validation.dataclasses import validate_dataclass
+
+
+@dataclass(frozen=True)
+@typechecked
+class PoolConfig:
+    pool_connections: int = 4
+    pool_maxsize: int = 16
+    pool_block: bool = False
+    keep_alive: bool = True
+    dns_cache_ttl: float = 300.0
+    warm_up_timeout: float = 0.5
+
+    def __post_init__(self):
+        validate_dataclass(self)
+        validate('pool_connections', self.pool_connections, min_value=1,
+                 help_msg="The number of cached host pools must be at least 1.")
+        validate('pool_maxsize', self.pool_maxsize, min_value=1,
+                 help_msg="The number of connections per host must be at least 1.")
+        validate('dns_cache_ttl', self.dns_cache_ttl, min_value=0.0,
+                 help_msg="The DNS cache TTL cannot be negative.")
+        validate('warm_up_timeout', self.warm_up_timeout, min_value=0.0,
+                 help_msg="The warm up timeout cannot be negative.")
+
+
+class DnsCache:
+    # keeps every address of a host, so a connection can still fall back to the next one as urllib3 does
+    def __init__(self, ttl: float):
+        self.__ttl = ttl
+        self.__lock = threading.Lock()
+        self.__entries: Dict[Tuple[str, int], Tuple[float, Tuple[str, ...]]] = {}
+
+    def resolve(self, host: str, port: int) -> Tuple[str, ...]:
+        if self.__ttl <= 0:
+            return (host,)
+        now = time.monotonic()
+        with self.__lock:
+            entry = self.__entries.get((host, port))
+        if entry is not None and entry[0] > now:
+            return entry[1]
+        try:
+            infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        except OSError:
+            # let the connection report the resolution error as it would without the cache
+            return (host,)
+        addresses = tuple(dict.fromkeys(info[4][0] for info in infos)) or (host,)
+        with self.__lock:
+            self.__entries[(host, port)] = (now + self.__ttl, addresses)
+        return addresses
+
+    def prefer(self, host: str, port: int, address: str) -> None:
+        # the address that answered is tried first by the next connections
+        with self.__lock:
+            entry = self.__entries.get((host, port))
+            if entry is not None and address in entry[1] and entry[1][0] != address:
+                self.__entries[(host, port)] = (entry[0], (address,) + tuple(a for a in entry[1] if a != address))
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__entries.clear()
+
+
+def _resolving_pool(pool_cls: Any, connection_cls: Any, dns_cache: DnsCache) -> Any:
+    # urllib3 connects to `_dns_host`, and `host` reads it back, so the address is set only while the socket is
+    # opened; TLS and the Host header then see the name again. Each address is tried in turn, as urllib3 does.
+    def _new_conn(self):
+        name = self._dns_host
+        addresses = dns_cache.resolve(name, self.port)
+        for i, address in enumerate(addresses):
+            self._dns_host = address
+            try:
+                conn = connection_cls._new_conn(self)
+            except (NewConnectionError, ConnectTimeoutError):
+                if i == len(addresses) - 1:
+                    raise
+                continue
+            finally:
+                self._dns_host = name
+            dns_cache.prefer(name, self.port, address)
+            return conn
+
+    connection = type(connection_cls.__name__, (connection_cls,), {'_new_conn': _new_conn})
+    return type(pool_cls.__name__, (pool_cls,), {'ConnectionCls': connection})
+
+
+class PooledAdapter(HTTPAdapter):
+    def __init__(self, config: PoolConfig, dns_cache: DnsCache):
+        self.__dns_cache = dns_cache
+        super().__init__(pool_connections=config.pool_connections, pool_maxsize=config.pool_maxsize,
+                         pool_block=config.pool_block)
+
+    def init_poolmanager(self, *args, **kwargs) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _resolving_pool(HTTPConnectionPool, HTTPConnection, self.__dns_cache),
+            'https': _resolving_pool(HTTPSConnectionPool, HTTPSConnection, self.__dns_cache),
+        }
+
+
+@dataclass(frozen=True)
+@typechecked
+class HttpPool:
+    config: PoolConfig = field(default_factory=PoolConfig)
+    __state: Dict[str, Any] = field(default_factory=dict, repr=False, compare=False, init=False)
+    __lock: Any = field(default_factory=threading.Lock, repr=False, compare=False, init=False)
+
+    @property
+    def session(self) -> requests.Session:
+        with self.__lock:
+            return self.__open()['session']
+
+    @property
+    def dns_cache(self) -> DnsCache:
+        with self.__lock:
+            return self.__open()['dns_cache']
+
+    def __open(self) -> Dict[str, Any]:
+        if 'session' not in self.__state:
+            dns_cache = DnsCache(self.config.dns_cache_ttl)
+            session = requests.Session()
+            adapter = PooledAdapter(self.config, dns_cache)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            if not self.config.keep_alive:
+                session.headers['Connection'] = 'close'
+            self.__state.update(session=session, dns_cache=dns_cache)
+        return self.__state
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        return self.session.request(method, url, **kwargs)
+
+    def warm_up(self, url: str) -> bool:
+        parts = urlsplit(url)
+        if parts.hostname is not None:
+            self.dns_cache.resolve(parts.hostname, parts.port or (443 if parts.scheme == 'https' else 80))
+        try:
+            self.session.head(url, timeout=self.config.warm_up_timeout)
+            return True
+        except requests.RequestException:
+            return False
+
+    def close(self) -> None:
+        with self.__lock:
+            session: Optional[requests.Session] = self.__state.pop('session', None)
+            self.__state.pop('dns_cache', None)
+        if session is not None:
+            session.close()
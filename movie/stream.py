@@ -0,0 +1,87 @@
+import codecs
+import json
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+from typeguard import typechecked
+
+
+def iter_json_array(chunks: Iterable[bytes]) -> Iterator[Any]:
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder('utf-8')()
+    buffer, pos, started, finished = '', 0, False, False
+    chunks = iter(chunks)
+    while True:
+        chunk = next(chunks, None)
+        final = chunk is None
+        buffer = buffer[pos:] + (text.decode(b'', final=True) if final else text.decode(chunk))
+        pos = 0
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+            if pos == len(buffer):
+                break
+            if not started:
+                if buffer[pos] != '[':
+                    raise ValueError(f'Expected a JSON array, found {buffer[pos]!r}')
+                started, pos = True, pos + 1
+                continue
+            if buffer[pos] == ']':
+                finished = True
+                break
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if final:
+                    raise
+                break
+            # a scalar that touches the end of the buffer may continue in the next chunk
+            if end == len(buffer) and not final:
+                break
+            pos = end
+            yield value
+        if finished:
+            return
+        if final:
+            raise ValueError('Unterminated JSON array')
+
+
+@dataclass(frozen=True)
+@typechecked
+class ListingStats:
+    rows: int = 0
+    pages: int = 0
+    time_to_first_row: Optional[float] = None
+    elapsed: float = 0.0
+
+
+class ListingMetrics:
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__last = ListingStats()
+        self.__count = 0
+
+    @property
+    def last(self) -> ListingStats:
+        with self.__lock:
+            return self.__last
+
+    @property
+    def count(self) -> int:
+        with self.__lock:
+            return self.__count
+
+    def track(self, rows: Iterable[Any], pages: Callable[[], int] = lambda: 0) -> Iterator[Any]:
+        start, first, count = time.perf_counter(), None, 0
+        try:
+            for row in rows:
+                if first is None:
+                    first = time.perf_counter() - start
+                count += 1
+                yield row
+        finally:
+            with self.__lock:
+                self.__last = ListingStats(count, pages(), first, time.perf_counter() - start)
+                self.__count += 1
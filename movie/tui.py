@@ -0,0 +1,147 @@
+from collections.abc import Sequence
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import curses
+except ImportError:  # Python builds without curses keep printing tables
+    curses = None
+
+from movie.render import MOVIE_COLUMNS, Column, TableRenderer
+
+Line = Tuple[str, bool]
+
+HELP = 'j/k, PgUp/PgDn, g/G: move   number + Enter: go to row   q: back'
+
+
+def available() -> bool:
+    return curses is not None
+
+
+class ListView:
+    # the scroll state of a list shown `height` rows at a time; rows are read only while they are on screen
+    def __init__(self, rows: Sequence, height: int = 1):
+        self.rows = rows
+        self.height = max(1, height)
+        self.top = 0
+        self.cursor = 0
+
+    def resize(self, height: int) -> None:
+        self.height = max(1, height)
+        self.__scroll()
+
+    def move(self, delta: int) -> None:
+        self.jump(self.cursor + delta)
+
+    def page(self, pages: int) -> None:
+        self.move(pages * self.height)
+
+    def jump(self, index: int) -> None:
+        self.cursor = max(0, min(index, len(self.rows) - 1))
+        self.__scroll()
+
+    def __scroll(self) -> None:
+        if self.cursor < self.top:
+            self.top = self.cursor
+        elif self.cursor >= self.top + self.height:
+            self.top = self.cursor - self.height + 1
+        self.top = max(0, min(self.top, len(self.rows) - self.height))
+
+    def visible(self) -> List[Tuple[int, Dict[str, Any]]]:
+        return [(i, self.rows[i]) for i in range(self.top, min(self.top + self.height, len(self.rows)))]
+
+
+class Screen:
+    # remembers what every line shows, so a redraw writes only the lines that changed
+    def __init__(self, write_line: Callable[[int, str, bool], None]):
+        self.__write_line = write_line
+        self.__lines: List[Optional[Line]] = []
+
+    def draw(self, lines: List[Line]) -> int:
+        if len(self.__lines) != len(lines):
+            self.__lines = [None] * len(lines)
+        written = 0
+        for y, line in enumerate(lines):
+            if self.__lines[y] != line:
+                self.__write_line(y, *line)
+                self.__lines[y] = line
+                written += 1
+        return written
+
+    def invalidate(self) -> None:
+        self.__lines = []
+
+
+class MovieBrowser:
+    # full screen movie list: a title, the column header, as many rows as fit and a status line
+    CHROME = 4
+
+    def __init__(self, columns: Tuple[Column, ...] = MOVIE_COLUMNS, cached_rows: int = 1024):
+        # the row cache is bounded, so memory does not grow with the catalog either
+        self.__renderer = TableRenderer(columns, max_cached_rows=cached_rows)
+
+    def show(self, rows: Sequence, title: str) -> None:
+        curses.wrapper(self.run, rows, title)
+
+    def frame(self, view: ListView, title: str, width: int, status: str) -> List[Line]:
+        def fit(text: str) -> str:
+            return text.expandtabs()[:width].ljust(width)
+
+        lines = [(fit(title), True), (fit(self.__renderer.header), False), (fit('-' * width), False)]
+        lines += [(fit(self.__renderer.format_row(movie).rstrip('\n')), i == view.cursor)
+                  for i, movie in view.visible()]
+        lines += [(fit(''), False)] * (view.height - len(lines) + self.CHROME - 1)
+        lines.append((fit(status), True))
+        return lines
+
+    def run(self, window: Any, rows: Sequence, title: str) -> None:
+        try:
+            curses.curs_set(0)
+        except curses.error:
+            pass
+
+        def write_line(y: int, text: str, highlight: bool) -> None:
+            try:
+                # the last cell of the screen cannot be written without scrolling, so lines stop one short
+                window.addnstr(y, 0, text, max(0, len(text) - 1), curses.A_REVERSE if highlight else curses.A_NORMAL)
+            except curses.error:
+                pass
+
+        view, screen, digits = ListView(rows), Screen(write_line), ''
+        while True:
+            height, width = window.getmaxyx()
+            view.resize(height - self.CHROME)
+            position = f'{view.cursor + 1}/{len(rows)}' if len(rows) else '0/0'
+            status = f' Go to row: {digits}' if digits else f' {position}   {HELP}'
+            screen.draw(self.frame(view, title, width, status)[:height])
+            window.refresh()
+            key = window.getch()
+            if key in (ord('q'), 27):
+                if not digits:
+                    return
+                digits = ''
+            elif ord('0') <= key <= ord('9'):
+                digits += chr(key)
+            elif key in (curses.KEY_ENTER, 10, 13):
+                if digits:
+                    view.jump(int(digits) - 1)
+                digits = ''
+            elif key in (curses.KEY_BACKSPACE, 127, 8):
+                digits = digits[:-1]
+            elif key == curses.KEY_RESIZE:
+                window.clear()
+                screen.invalidate()
+            else:
+                self.__move(view, key)
+
+    @staticmethod
+    def __move(view: ListView, key: int) -> None:
+        moves = {curses.KEY_UP: -1, ord('k'): -1, curses.KEY_DOWN: 1, ord('j'): 1}
+        pages = {curses.KEY_PPAGE: -1, ord('b'): -1, curses.KEY_NPAGE: 1, ord(' '): 1}
+        if key in moves:
+            view.move(moves[key])
+        elif key in pages:
+            view.page(pages[key])
+        elif key in (curses.KEY_HOME, ord('g')):
+            view.jump(0)
+        elif key in (curses.KEY_END, ord('G')):
+            view.jump(len(view.rows) - 1)
@@ -1,3 +1,7 @@
+import os
+import subprocess
+import sys
+import threading
 from unittest.mock import patch
 
 import pytest
@@ -5,12 +9,15 @@ import requests_mock
 from requests.exceptions import ConnectionError
 
 from app import App, main
-from movie.domain import MovieDealer, Title, Movie, Description, Year, Director, Category, Id, ImageUrl
+from movie.domain import MovieDealer, Title, Movie, Description, Year, Director, Category, Id, ImageUrl, UpdateOutcome
 
 
 @pytest.fixture
 def app():
-    yield App()
+    app = App()
+    # requests mocked by a test must not see the warm-up
+    assert app.wait_ready(10)
+    yield app
 
 
 @pytest.fixture
@@ -58,6 +65,53 @@ def test_main(mock_print, mock_input):
     mock_print.assert_called()
 
 
+@patch('builtins.input', side_effect=['0'])
+@patch('builtins.print')
+def test_app_warms_up_and_closes_movie_dealer(mock_print, mock_input):
+    with patch.object(MovieDealer, 'warm_up', return_value=True) as warm_up:
+        with patch.object(MovieDealer, 'close') as close:
+            App().run()
+            warm_up.assert_called_once()
+            close.assert_called_once()
+
+
+# STARTUP TEST
+
+# `import app` took about 4.5s when it imported the domain eagerly; the budget leaves room for slow machines
+IMPORT_BUDGET_SECONDS = 1.5
+HEAVY_MODULES = {'movie.domain', 'movie.cli', 'movie.importer', 'movie.replica', 'movie.likes', 'requests', 'sqlite3'}
+
+
+def import_times(module: str) -> dict:
+    # cumulative import time in seconds of every module imported by `import module`, as -X importtime reports it
+    res = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], capture_output=True,
+                         text=True, check=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    times = {}
+    for line in res.stderr.splitlines():
+        if line.startswith('import time:') and 'self [us]' not in line:
+            _, cumulative, name = line.split('|')
+            times[name.strip()] = int(cumulative) / 1_000_000
+    return times
+
+
+def test_import_leaves_the_heavy_modules_for_later():
+    times = import_times('app')
+    assert not HEAVY_MODULES & times.keys()
+    assert times['app'] < IMPORT_BUDGET_SECONDS
+
+
+@patch('builtins.input', side_effect=['0'])
+@patch('builtins.print')
+def test_menu_is_shown_before_the_dealer_is_ready(mock_print, mock_input):
+    shown, menu_shown_first = threading.Event(), []
+    with patch.object(MovieDealer, 'warm_up', side_effect=lambda: menu_shown_first.append(shown.wait(5))):
+        app = App()
+        with patch('movie.menu.Menu.run', side_effect=lambda: shown.set()):
+            app.run()
+    assert menu_shown_first == [True]
+    assert app.wait_ready(0)
+
+
 # SIGN UP OPERATION TEST
 @patch('builtins.input', side_effect=['1', 'username', 'test@email.it', '0'])
 @patch('builtins.print')
@@ -169,6 +223,26 @@ def test_logout_prints_correctly_when_logout_fails(mock_print, mock_input, app):
                 mock_print.assert_called()
 
 
+@patch('builtins.input', side_effect=['2', 'username', '12', '0'])  # login -> logout -> terminazione programma
+@patch('builtins.print')
+def test_logout_reports_unsent_likes(mock_print, mock_input, app):
+    with patch.object(MovieDealer, 'logout', return_value=True) as logout:
+        with patch.object(MovieDealer, 'login', return_value="token") as login:
+            with patch.object(MovieDealer, 'flush_likes', side_effect=[2, 0]) as flush_likes:
+                with patch('getpass.getpass', side_effect=['Password43210wewe?']) as password:
+                    app.run()
+                    flush_likes.assert_any_call('token')
+                    mock_print.assert_any_call("Couldn't save 2 like changes, the server is not reachable...")
+
+
+@patch('builtins.input', side_effect=['0'])
+@patch('builtins.print')
+def test_exit_reports_unsent_likes(mock_print, mock_input, app):
+    with patch.object(MovieDealer, 'flush_likes', return_value=1):
+        app.run()
+        mock_print.assert_any_call("Couldn't save 1 like changes, the server is not reachable...")
+
+
 # ADD LIKE OPERATION TEST
 
 @patch('builtins.input', side_effect=['3', '0'])  # add like -> id movie -> terminazione programma
@@ -203,6 +277,18 @@ def test_add_like_prints_correctly_when_unsuccessful(mock_print, mock_input, app
                 mock_print.assert_called()
 
 
+@patch('builtins.input', side_effect=['2', 'username', '3', '1-3,7', '0'])
+@patch('builtins.print')
+def test_add_like_accepts_id_lists_and_ranges(mock_print, mock_input, app):
+    with patch('getpass.getpass', side_effect=['Password43210wewe?']):
+        with patch.object(MovieDealer, 'login', return_value="token"):
+            with patch.object(MovieDealer, 'add_likes', return_value={1: True, 2: False, 3: True, 7: False}) as add_likes:
+                app.run()
+                add_likes.assert_called_once_with('token', [Id(1), Id(2), Id(3), Id(7)])
+                mock_print.assert_any_call("Liked 2 of 4 movies.")
+                mock_print.assert_any_call("Couldn't like the movies with ids 2, 7...")
+
+
 # REMOVE LIKE OPERATION TEST
 @patch('builtins.input', side_effect=['4', '0'])  # remove like -> id movie -> terminazione programma
 @patch('builtins.print')
@@ -236,6 +322,18 @@ def test_remove_like_prints_correctly_when_unsuccessful(mock_print, mock_input,
                 mock_print.assert_called()
 
 
+@patch('builtins.input', side_effect=['2', 'username', '4', '5-1', '5-6', '0'])
+@patch('builtins.print')
+def test_remove_like_accepts_ranges(mock_print, mock_input, app):
+    with patch('getpass.getpass', side_effect=['Password43210wewe?']):
+        with patch.object(MovieDealer, 'login', return_value="token"):
+            with patch.object(MovieDealer, 'remove_likes', return_value={5: True, 6: True}) as remove_likes:
+                app.run()
+                remove_likes.assert_called_once_with('token', [Id(5), Id(6)])
+                mock_print.assert_any_call("Invalid value type.")
+                mock_print.assert_any_call("Removed like from 2 of 2 movies.")
+
+
 # ADD MOVIE TEST
 
 @patch('builtins.input', side_effect=['5', '0'])  # add movie -> terminazione programma
@@ -285,6 +383,42 @@ def test_add_movie_prints_correctly_when_unsuccessful(mock_print, mock_input, ap
                     mock_print.assert_called()
 
 
+# IMPORT MOVIES TEST
+@patch('builtins.input', side_effect=['13', '0'])
+@patch('builtins.print')
+def test_import_movies_prints_correctly_when_not_logged_in(mock_print, mock_input, app):
+    app.run()
+    mock_print.assert_any_call("You must be logged to import movies!")
+
+
+def test_import_movies_uploads_file_and_writes_error_report(tmp_path, app):
+    path = tmp_path / 'movies.jsonl'
+    path.write_text('{"title": "A title", "description": "A description", "year": 2020, "category": "ACTION", '
+                    '"director": "Stanley Kubrick", '
+                    '"image_url": "https://image.tmdb.org/t/p/w500/6KErczPBROQty7QoIsaa6wJYXZi.jpg"}\n'
+                    '{"title": ""}\n')
+    with patch('builtins.input', side_effect=['2', 'username', '13', str(path), '0']), \
+            patch('builtins.print') as mock_print, \
+            patch('getpass.getpass', side_effect=['Password43210wewe?']), \
+            patch.object(MovieDealer, 'login', return_value="token"), \
+            patch.object(MovieDealer, 'is_admin_user', return_value=True), \
+            patch.object(MovieDealer, 'add_movie', return_value=True) as add_movie:
+        app.run()
+        add_movie.assert_called_once()
+        mock_print.assert_any_call(f"Rows with errors are listed in {path}.errors.csv")
+    assert (tmp_path / 'movies.jsonl.errors.csv').read_text().splitlines()[1].startswith('2,validation,')
+
+
+@patch('builtins.input', side_effect=['2', 'username', '13', 'missing.csv', '0'])
+@patch('builtins.print')
+def test_import_movies_prints_correctly_when_file_is_missing(mock_print, mock_input, app):
+    with patch('getpass.getpass', side_effect=['Password43210wewe?']):
+        with patch.object(MovieDealer, 'login', return_value="token"):
+            with patch.object(MovieDealer, 'is_admin_user', return_value=True):
+                app.run()
+                mock_print.assert_any_call("File missing.csv not found!")
+
+
 # UPDATE MOVIE TEST
 
 @patch('builtins.input', side_effect=['6', '0'])  # update movie -> terminazione programma
@@ -319,6 +453,27 @@ def test_update_movie_prints_correctly_when_movie_not_found(mock_print, mock_inp
                             mock_print.assert_any_call(f"Movie with id {movie['id']} not found!")
                             mock_print.assert_called()
 
+@pytest.mark.parametrize('outcome, message', [
+    (UpdateOutcome.UPDATED, "Movie updated successfully!"),
+    (UpdateOutcome.UNCHANGED, "Nothing to update."),
+    (UpdateOutcome.CONFLICT, "The movie was changed by someone else in the meantime, please try again."),
+    (UpdateOutcome.FAILED, "Couldn't update the movie..."),
+])
+@patch('builtins.print')
+def test_update_movie_prints_the_outcome(mock_print, app, movie, outcome, message):
+    answers = ['2', 'username', '6', '1', 'y', 'New title', 'n', 'n', 'n', 'n', 'n', '0']
+    with patch('builtins.input', side_effect=answers):
+        with patch('getpass.getpass', side_effect=['Password43210wewe?']):
+            with patch.object(MovieDealer, 'login', return_value="token"):
+                with patch.object(MovieDealer, 'is_admin_user', return_value=True):
+                    with patch.object(App, '_App__list_movies', return_value=None):
+                        with patch.object(MovieDealer, 'get_movie', return_value=dict(movie)):
+                            with patch.object(MovieDealer, 'patch_movie', return_value=outcome) as patch_movie:
+                                app.run()
+    patch_movie.assert_called_once_with('token', movie, {**movie, 'title': 'New title'})
+    mock_print.assert_any_call(message)
+
+
 # REMOVE MOVIE TEST
 
 @patch('builtins.input', side_effect=['7', '0'])  # remove movie -> terminazione programma
@@ -384,12 +539,39 @@ def test_remove_movie_prints_correctly_when_unsuccessful(mock_print, mock_input,
                                 mock_print.assert_called()
 
 
+@patch('builtins.input', side_effect=['2', 'username', '7', '99', '0'])  # login -> remove movie -> terminazione programma
+@patch('builtins.print')
+def test_remove_movie_rejects_unknown_id_without_asking_the_server(mock_print, mock_input, app, movie):
+    with patch('getpass.getpass', side_effect=['Password43210wewe?']) as password:
+        with patch.object(MovieDealer, 'login', return_value="token") as login:
+            with patch.object(MovieDealer, 'is_admin_user', return_value=True) as is_admin_user:
+                with requests_mock.Mocker() as request_mock:
+                    request_mock.get('http://localhost:8000/api/v1/movies/', json=[movie])
+                    app.run()
+                    assert [r.path for r in request_mock.request_history] == ['/api/v1/movies/']
+                mock_print.assert_any_call("Movie with id 99 not found!")
+
+
+@patch('builtins.input', side_effect=['2', 'username', '7', '1', '0'])  # login -> remove movie -> terminazione programma
+@patch('builtins.print')
+def test_remove_movie_takes_the_record_from_the_listing(mock_print, mock_input, app, movie):
+    with patch('getpass.getpass', side_effect=['Password43210wewe?']) as password:
+        with patch.object(MovieDealer, 'login', return_value="token") as login:
+            with patch.object(MovieDealer, 'is_admin_user', return_value=True) as is_admin_user:
+                with requests_mock.Mocker() as request_mock:
+                    request_mock.get('http://localhost:8000/api/v1/movies/', json=[movie])
+                    request_mock.delete('http://localhost:8000/api/v1/movies/1/', status_code=204)
+                    app.run()
+                    assert [r.method for r in request_mock.request_history] == ['GET', 'DELETE']
+                mock_print.assert_any_call("Movie removed successfully!")
+
+
 # SHOW ALL MOVIES OPERATION TEST
 
 @patch('builtins.input', side_effect=['9', '0'])  # list movies -> terminazione programma
 @patch('builtins.print')
 def test_list_movies_prints_correctly_when_no_movies_found(mock_print, mock_input, app):
-    with patch.object(MovieDealer, 'get_movies', return_value=[]) as get_movies:
+    with patch.object(MovieDealer, 'iter_movies', return_value=iter([])) as iter_movies:
         app.run()
         mock_print.assert_any_call("No movies found...")
         mock_print.assert_called()
@@ -398,16 +580,32 @@ def test_list_movies_prints_correctly_when_no_movies_found(mock_print, mock_inpu
 @patch('builtins.input', side_effect=['9', '0'])  # list movies -> terminazione programma
 @patch('builtins.print')
 def test_show_movies_prints_correctly(mock_print, mock_input, app):
-    with patch.object(MovieDealer, 'get_movies', return_value=[{"id": 1, "title": "title", "description": "description",
-                                                                "year": 2020, "category": "category",
-                                                                "image_url": "image_url",
-                                                                "director": "director"}]) as get_movies:
+    with patch.object(MovieDealer, 'iter_movies', return_value=iter([{"id": 1, "title": "title",
+                                                                      "description": "description",
+                                                                      "year": 2020, "category": "category",
+                                                                      "image_url": "image_url",
+                                                                      "director": "director"}])) as iter_movies:
         app.run()
         mock_print.assert_any_call("ALL MOVIES")
         mock_print.assert_any_call(
             '{:4}\t{:40}\t{:25}\t{:15}\t{:4}'.format('ID', 'TITLE', 'DIRECTOR', 'CATEGORY', 'YEAR'))
 
 
+@patch('builtins.input', side_effect=['9', '0'])  # list movies -> terminazione programma
+@patch('builtins.print')
+def test_list_movies_prints_rows_as_they_arrive(mock_print, mock_input, app, movie):
+    row = '{:4}\t{:40}\t{:25}\t{:15}\t{:4}\n'
+
+    def rows():
+        yield movie
+        mock_print.assert_any_call(row.format(1, 'A title', 'A director', 'ACTION', 2020), end='')
+        yield {**movie, 'id': 2}
+
+    with patch.object(MovieDealer, 'iter_movies', return_value=rows()):
+        app.run()
+        mock_print.assert_any_call(row.format(2, 'A title', 'A director', 'ACTION', 2020), end='')
+
+
 # SORT MOVIES BY TITLE OPERATION TEST
 
 @patch('builtins.input', side_effect=['10', '0'])  # sort movies by title -> terminazione programma
@@ -488,3 +686,57 @@ def test_filter_movies_by_director_prints_correctly_when_successful(mock_print,
         mock_print.assert_any_call('MOVIES FILTERED BY DIRECTOR')
         mock_print.assert_any_call(
             '{:4}\t{:40}\t{:25}\t{:15}\t{:4}'.format('ID', 'TITLE', 'DIRECTOR', 'CATEGORY', 'YEAR'))
+
+
+# STATS OPERATION TEST
+
+@patch('builtins.input', side_effect=['14', 'q', '0'])
+@patch('builtins.print')
+def test_stats_prints_correctly_when_nothing_was_sent(mock_print, mock_input, app):
+    app.run()
+    mock_print.assert_any_call('No requests sent yet...')
+
+
+@patch('builtins.print')
+def test_stats_shows_and_exports_the_endpoints(mock_print, app, tmp_path):
+    path = str(tmp_path / 'stats.prom')
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get('http://localhost:8000/api/v1/movies/sort-by-title/', json=[])
+        with patch('builtins.input', side_effect=['10', '14', path, 'q', '0']):
+            app.run()
+    printed = [call.args[0] for call in mock_print.call_args_list if call.args]
+    assert any(str(line).startswith('GET     /movies/sort-by-title/') for line in printed)
+    mock_print.assert_any_call(f'Stats exported as prometheus to {path}')
+    assert 'path="/movies/sort-by-title/"' in (tmp_path / 'stats.prom').read_text()
+
+
+# FULL SCREEN TEST
+
+@patch('builtins.input', side_effect=['9', '10', '0'])  # list movies -> sort by title -> terminazione programma
+@patch('builtins.print')
+def test_full_screen_shows_listings_in_the_browser(mock_print, mock_input, movies):
+    with patch('sys.stdout.isatty', return_value=True):
+        app = App(full_screen=True)
+    assert app.wait_ready(10)
+    with patch('movie.tui.MovieBrowser.show') as show:
+        with patch.object(MovieDealer, 'get_movies', return_value=movies) as get_movies:
+            with patch.object(MovieDealer, 'sort_movies_by_title', return_value=movies[::-1]):
+                app.run()
+    get_movies.assert_called_once()
+    assert show.call_args_list[0].args == (movies, 'ALL MOVIES')
+    assert show.call_args_list[1].args == (movies[::-1], 'MOVIES SORTED BY TITLE')
+
+
+@patch('builtins.input', side_effect=['9', '0'])  # list movies -> terminazione programma
+@patch('builtins.print')
+def test_full_screen_falls_back_to_tables_without_a_terminal(mock_print, mock_input, movies):
+    with patch('sys.stdout.isatty', return_value=False):
+        app = App(full_screen=True)
+    assert app.wait_ready(10)
+    with patch('movie.tui.MovieBrowser.show') as show:
+        with patch.object(MovieDealer, 'iter_movies', return_value=iter([{'id': 1, 'title': 'A title',
+                                                                           'director': 'A director',
+                                                                           'category': 'ACTION', 'year': 2020}])):
+            app.run()
+    show.assert_not_called()
+    mock_print.assert_any_call('ALL MOVIES')
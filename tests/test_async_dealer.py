@@ -0,0 +1,116 @@
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+import requests_mock
+from valid8 import ValidationError
+
+from movie.async_dealer import AsyncMovieDealer
+from movie.domain import MovieDealer, Id, Director, Username, Password
+
+
+@pytest.fixture
+def json_movie():
+    return {'id': 1, 'title': 'Title 1', 'description': 'ADescription 1', 'year': 2020, 'category': 'ACTION',
+            'director': 'A director', 'image_url': 'https://image.tmdb.org/t/p/w500/6KErczPBROQty7QoIsaa6wJYXZi.jpg'}
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_max_concurrency_must_be_positive():
+    with pytest.raises(ValidationError):
+        AsyncMovieDealer(max_concurrency=0)
+
+
+def test_create_sizes_connection_pool_to_concurrency():
+    dealer = AsyncMovieDealer.create(max_concurrency=64, api_server='http://stub:9000/api/v1')
+    assert dealer.max_concurrency == 64
+    assert dealer.dealer.pool.config.pool_maxsize == 64
+    assert dealer.dealer.api_server == 'http://stub:9000/api/v1'
+
+
+def test_get_movies_returns_same_shape_as_movie_dealer(json_movie):
+    async def scenario():
+        async with AsyncMovieDealer() as dealer:
+            return await dealer.get_movies()
+
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get('http://localhost:8000/api/v1/movies/', json=[json_movie])
+        assert run(scenario()) == MovieDealer().get_movies() == [json_movie]
+
+
+def test_get_movie_returns_none_when_unsuccessful():
+    async def scenario():
+        async with AsyncMovieDealer() as dealer:
+            return await dealer.get_movie(Id(1))
+
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get('http://localhost:8000/api/v1/movies/1/', status_code=404)
+        assert run(scenario()) is None
+
+
+def test_login_and_add_like():
+    async def scenario():
+        async with AsyncMovieDealer() as dealer:
+            token = await dealer.login(Username('username'), Password('A_p@ssw0rd'))
+            return token, await dealer.add_like(token, Id(1))
+
+    with requests_mock.Mocker() as request_mock:
+        request_mock.post('http://localhost:8000/api/v1/auth/login/', json={'key': 'token'})
+        request_mock.post('http://localhost:8000/api/v1/likes/', status_code=201)
+        assert run(scenario()) == ('token', True)
+
+
+def test_bulk_likes():
+    async def scenario():
+        async with AsyncMovieDealer(max_concurrency=2) as dealer:
+            return await dealer.add_likes('token', [Id(1), Id(2)]), await dealer.remove_likes('token', [Id(1)])
+
+    with requests_mock.Mocker() as request_mock:
+        request_mock.post('http://localhost:8000/api/v1/likes/', status_code=201)
+        request_mock.delete('http://localhost:8000/api/v1/likes/by_movie/1/', status_code=404)
+        assert run(scenario()) == ({1: True, 2: True}, {1: False})
+
+
+def test_gather_runs_many_filters(json_movie):
+    async def scenario():
+        async with AsyncMovieDealer() as dealer:
+            return await asyncio.gather(*(dealer.filter_movies_by_director(Director('A director'))
+                                          for _ in range(50)))
+
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get('http://localhost:8000/api/v1/movies/filter-by-director/A director/', json=[json_movie])
+        assert run(scenario()) == [[json_movie]] * 50
+
+
+def test_concurrency_is_limited():
+    running, peak, lock = [0], [0], threading.Lock()
+
+    def slow_get_movies(_):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.01)
+        with lock:
+            running[0] -= 1
+        return []
+
+    async def scenario():
+        async with AsyncMovieDealer(max_concurrency=3) as dealer:
+            await asyncio.gather(*(dealer.get_movies() for _ in range(20)))
+
+    with patch.object(MovieDealer, 'get_movies', autospec=True, side_effect=slow_get_movies):
+        run(scenario())
+    assert peak[0] == 3
+
+
+def test_dealer_can_be_used_from_several_event_loops():
+    dealer = AsyncMovieDealer()
+    with patch.object(MovieDealer, 'get_movies', return_value=[]):
+        assert run(dealer.get_movies()) == []
+        assert run(dealer.get_movies()) == []
+    run(dealer.aclose())
@@ -0,0 +1,76 @@
+from datetime import datetime
+
+import pytest
+from valid8 import ValidationError
+
+from movie.domain import Title, Description, Year, Id, Category, Director, ImageUrl, Email, Password, Username, \
+    Movie, validate_column
+from validation.batch import BatchError, BatchResult, validate_batch
+
+COLUMNS = {
+    Title: ['A title', '', 'A' * 50, 'A' * 51, 'bad!title', ' lead', 1, None, 'Amélie 2'],
+    Description: ['A description', 'd' * 200, 'd' * 201, 'two  spaces', [], 'ok'],
+    Year: [1900, 1899, datetime.now().year, datetime.now().year + 1, 2000.0, '2000', True, None],
+    Id: [0, 1, -1, 10 ** 12, 1.0, '1', False, None],
+    Category: [Category.MovieCategory.ACTION, Category.MovieCategory.WESTERN, 'ACTION', 1, None],
+    Director: ['Stanley Kubrick', 'Al', "Ridley O'Scott", 'X' * 101, 'Kubrick1', None],
+    ImageUrl: ['https://image.tmdb.org/t/p/w500/abcdefghiABCDEFGH0123456789.jpg',
+               'https://image.tmdb.org/t/p/w500/short.jpg', 'http://example.com/a.jpg', '', 12],
+    Email: ['name@example.com', 'first.last@mail.it', 'no-at-sign', 'a@b', 'a' * 200 + '@b.it', None],
+    Password: ['A_p@ssw0rd', 'short1!A', 'nouppercase1!', 'NoSpecial123', 'A_p@ssw0rd' * 4, 12345678],
+    Username: ['username', 'user_name_1', '', 'with space', 'u' * 31, None],
+}
+
+
+def single(cls, value):
+    try:
+        return cls(value), None
+    except Exception as e:
+        return None, e
+
+
+@pytest.mark.parametrize('cls', list(COLUMNS))
+def test_validate_column_matches_single_instance_validation(cls):
+    values = COLUMNS[cls]
+    result = validate_column(cls, values)
+    errors = {error.index: error.error for error in result.errors}
+    valid = iter(result.valid)
+    for index, value in enumerate(values):
+        expected, expected_error = single(cls, value)
+        if expected_error is None:
+            assert index not in errors
+            assert next(valid) == expected
+        else:
+            assert type(errors[index]) is type(expected_error)
+            assert str(errors[index]) == str(expected_error)
+    assert next(valid, None) is None
+
+
+def test_validate_column_returns_working_objects():
+    result = validate_column(Title, ['A title', 'B title'])
+    assert result.ok
+    assert [str(title) for title in result.valid] == ['A title', 'B title']
+    assert sorted(result.valid, reverse=True)[0] == Title('B title')
+    assert hash(result.valid[0]) == hash(Title('A title'))
+
+
+def test_validate_column_accepts_any_iterable():
+    assert len(validate_column(Id, (i for i in range(1000))).valid) == 1000
+
+
+def test_validate_column_rejects_unsupported_classes():
+    with pytest.raises(ValidationError):
+        validate_column(Movie, [])
+
+
+def test_validate_batch_uses_constructor_for_rejected_values():
+    result = validate_batch(Title, ['A title', 'B title'], lambda value: False)
+    assert result.valid == [Title('A title'), Title('B title')]
+
+
+def test_validate_batch_reports_errors_by_index():
+    result = validate_batch(Title, ['', 'A title', 5], lambda value: False)
+    assert [error.index for error in result.errors] == [0, 2]
+    assert isinstance(result.errors[0], BatchError)
+    assert isinstance(result, BatchResult)
+    assert not result.ok
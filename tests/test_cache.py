@@ -0,0 +1,247 @@
+import threading
+
+import pytest
+import requests_mock
+from valid8 import ValidationError
+
+from movie.cache import CacheConfig, CacheStats, ResponseCache, RoleCache
+from movie.domain import MovieDealer, Id, Title, Description, Year, Category, Director, ImageUrl, Username, Password
+
+MOVIES_URL = 'http://localhost:8000/api/v1/movies/'
+
+
+@pytest.fixture
+def json_movies():
+    return [{'id': 1, 'title': 'Title 1', 'description': 'ADescription 1', 'year': 2020, 'category': 'ACTION',
+             'director': 'A director', 'image_url': 'https://image.tmdb.org/t/p/w500/6KErczPBROQty7QoIsaa6wJYXZi.jpg'}]
+
+
+def dealer_with(config: CacheConfig) -> MovieDealer:
+    return MovieDealer(cache=ResponseCache(config))
+
+
+### CacheConfig ###
+
+@pytest.mark.parametrize('values', [
+    {'ttl': -1.0},
+    {'max_stale': -1.0},
+])
+def test_invalid_cache_config_raises_exception(values):
+    with pytest.raises(ValidationError):
+        CacheConfig(**values)
+
+
+def test_cache_stats_hit_ratio():
+    assert CacheStats().hit_ratio == 0.0
+    assert CacheStats(hits=3, misses=1).hit_ratio == 0.75
+
+
+### ResponseCache ###
+
+def test_get_movies_is_served_from_cache_within_ttl(json_movies):
+    dealer = MovieDealer()
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get(MOVIES_URL, json=json_movies)
+        assert dealer.get_movies() == json_movies
+        assert dealer.get_movies() == json_movies
+        assert request_mock.call_count == 1
+    assert dealer.cache.stats == CacheStats(hits=1, misses=1)
+
+
+def test_cache_is_keyed_by_endpoint_and_query(json_movies):
+    dealer = MovieDealer()
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get(f'{MOVIES_URL}filter-by-director/A director/', json=json_movies)
+        request_mock.get(f'{MOVIES_URL}filter-by-director/B director/', json=[])
+        assert dealer.filter_movies_by_director(Director('A director')) == json_movies
+        assert dealer.filter_movies_by_director(Director('B director')) == []
+        assert request_mock.call_count == 2
+
+
+def test_failed_responses_are_not_cached(json_movies):
+    dealer = MovieDealer()
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get(MOVIES_URL, [{'status_code': 500}, {'json': json_movies}])
+        assert dealer.get_movies() == []
+        assert dealer.get_movies() == json_movies
+
+
+def test_expired_entry_is_revalidated_with_etag(json_movies):
+    dealer = dealer_with(CacheConfig(ttl=0.0, serve_stale=False))
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get(MOVIES_URL, [{'json': json_movies, 'headers': {'ETag': '"v1"'}}, {'status_code': 304}])
+        assert dealer.get_movies() == json_movies
+        assert dealer.get_movies() == json_movies
+        assert request_mock.last_request.headers['If-None-Match'] == '"v1"'
+    assert dealer.cache.stats == CacheStats(hits=1, misses=1, revalidated=1)
+
+
+def test_expired_entry_is_revalidated_with_last_modified(json_movies):
+    dealer = dealer_with(CacheConfig(ttl=0.0, serve_stale=False))
+    modified = 'Wed, 21 Oct 2015 07:28:00 GMT'
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get(MOVIES_URL, [{'json': json_movies, 'headers': {'Last-Modified': modified}},
+                                      {'status_code': 304}])
+        dealer.get_movies()
+        assert dealer.get_movies() == json_movies
+        assert request_mock.last_request.headers['If-Modified-Since'] == modified
+
+
+def test_stale_entry_is_served_while_refreshing(json_movies):
+    dealer = dealer_with(CacheConfig(ttl=0.0, max_stale=60.0))
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get(MOVIES_URL, [{'json': json_movies}, {'json': []}])
+        assert dealer.get_movies() == json_movies
+        assert dealer.get_movies() == json_movies
+        dealer.cache.join()
+        assert dealer.get_movies() == []
+        assert dealer.cache.stats.stale == 2
+
+
+def test_get_movie_returns_a_copy_of_the_cached_record(json_movies):
+    dealer = MovieDealer()
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get(f'{MOVIES_URL}1/', json=json_movies[0])
+        dealer.get_movie(Id(1))['title'] = 'Changed'
+        assert dealer.get_movie(Id(1))['title'] == 'Title 1'
+
+
+def test_update_movie_invalidates_catalog(json_movies):
+    dealer = MovieDealer()
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get(MOVIES_URL, json=json_movies)
+        request_mock.put(f'{MOVIES_URL}1/', status_code=200)
+        dealer.get_movies()
+        assert dealer.update_movie('token', json_movies[0]) is True
+        assert len(dealer.cache) == 0
+
+
+def test_remove_movie_invalidates_catalog(json_movies):
+    dealer = MovieDealer()
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get(MOVIES_URL, json=json_movies)
+        request_mock.delete(f'{MOVIES_URL}1/', status_code=204)
+        dealer.get_movies()
+        assert dealer.remove_movie('token', Id(1)) is True
+        dealer.get_movies()
+        assert request_mock.call_count == 3
+
+
+def test_add_movie_invalidates_catalog(json_movies):
+    dealer = MovieDealer()
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get(MOVIES_URL, json=json_movies)
+        request_mock.post(MOVIES_URL, status_code=201)
+        dealer.get_movies()
+        assert dealer.add_movie('token', Title('A title'), Description('descr'), Year(2020),
+                                Category(Category.MovieCategory.ACTION), Director('A director'),
+                                ImageUrl('https://image.tmdb.org/t/p/w500/6KErczPBROQty7QoIsaa6wJYXZi.jpg')) is True
+        assert len(dealer.cache) == 0
+
+
+def test_failed_mutation_keeps_catalog(json_movies):
+    dealer = MovieDealer()
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get(MOVIES_URL, json=json_movies)
+        request_mock.delete(f'{MOVIES_URL}1/', status_code=403)
+        dealer.get_movies()
+        assert dealer.remove_movie('token', Id(1)) is False
+        assert len(dealer.cache) == 1
+
+
+def test_replace_keeps_validators_and_age():
+    cache = ResponseCache()
+    old, new = [1], (1,)
+    cache.store('/movies/', old, etag='"v1"')
+    stored_at = cache.peek('/movies/').stored_at
+    assert not cache.replace('/movies/', [1], new)
+    assert cache.replace('/movies/', old, new)
+    entry = cache.peek('/movies/')
+    assert entry.value is new
+    assert entry.etag == '"v1"'
+    assert entry.stored_at == stored_at
+    assert not cache.replace('/other/', old, new)
+
+
+### RoleCache ###
+
+USER_TYPE_URL = 'http://localhost:8000/api/v1/movies/user-type/'
+
+
+def test_role_cache_prefetch_fills_in_background():
+    roles = RoleCache()
+    roles.prefetch('token', lambda: 'admin')
+    roles.join()
+    assert roles.get('token') == 'admin'
+
+
+def test_role_cache_get_waits_for_pending_prefetch():
+    roles, release = RoleCache(), threading.Event()
+    roles.prefetch('token', lambda: release.wait() and 'admin')
+    threading.Timer(0.01, release.set).start()
+    assert roles.get('token', wait=5.0) == 'admin'
+
+
+def test_role_cache_drop_discards_in_flight_prefetch():
+    roles, release = RoleCache(), threading.Event()
+    roles.prefetch('token', lambda: release.wait() and 'admin')
+    roles.drop('token')
+    release.set()
+    roles.join()
+    assert 'token' not in roles
+
+
+def test_role_cache_failed_prefetch_leaves_no_entry():
+    roles = RoleCache()
+    roles.prefetch('token', lambda: 1 / 0)
+    roles.join()
+    assert roles.get('token') is None
+
+
+def test_is_admin_user_is_cached_per_token():
+    dealer = MovieDealer()
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get(USER_TYPE_URL, json={'user-type': 'admin'})
+        assert dealer.is_admin_user('token') is True
+        assert dealer.is_admin_user('token') is True
+        assert request_mock.call_count == 1
+
+
+def test_login_prefetches_user_type():
+    dealer = MovieDealer()
+    with requests_mock.Mocker() as request_mock:
+        request_mock.post('http://localhost:8000/api/v1/auth/login/', json={'key': 'token'})
+        request_mock.get(USER_TYPE_URL, json={'user-type': 'admin'})
+        dealer.login(Username('username'), Password('A_p@ssw0rd'))
+        dealer.roles.join()
+        assert dealer.is_admin_user('token') is True
+        assert request_mock.call_count == 2
+
+
+def test_logout_drops_cached_user_type():
+    dealer = MovieDealer()
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get(USER_TYPE_URL, json={'user-type': 'admin'})
+        request_mock.post('http://localhost:8000/api/v1/auth/logout/', status_code=200)
+        dealer.is_admin_user('token')
+        dealer.logout('token')
+        assert 'token' not in dealer.roles
+
+
+@pytest.mark.parametrize('status_code', [401, 403])
+def test_unauthorized_response_drops_cached_user_type(status_code):
+    dealer = MovieDealer()
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get(USER_TYPE_URL, json={'user-type': 'admin'})
+        request_mock.post('http://localhost:8000/api/v1/likes/', status_code=status_code)
+        dealer.is_admin_user('token')
+        dealer.add_like('token', Id(1))
+        assert 'token' not in dealer.roles
+
+
+def test_is_admin_user_returns_false_when_token_rejected():
+    dealer = MovieDealer()
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get(USER_TYPE_URL, status_code=401)
+        assert dealer.is_admin_user('token') is False
+        assert 'token' not in dealer.roles
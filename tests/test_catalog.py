@@ -0,0 +1,262 @@
+import pytest
+import requests_mock
+
+from movie.cache import CacheConfig, ResponseCache
+from movie.catalog import LocalCatalog, DirectorIndex, normalize_name
+from movie.columns import MovieTable
+from movie.domain import MovieDealer, Director, Id, Title, Description, Year, Category, ImageUrl
+
+MOVIES_URL = 'http://localhost:8000/api/v1/movies/'
+
+
+@pytest.fixture
+def json_movies():
+    return [{'id': 1, 'title': 'C title', 'description': 'A description', 'year': 2020, 'category': 'ACTION',
+             'director': 'A director'},
+            {'id': 2, 'title': 'A title', 'description': 'A description', 'year': 2021, 'category': 'DRAMA',
+             'director': 'B director'},
+            {'id': 3, 'title': 'B title', 'description': 'A description', 'year': 2022, 'category': 'WESTERN',
+             'director': 'A director'}]
+
+
+### DirectorIndex ###
+
+@pytest.fixture
+def director_index():
+    return DirectorIndex.build([(1, 'Stanley Kubrick'), (2, 'Steven  Spielberg'), (3, 'stanley kubrick'),
+                                (4, 'Sofia Coppola'), (5, 'Francis Ford Coppola')])
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('Stanley Kubrick', 'stanley kubrick'),
+    ('  Stanley \t Kubrick ', 'stanley kubrick'),
+    ('STRASSE', 'strasse'),
+])
+def test_normalize_name(value, expected):
+    assert normalize_name(value) == expected
+
+
+def test_director_index_exact_lookup_is_case_and_space_insensitive(director_index):
+    assert director_index.exact('STANLEY   kubrick') == [1, 3]
+    assert director_index.exact('steven spielberg') == [2]
+    assert director_index.exact('Kubrick') == []
+
+
+def test_director_index_prefix_lookup(director_index):
+    assert director_index.prefix('st') == [1, 3, 2]
+    assert director_index.prefix('Sofia') == [4]
+    assert director_index.prefix('Zed') == []
+
+
+def test_director_index_surname_lookup(director_index):
+    assert sorted(director_index.surname('coppola')) == [4, 5]
+    assert director_index.surname('Ford') == []
+
+
+def test_director_index_lookup_prefers_exact_then_surname_then_prefix(director_index):
+    assert director_index.lookup('Sofia Coppola') == [4]
+    assert sorted(director_index.lookup('Coppola')) == [4, 5]
+    assert director_index.lookup('Steven') == [2]
+
+
+def test_director_index_incremental_updates(director_index):
+    director_index.add(6, 'Sofia Coppola')
+    assert director_index.exact('sofia coppola') == [4, 6]
+    director_index.remove(4, 'Sofia Coppola')
+    director_index.remove(6, 'Sofia Coppola')
+    assert director_index.exact('sofia coppola') == []
+    assert director_index.surname('coppola') == [5]
+    assert director_index.prefix('so') == []
+    assert len(director_index) == 3
+
+
+def test_director_index_remove_unknown_is_ignored(director_index):
+    director_index.remove(42, 'Nobody Known')
+    assert len(director_index) == 4
+
+
+### LocalCatalog ###
+
+def test_catalog_sorts_by_title(json_movies):
+    catalog = LocalCatalog()
+    catalog.load(json_movies)
+    assert [m['id'] for m in catalog.sorted_by_title()] == [2, 3, 1]
+
+
+def test_catalog_filters_by_director(json_movies):
+    catalog = LocalCatalog()
+    catalog.load(json_movies)
+    assert [m['id'] for m in catalog.filter_by_director('A director')] == [1, 3]
+    assert catalog.filter_by_director('Nobody') == []
+
+
+def test_catalog_filters_by_director_surname_and_prefix(json_movies):
+    catalog = LocalCatalog()
+    catalog.load(json_movies)
+    assert [m['id'] for m in catalog.filter_by_director('a DIRECTOR')] == [1, 3]
+    assert [m['id'] for m in catalog.filter_by_director('b')] == [2]
+
+
+def test_catalog_upsert_and_remove_update_indexes(json_movies):
+    catalog = LocalCatalog()
+    catalog.load(json_movies)
+    catalog.upsert({**json_movies[0], 'title': 'D title', 'director': 'B director'})
+    catalog.upsert({'id': 4, 'title': 'AA title', 'description': 'A description', 'year': 2020,
+                    'category': 'ACTION', 'director': 'A director'})
+    catalog.remove(3)
+    assert [m['id'] for m in catalog.sorted_by_title()] == [2, 4, 1]
+    assert [m['id'] for m in catalog.filter_by_director('B director')] == [2, 1]
+    assert [m['id'] for m in catalog.filter_by_director('A director')] == [4]
+
+
+def test_catalog_upsert_is_ignored_until_loaded(json_movies):
+    catalog = LocalCatalog()
+    catalog.upsert(json_movies[0])
+    assert len(catalog) == 0
+
+
+def test_catalog_freshness(json_movies):
+    catalog = LocalCatalog()
+    assert not catalog.is_loaded
+    assert not catalog.is_fresh(60.0)
+    catalog.load(json_movies)
+    assert catalog.is_fresh(60.0)
+    assert not catalog.is_fresh(0.0)
+    catalog.clear()
+    assert len(catalog) == 0
+    assert not catalog.is_loaded
+
+
+def test_catalog_results_are_copies(json_movies):
+    catalog = LocalCatalog()
+    catalog.load(json_movies)
+    catalog.sorted_by_title()[0]['title'] = 'Changed'
+    assert catalog.sorted_by_title()[0]['title'] == 'A title'
+    assert json_movies[1]['title'] == 'A title'
+
+
+def test_catalog_views_do_not_change_after_updates(json_movies):
+    catalog = LocalCatalog()
+    catalog.load(json_movies)
+    view = catalog.sorted_by_title()
+    catalog.remove(2)
+    catalog.upsert({**json_movies[0], 'title': 'Z title'})
+    assert [m['id'] for m in view] == [2, 3, 1]
+    assert [m['title'] for m in catalog.sorted_by_title()] == ['B title', 'Z title']
+
+
+def test_catalog_get_by_id(json_movies):
+    catalog = LocalCatalog()
+    catalog.load(json_movies)
+    assert catalog.get(2) == json_movies[1]
+    assert catalog.get(42) is None
+
+
+def test_catalog_select_by_category_and_year(json_movies):
+    catalog = LocalCatalog()
+    catalog.load(json_movies)
+    assert [m['id'] for m in catalog.select(category='DRAMA')] == [2]
+    assert [m['id'] for m in catalog.select(min_year=2021)] == [2, 3]
+    assert [m['id'] for m in catalog.select(category='ACTION', max_year=2020)] == [1]
+    assert list(catalog.select(category='HORROR')) == []
+
+
+def test_catalog_sorts_by_year_and_director(json_movies):
+    catalog = LocalCatalog()
+    catalog.load(json_movies)
+    assert [m['id'] for m in catalog.sorted_by('year')] == [1, 2, 3]
+    assert [m['id'] for m in catalog.sorted_by('director')] == [1, 3, 2]
+
+
+### MovieDealer ###
+
+def test_sort_and_filter_are_served_locally_after_listing(json_movies):
+    dealer = MovieDealer()
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get(MOVIES_URL, json=json_movies)
+        dealer.get_movies()
+        assert [m['id'] for m in dealer.sort_movies_by_title()] == [2, 3, 1]
+        assert [m['id'] for m in dealer.filter_movies_by_director(Director('A director'))] == [1, 3]
+        assert request_mock.call_count == 1
+
+
+def test_listing_is_cached_as_a_columnar_table(json_movies):
+    dealer = MovieDealer()
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get(MOVIES_URL, json=json_movies)
+        movies = dealer.get_movies()
+        assert isinstance(movies, MovieTable)
+        assert movies == json_movies
+        assert dealer.cache.peek('/movies/').value is movies
+        assert dealer.catalog.get(3) == json_movies[2]
+        assert list(dealer.iter_movies()) == json_movies
+
+
+def test_streamed_listing_is_kept_as_a_columnar_table(json_movies):
+    dealer = MovieDealer()
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get(MOVIES_URL, json=json_movies)
+        assert list(dealer.iter_movies()) == json_movies
+        assert isinstance(dealer.cache.peek('/movies/').value, MovieTable)
+        assert [m['id'] for m in dealer.sort_movies_by_title()] == [2, 3, 1]
+
+
+def test_rows_without_id_are_cached_as_a_list(json_movies):
+    rows = json_movies + [{'title': 'No id'}]
+    dealer = MovieDealer()
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get(MOVIES_URL, json=rows)
+        assert list(dealer.iter_movies()) == rows
+        assert dealer.cache.peek('/movies/').value == rows
+        assert isinstance(dealer.cache.peek('/movies/').value, list)
+        assert not dealer.catalog.is_loaded
+        dealer.cache.invalidate()
+        assert dealer.get_movies() == rows
+        assert not dealer.catalog.is_loaded
+
+
+def test_sort_falls_back_to_server_without_catalog(json_movies):
+    dealer = MovieDealer()
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get(f'{MOVIES_URL}sort-by-title/', json=json_movies)
+        assert dealer.sort_movies_by_title() == json_movies
+
+
+def test_filter_falls_back_to_server_when_catalog_is_stale(json_movies):
+    dealer = MovieDealer(cache=ResponseCache(CacheConfig(ttl=0.0, serve_stale=False)))
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get(MOVIES_URL, json=json_movies)
+        request_mock.get(f'{MOVIES_URL}filter-by-director/B director/', json=[json_movies[1]])
+        dealer.get_movies()
+        assert dealer.filter_movies_by_director(Director('B director')) == [json_movies[1]]
+        assert request_mock.call_count == 2
+
+
+def test_mutations_keep_local_catalog_in_sync(json_movies):
+    dealer = MovieDealer()
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get(MOVIES_URL, json=json_movies)
+        request_mock.put(f'{MOVIES_URL}2/', status_code=200)
+        request_mock.delete(f'{MOVIES_URL}3/', status_code=204)
+        request_mock.post(MOVIES_URL, status_code=201, json={'id': 4})
+        dealer.get_movies()
+        dealer.update_movie('token', {**json_movies[1], 'director': 'A director'})
+        dealer.remove_movie('token', Id(3))
+        dealer.add_movie('token', Title('D title'), Description('descr'), Year(2020),
+                         Category(Category.MovieCategory.ACTION), Director('C director'),
+                         ImageUrl('https://image.tmdb.org/t/p/w500/6KErczPBROQty7QoIsaa6wJYXZi.jpg'))
+        assert [m['id'] for m in dealer.filter_movies_by_director(Director('A director'))] == [1, 2]
+        assert [m['id'] for m in dealer.filter_movies_by_director(Director('c director'))] == [4]
+        assert request_mock.call_count == 4
+
+
+def test_add_movie_without_created_id_drops_local_catalog(json_movies):
+    dealer = MovieDealer()
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get(MOVIES_URL, json=json_movies)
+        request_mock.post(MOVIES_URL, status_code=201)
+        dealer.get_movies()
+        dealer.add_movie('token', Title('D title'), Description('descr'), Year(2020),
+                         Category(Category.MovieCategory.ACTION), Director('C director'),
+                         ImageUrl('https://image.tmdb.org/t/p/w500/6KErczPBROQty7QoIsaa6wJYXZi.jpg'))
+        assert not dealer.catalog.is_loaded
@@ -0,0 +1,168 @@
+import io
+import json
+from unittest.mock import patch
+
+import pytest
+import requests_mock
+
+from app import main as app_main
+from movie.cli import CommandLine, main
+from movie.domain import MovieDealer
+
+API = 'http://localhost:8000/api/v1'
+MOVIES = [{'id': 1, 'title': 'B title', 'director': 'Stanley Kubrick'},
+          {'id': 2, 'title': 'A title', 'director': 'Ridley Scott'}]
+
+
+@pytest.fixture
+def out():
+    return io.StringIO()
+
+
+@pytest.fixture
+def command_line(out):
+    return CommandLine(MovieDealer(), out, token='token')
+
+
+def test_list_writes_a_json_array(command_line, out):
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get(f'{API}/movies/', json=MOVIES)
+        assert command_line.run(['list']) == 0
+    assert json.loads(out.getvalue()) == MOVIES
+
+
+def test_empty_list_is_still_valid_json(command_line, out):
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get(f'{API}/movies/', json=[])
+        assert command_line.run(['list']) == 0
+    assert json.loads(out.getvalue()) == []
+
+
+def test_list_writes_json_lines(command_line, out):
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get(f'{API}/movies/', json=MOVIES)
+        assert command_line.run(['--format', 'jsonl', 'list']) == 0
+    assert [json.loads(line) for line in out.getvalue().splitlines()] == MOVIES
+
+
+def test_sort_and_filter(command_line):
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get(f'{API}/movies/sort-by-title/', json=MOVIES[::-1])
+        request_mock.get(f'{API}/movies/filter-by-director/Ridley Scott/', json=MOVIES[1:])
+        assert command_line.execute(['sort']) == {'command': 'sort', 'ok': True, 'result': MOVIES[::-1]}
+        assert command_line.execute(['filter', '--director', 'Ridley Scott'])['result'] == MOVIES[1:]
+
+
+def test_invalid_director_is_reported(command_line):
+    res = command_line.execute(['filter', '--director', 'R2-D2!'])
+    assert res['ok'] is False
+    assert res['error']
+
+
+def test_get_reports_missing_movie(command_line, out):
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get(f'{API}/movies/9/', status_code=404)
+        assert command_line.run(['get', '9']) == 1
+    assert json.loads(out.getvalue()) == {'command': 'get', 'ok': False, 'error': 'Movie with id 9 not found'}
+
+
+def test_like_accepts_id_lists(command_line):
+    with requests_mock.Mocker() as request_mock:
+        request_mock.post(f'{API}/likes/', status_code=201)
+        assert command_line.execute(['like', '1,3-4']) == {'command': 'like', 'ok': True,
+                                                            'result': {'done': [1, 3, 4]}}
+        assert request_mock.call_count == 3
+
+
+def test_unlike_reports_failures(command_line):
+    with requests_mock.Mocker() as request_mock:
+        request_mock.delete(f'{API}/likes/by_movie/1/', status_code=204)
+        request_mock.delete(f'{API}/likes/by_movie/2/', status_code=404)
+        res = command_line.execute(['unlike', '1,2'])
+    assert res == {'command': 'unlike', 'ok': False, 'error': 'Failed for the movies with ids 2'}
+
+
+def test_commands_that_need_a_user_ask_for_login(out):
+    res = CommandLine(MovieDealer(), out).execute(['liked'])
+    assert res['ok'] is False
+    assert 'MOVIE_TOKEN' in res['error']
+
+
+def test_login_happens_once_with_credentials(out):
+    command_line = CommandLine(MovieDealer(), out, credentials=('username', 'A_p@ssw0rd'))
+    with requests_mock.Mocker() as request_mock:
+        request_mock.post(f'{API}/auth/login/', json={'key': 'token'})
+        request_mock.get(f'{API}/movies/user-type/', json={'is_staff': False})
+        request_mock.get(f'{API}/movies/user_liked_movies/', json=MOVIES)
+        assert command_line.execute(['liked'])['result'] == MOVIES
+        assert command_line.execute(['liked'])['result'] == MOVIES
+        assert sum(r.path == '/api/v1/auth/login/' for r in request_mock.request_history) == 1
+
+
+def test_import_requires_admin(command_line):
+    with patch.object(MovieDealer, 'is_admin_user', return_value=False):
+        res = command_line.execute(['import', 'movies.jsonl'])
+    assert res == {'command': 'import', 'ok': False, 'error': 'You must be admin to import movies'}
+
+
+def test_import_reports_the_summary(command_line, tmp_path):
+    path = tmp_path / 'movies.jsonl'
+    path.write_text(json.dumps({'title': 'A title', 'description': 'A description', 'year': 2000,
+                                'category': 'ACTION', 'director': 'Stanley Kubrick',
+                                'image_url': 'https://image.tmdb.org/t/p/w500/6KErczPBROQty7QoIsaa6wJYXZi.jpg'}) +
+                    '\n{"title": "Only title"}\n')
+    with patch.object(MovieDealer, 'is_admin_user', return_value=True):
+        with requests_mock.Mocker() as request_mock:
+            request_mock.post(f'{API}/movies/', status_code=201, json={'id': 1})
+            res = command_line.execute(['import', str(path), '--workers', '2'])
+    assert res['ok'] is True
+    assert (res['result']['imported'], res['result']['failed']) == (1, 1)
+    assert res['result']['errors'][0]['line'] == 2
+
+
+def test_usage_errors_exit_with_2(command_line, out, capsys):
+    assert command_line.run(['bogus']) == 2
+    assert command_line.run(['like']) == 2
+    assert out.getvalue() == ''
+    assert 'invalid choice' in capsys.readouterr().err
+
+
+def test_script_runs_every_line(command_line, out, tmp_path):
+    script = tmp_path / 'script.txt'
+    script.write_text('# warm up\nlist\n\nlike 1,2\nget 9\nbogus\nrun other.txt\nfilter --director "Ridley Scott"\n')
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get(f'{API}/movies/', json=MOVIES)
+        request_mock.post(f'{API}/likes/', status_code=201)
+        request_mock.get(f'{API}/movies/9/', status_code=404)
+        request_mock.get(f'{API}/movies/filter-by-director/Ridley Scott/', json=MOVIES[1:])
+        assert command_line.run(['run', str(script)]) == 1
+    lines = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [(line['line'], line['command'], line['ok']) for line in lines] == [
+        (2, 'list', True), (4, 'like', True), (5, 'get', False), (6, 'bogus', False), (7, 'run', False),
+        (8, 'filter', True)]
+    assert lines[0]['result'] == MOVIES
+
+
+def test_script_reads_stdin(command_line, out):
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get(f'{API}/movies/', json=MOVIES)
+        with patch('sys.stdin', io.StringIO('list\nlist\n')):
+            assert command_line.run(['run', '-']) == 0
+        # the second listing comes from the same warm dealer
+        assert request_mock.call_count == 1
+    assert len(out.getvalue().splitlines()) == 2
+
+
+def test_main_uses_the_given_api_server(out):
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get('http://example.test/api/movies/', json=MOVIES)
+        assert main(['--api-server', 'http://example.test/api', 'list'], out) == 0
+    assert json.loads(out.getvalue()) == MOVIES
+
+
+def test_app_main_runs_commands_when_given_arguments():
+    with patch('movie.cli.main', return_value=0) as cli_main:
+        with pytest.raises(SystemExit) as exit_info:
+            app_main('__main__', ['list'])
+    cli_main.assert_called_once_with(['list'])
+    assert exit_info.value.code == 0
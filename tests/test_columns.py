@@ -0,0 +1,113 @@
+from unittest.mock import patch
+
+import pytest
+
+import movie.columns
+from movie.columns import ColumnStore, MovieTable, StringTable
+
+
+@pytest.fixture
+def json_movies():
+    return [{'id': 1, 'title': 'C title', 'description': 'A description', 'year': 2020, 'category': 'ACTION',
+             'director': 'A director', 'image_url': 'https://image.tmdb.org/t/p/w500/a.jpg'},
+            {'id': 2, 'title': 'A title', 'description': 'A description', 'year': 2021, 'category': 'DRAMA',
+             'director': 'B director'},
+            {'id': 3, 'title': 'B title', 'description': 'A description', 'year': 2022, 'category': 'ACTION',
+             'director': 'A director'}]
+
+
+@pytest.fixture
+def store(json_movies):
+    res = ColumnStore()
+    for movie in json_movies:
+        res.put(movie)
+    return res
+
+
+### StringTable ###
+
+def test_string_table_encodes_each_value_once():
+    table = StringTable()
+    assert table.encode('b') == table.encode('b') == 1
+    assert table.encode('a') == 2
+    assert table.code('a') == 2
+    assert table.code('c') is None
+    assert table.decode(1) == 'b'
+    assert table.decode(0) is None
+    assert list(table.ranks()) == [0, 2, 1]
+    assert len(table) == 2
+
+
+### ColumnStore ###
+
+def test_store_rows_round_trip(store, json_movies):
+    assert [store.get(movie['id']) for movie in json_movies] == json_movies
+    assert len(store) == 3
+
+
+def test_store_keeps_unexpected_values(store):
+    odd = {'id': 4, 'title': None, 'year': '2020', 'category': 12, 'director': 'C director', 'likes': 3}
+    store.put(odd)
+    assert store.get(4) == odd
+    store.put({'id': 5, 'year': 2 ** 40})
+    assert store.get(5) == {'id': 5, 'year': 2 ** 40}
+
+
+def test_store_put_replaces_existing_row(store):
+    store.put({'id': 2, 'title': 'D title', 'year': 1999})
+    assert store.get(2) == {'id': 2, 'title': 'D title', 'year': 1999}
+    assert len(store) == 3
+
+
+def test_store_remove_moves_last_row(store, json_movies):
+    store.put({'id': 4, 'title': 'E title', 'likes': 1})
+    store.remove(1)
+    store.remove(42)
+    assert len(store) == 3
+    assert store.get(1) is None
+    assert store.get(4) == {'id': 4, 'title': 'E title', 'likes': 1}
+    assert store.get(3) == json_movies[2]
+    store.remove(4)
+    assert store.get(4) is None
+    assert [store.row(pos)['id'] for pos in range(len(store))] == [3, 2]
+
+
+def test_store_copy_is_independent(store, json_movies):
+    copy = store.copy()
+    copy.remove(1)
+    copy.put({**json_movies[1], 'title': 'Changed'})
+    assert store.get(1) == json_movies[0]
+    assert store.get(2) == json_movies[1]
+
+
+@pytest.mark.parametrize('use_numpy', [True, False])
+def test_store_order_and_select(store, use_numpy):
+    if use_numpy and movie.columns.numpy is None:
+        pytest.skip('NumPy is not installed')
+    with patch.object(movie.columns, 'numpy', movie.columns.numpy if use_numpy else None):
+        assert [store.row(pos)['id'] for pos in store.order_by('title')] == [2, 3, 1]
+        assert [store.row(pos)['id'] for pos in store.order_by('year')] == [1, 2, 3]
+        assert [store.row(pos)['id'] for pos in store.order_by('director')] == [1, 3, 2]
+        assert list(store.select(category='ACTION')) == [0, 2]
+        assert list(store.select(min_year=2021, max_year=2021)) == [1]
+        assert list(store.select(category='WESTERN')) == []
+        assert list(store.select()) == [0, 1, 2]
+
+
+### MovieTable ###
+
+def test_movie_table_is_a_sequence_of_rows(store, json_movies):
+    table = MovieTable(store)
+    assert table == json_movies
+    assert json_movies == table
+    assert table[-1] == json_movies[-1]
+    assert table[1:] == json_movies[1:]
+    assert isinstance(table[1:], MovieTable)
+    assert table != json_movies[:2]
+    assert repr(table) == 'MovieTable(3 movies)'
+
+
+def test_movie_table_follows_positions(store, json_movies):
+    table = MovieTable(store, store.order_by('title'))
+    assert [movie['id'] for movie in table] == [2, 3, 1]
+    assert len(table) == 3
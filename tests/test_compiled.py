@@ -0,0 +1,126 @@
+from dataclasses import dataclass
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+from typeguard import typechecked
+from valid8 import ValidationError, validate
+
+from movie.domain import Title, Year, Id, Category, Password, Movie, Description, Director, current_year
+from validation.compiled import compile_validator, daily
+from validation.dataclasses import validate_dataclass
+from validation.regex import pattern
+
+
+### TESTING compile_validator ###
+
+@typechecked
+@dataclass(frozen=True)
+class Word:
+    value: str
+
+    def __post_init__(self):
+        _WORD.check(self)
+
+
+_WORD = compile_validator(Word, min_len=2, max_len=5, regex=r'[a-z]+', help_msg="A short lowercase word.")
+
+
+def legacy_word(value):
+    @dataclass(frozen=True)
+    class Legacy:
+        value: str
+
+    instance = Legacy(value)
+    validate_dataclass(instance)
+    validate('value', value, min_len=2, max_len=5, custom=pattern(r'[a-z]+'), help_msg="A short lowercase word.")
+
+
+def test_compiled_validator_accepts_valid_values():
+    assert Word('abc').value == 'abc'
+    assert _WORD.accept('abcde')
+    assert not _WORD.accept('abcdef')
+    assert not _WORD.accept('ABC')
+    assert not _WORD.accept(3)
+
+
+@pytest.mark.parametrize('value', ['a', 'abcdef', 'AB', 'a b'])
+def test_compiled_validator_raises_the_same_error_as_valid8(value):
+    with pytest.raises(ValidationError) as compiled:
+        Word(value)
+    with pytest.raises(ValidationError) as legacy:
+        legacy_word(value)
+    assert str(compiled.value) == str(legacy.value)
+
+
+def test_compiled_validator_rejects_wrong_types():
+    with pytest.raises(TypeError):
+        Word(12)
+
+
+def test_compiled_validator_reads_callable_bounds_on_each_check():
+    @dataclass(frozen=True)
+    class Number:
+        value: int
+
+    limit = [10]
+    validator = compile_validator(Number, max_value=lambda: limit[0])
+    assert validator.accept(10)
+    limit[0] = 5
+    assert not validator.accept(10)
+    with pytest.raises(ValidationError):
+        validator.check(Number(10))
+
+
+def test_compiled_validator_has_no_value_check_for_multi_field_classes():
+    assert compile_validator(Movie).accept is None
+
+
+def test_domain_errors_keep_their_messages():
+    with pytest.raises(ValidationError, match='Title must be between 1 and 50 characters long.'):
+        Title('')
+    with pytest.raises(ValidationError, match='Id must be an integer'):
+        Id(-1)
+    with pytest.raises(TypeError):
+        Category('ACTION')
+    with pytest.raises(ValidationError, match='Password must be between 8 and 30'):
+        Password('password')
+    with pytest.raises(ValidationError, match='between 1900 and current year'):
+        Year(1899)
+    with pytest.raises(TypeError):
+        Description(1)
+    with pytest.raises(ValidationError):
+        Director('Al')
+
+
+### TESTING daily ###
+
+def test_daily_computes_once_per_day():
+    calls = []
+
+    @daily
+    def today():
+        calls.append(1)
+        return len(calls)
+
+    assert today() == 1
+    assert today() == 1
+    assert calls == [1]
+    assert today.__name__ == 'today'
+
+
+def test_daily_computes_again_after_midnight():
+    calls = []
+    cached = daily(lambda: calls.append(1) or len(calls))
+    clock = [0.0]
+    with patch('validation.compiled.time.monotonic', side_effect=lambda: clock[0]):
+        assert cached() == 1
+        clock[0] += 24 * 60 * 60
+        assert cached() == 2
+
+
+def test_current_year_bounds_year():
+    assert current_year() == datetime.now().year
+    assert Year(current_year()).value == datetime.now().year
+    with pytest.raises(ValidationError):
+        Year(current_year() + 1)
@@ -1,4 +1,7 @@
+import threading
+import time
 from datetime import datetime
+from unittest.mock import patch
 
 import pytest
 import requests_mock
@@ -6,7 +9,8 @@ from requests.exceptions import ConnectionError, JSONDecodeError
 from valid8 import ValidationError
 
 from movie.domain import Title, Description, Year, Category, Movie, Like, Email, Id, Password, Username, Director, \
-    MovieDealer, ImageUrl
+    MovieDealer, ImageUrl, UpdateOutcome, parse_id_list
+from movie.cache import CacheConfig, ResponseCache
 
 
 @pytest.fixture()
@@ -281,6 +285,21 @@ def test_id_str():
     assert str(Id(1)) == '1'
 
 
+@pytest.mark.parametrize('text, expected', [
+    ('1', [1]),
+    (' 1, 5 ,10-12', [1, 5, 10, 11, 12]),
+    ('3-3,1-2,2', [3, 1, 2]),
+])
+def test_parse_id_list(text, expected):
+    assert parse_id_list(text) == [Id(value) for value in expected]
+
+
+@pytest.mark.parametrize('text', ['', 'a', '1,,2', '5-1', '1-', '-1', '1-2-3', '0-10000'])
+def test_invalid_id_list_raises_exception(text):
+    with pytest.raises(ValueError):
+        parse_id_list(text)
+
+
 ### Email ###
 
 @pytest.mark.parametrize('values', [
@@ -419,6 +438,39 @@ def test_movie_str(mock_id):
                           'Director: A director\n')
 
 
+def test_movie_create_from_dict():
+    movie = Movie.create({'id': 1, 'title': 'A title', 'description': 'A description', 'year': 2020,
+                          'category': 'ACTION', 'director': 'A director', 'image_url': 'ignored'})
+    assert movie == Movie(Id(1), Title('A title'), Description('A description'), Year(2020),
+                          Category(Category.MovieCategory.ACTION), Director('A director'))
+
+
+def test_movie_create_shares_director_and_category():
+    first = Movie.create({'id': 1, 'title': 'A title', 'description': 'A description', 'year': 2020,
+                          'category': 'ACTION', 'director': 'A director'})
+    second = Movie.create({'id': 2, 'title': 'B title', 'description': 'B description', 'year': 2021,
+                           'category': 'ACTION', 'director': 'A director'})
+    assert first.director is second.director
+    assert first.category is second.category
+    assert Director.of('A director') is first.director
+    assert Category.of(Category.MovieCategory.ACTION) is first.category
+
+
+def test_interned_director_is_validated():
+    with pytest.raises(ValidationError):
+        Director.of('A1')
+
+
+@pytest.mark.parametrize('value', [
+    Title('A title'), Description('A description'), Year(2020), Id(1), Category(Category.MovieCategory.ACTION),
+    Director('A director'), Email('name@example.com'), Password('A_p@ssw0rd'), Username('username'),
+])
+def test_value_objects_have_no_instance_dict(value):
+    assert not hasattr(value, '__dict__')
+    with pytest.raises(AttributeError):
+        value.value = None
+
+
 def test_null_movie_title_raises_exception():
     with pytest.raises(TypeError):
         Movie(None, Description('A description'), Year(2020), Category(Category.MovieCategory.ACTION),
@@ -602,6 +654,50 @@ def test_remove_like_returns_false_when_unsuccessful(movie_dealer):
         assert movie_dealer.remove_like('token', Id(1)) is False
 
 
+# TESTING BULK LIKES
+
+def test_add_likes_returns_a_result_for_each_id(movie_dealer):
+    def status(request, context):
+        context.status_code = 201 if int(request.text.split('=')[1]) % 2 else 400
+
+    with requests_mock.Mocker() as request_mock:
+        request_mock.post('http://localhost:8000/api/v1/likes/', text=status)
+        results = movie_dealer.add_likes('token', [Id(i) for i in range(1, 21)], max_concurrency=4)
+        assert request_mock.call_count == 20
+    assert list(results) == list(range(1, 21))
+    assert [i for i, ok in results.items() if ok] == list(range(1, 21, 2))
+
+
+def test_remove_likes_reports_connection_errors_as_failures(movie_dealer):
+    with requests_mock.Mocker() as request_mock:
+        request_mock.delete('http://localhost:8000/api/v1/likes/by_movie/1/', status_code=204)
+        request_mock.delete('http://localhost:8000/api/v1/likes/by_movie/2/', exc=ConnectionError)
+        assert movie_dealer.remove_likes('token', [Id(1), Id(2)]) == {1: True, 2: False}
+
+
+def test_bulk_likes_cap_concurrency(movie_dealer):
+    running, peak, lock = [0], [0], threading.Lock()
+
+    def add_like(key, movie_id):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.01)
+        with lock:
+            running[0] -= 1
+        return True
+
+    with patch.object(MovieDealer, 'add_like', side_effect=add_like):
+        assert all(movie_dealer.add_likes('token', [Id(i) for i in range(12)], max_concurrency=3).values())
+    assert peak[0] <= 3
+
+
+def test_bulk_likes_require_positive_concurrency(movie_dealer):
+    with pytest.raises(ValidationError):
+        movie_dealer.add_likes('token', [Id(1)], max_concurrency=0)
+    assert movie_dealer.add_likes('token', []) == {}
+
+
 # TESTING GET MOVIES
 
 
@@ -655,6 +751,78 @@ def test_update_movie_returns_falsee_when_unsuccessful(movie_dealer, json_movie)
         assert movie_dealer.update_movie('token', json_movie) is False
 
 
+# TESTING PATCH MOVIE
+
+def test_patch_movie_sends_only_changed_fields(movie_dealer, json_movie):
+    with requests_mock.Mocker() as request_mock:
+        request_mock.patch(f'http://localhost:8000/api/v1/movies/{json_movie["id"]}/', status_code=200)
+        changed = {**json_movie, 'title': 'New title'}
+        assert movie_dealer.patch_movie('token', json_movie, changed) is UpdateOutcome.UPDATED
+        assert request_mock.last_request.json() == {'title': 'New title'}
+        assert request_mock.last_request.headers['Authorization'] == 'Token token'
+
+
+def test_patch_movie_sends_nothing_when_unchanged(movie_dealer, json_movie):
+    with requests_mock.Mocker() as request_mock:
+        assert movie_dealer.patch_movie('token', json_movie, dict(json_movie)) is UpdateOutcome.UNCHANGED
+        assert request_mock.call_count == 0
+
+
+def test_patch_movie_sends_preconditions(movie_dealer, json_movie):
+    movie = {**json_movie, 'version': 3}
+    url = f'http://localhost:8000/api/v1/movies/{movie["id"]}/'
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get(url, json=movie, headers={'ETag': '"v3"'})
+        request_mock.patch(url, status_code=204)
+        original = movie_dealer.get_movie(Id(movie['id']))
+        assert movie_dealer.patch_movie('token', original, {**original, 'year': 2001}) is UpdateOutcome.UPDATED
+        assert request_mock.last_request.headers['If-Match'] == '"v3"'
+        assert request_mock.last_request.json() == {'year': 2001, 'version': 3}
+
+
+@pytest.mark.parametrize('status', [409, 412])
+def test_patch_movie_reports_conflicts(movie_dealer, json_movie, status):
+    url = f'http://localhost:8000/api/v1/movies/{json_movie["id"]}/'
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get(url, json=json_movie, headers={'ETag': '"v1"'})
+        request_mock.patch(url, status_code=status)
+        movie_dealer.get_movie(Id(json_movie['id']))
+        changed = {**json_movie, 'title': 'New title'}
+        assert movie_dealer.patch_movie('token', json_movie, changed) is UpdateOutcome.CONFLICT
+    # the stale copy is gone, so the next read asks the server
+    assert movie_dealer.cache.peek(url[len(movie_dealer.api_server):]) is None
+
+
+def test_patch_movie_falls_back_to_put(movie_dealer, json_movie):
+    url = f'http://localhost:8000/api/v1/movies/{json_movie["id"]}/'
+    with requests_mock.Mocker() as request_mock:
+        request_mock.patch(url, status_code=405)
+        request_mock.put(url, status_code=200)
+        changed = {**json_movie, 'title': 'New title'}
+        assert movie_dealer.patch_movie('token', json_movie, changed) is UpdateOutcome.UPDATED
+        assert request_mock.last_request.json() == changed
+        assert movie_dealer.patch_movie('token', changed, {**changed, 'year': 1999}) is UpdateOutcome.UPDATED
+        # the server is not asked for PATCH again
+        assert [r.method for r in request_mock.request_history] == ['PATCH', 'PUT', 'PUT']
+
+
+def test_patch_movie_returns_failed_when_rejected(movie_dealer, json_movie):
+    with requests_mock.Mocker() as request_mock:
+        request_mock.patch(f'http://localhost:8000/api/v1/movies/{json_movie["id"]}/', status_code=400)
+        changed = {**json_movie, 'title': 'New title'}
+        assert movie_dealer.patch_movie('token', json_movie, changed) is UpdateOutcome.FAILED
+
+
+def test_patch_movie_updates_the_catalog(movie_dealer, json_movie):
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get('http://localhost:8000/api/v1/movies/', json=[json_movie])
+        request_mock.patch(f'http://localhost:8000/api/v1/movies/{json_movie["id"]}/', status_code=200,
+                           json={**json_movie, 'title': 'New title', 'version': 2})
+        list(movie_dealer.iter_movies())
+        movie_dealer.patch_movie('token', json_movie, {**json_movie, 'title': 'New title'})
+    assert movie_dealer.catalog.get(json_movie['id'])['version'] == 2
+
+
 # TESTING REMOVE MOVIE
 
 def test_remove_movie_returns_true_when_successful(movie_dealer):
@@ -686,6 +854,50 @@ def test_get_movie_by_id_returns_none_when_unsuccessful(movie_dealer, json_movie
         assert movie_dealer.get_movie(Id(json_movie["id"])) is None
 
 
+# TESTING BULK LIKES
+
+def test_add_likes_returns_a_result_for_each_id(movie_dealer):
+    def status(request, context):
+        context.status_code = 201 if int(request.text.split('=')[1]) % 2 else 400
+
+    with requests_mock.Mocker() as request_mock:
+        request_mock.post('http://localhost:8000/api/v1/likes/', text=status)
+        results = movie_dealer.add_likes('token', [Id(i) for i in range(1, 21)], max_concurrency=4)
+        assert request_mock.call_count == 20
+    assert list(results) == list(range(1, 21))
+    assert [i for i, ok in results.items() if ok] == list(range(1, 21, 2))
+
+
+def test_remove_likes_reports_connection_errors_as_failures(movie_dealer):
+    with requests_mock.Mocker() as request_mock:
+        request_mock.delete('http://localhost:8000/api/v1/likes/by_movie/1/', status_code=204)
+        request_mock.delete('http://localhost:8000/api/v1/likes/by_movie/2/', exc=ConnectionError)
+        assert movie_dealer.remove_likes('token', [Id(1), Id(2)]) == {1: True, 2: False}
+
+
+def test_bulk_likes_cap_concurrency(movie_dealer):
+    running, peak, lock = [0], [0], threading.Lock()
+
+    def add_like(key, movie_id):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.01)
+        with lock:
+            running[0] -= 1
+        return True
+
+    with patch.object(MovieDealer, 'add_like', side_effect=add_like):
+        assert all(movie_dealer.add_likes('token', [Id(i) for i in range(12)], max_concurrency=3).values())
+    assert peak[0] <= 3
+
+
+def test_bulk_likes_require_positive_concurrency(movie_dealer):
+    with pytest.raises(ValidationError):
+        movie_dealer.add_likes('token', [Id(1)], max_concurrency=0)
+    assert movie_dealer.add_likes('token', []) == {}
+
+
 # TESTING GET MOVIES SORTED BY TITLE
 
 @pytest.mark.parametrize('values', [
@@ -733,6 +945,50 @@ def test_get_user_liked_movies_returns_empty_list_when_request_fails(movie_deale
         assert movie_dealer.get_liked_movies('token') == []
 
 
+# TESTING BULK LIKES
+
+def test_add_likes_returns_a_result_for_each_id(movie_dealer):
+    def status(request, context):
+        context.status_code = 201 if int(request.text.split('=')[1]) % 2 else 400
+
+    with requests_mock.Mocker() as request_mock:
+        request_mock.post('http://localhost:8000/api/v1/likes/', text=status)
+        results = movie_dealer.add_likes('token', [Id(i) for i in range(1, 21)], max_concurrency=4)
+        assert request_mock.call_count == 20
+    assert list(results) == list(range(1, 21))
+    assert [i for i, ok in results.items() if ok] == list(range(1, 21, 2))
+
+
+def test_remove_likes_reports_connection_errors_as_failures(movie_dealer):
+    with requests_mock.Mocker() as request_mock:
+        request_mock.delete('http://localhost:8000/api/v1/likes/by_movie/1/', status_code=204)
+        request_mock.delete('http://localhost:8000/api/v1/likes/by_movie/2/', exc=ConnectionError)
+        assert movie_dealer.remove_likes('token', [Id(1), Id(2)]) == {1: True, 2: False}
+
+
+def test_bulk_likes_cap_concurrency(movie_dealer):
+    running, peak, lock = [0], [0], threading.Lock()
+
+    def add_like(key, movie_id):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.01)
+        with lock:
+            running[0] -= 1
+        return True
+
+    with patch.object(MovieDealer, 'add_like', side_effect=add_like):
+        assert all(movie_dealer.add_likes('token', [Id(i) for i in range(12)], max_concurrency=3).values())
+    assert peak[0] <= 3
+
+
+def test_bulk_likes_require_positive_concurrency(movie_dealer):
+    with pytest.raises(ValidationError):
+        movie_dealer.add_likes('token', [Id(1)], max_concurrency=0)
+    assert movie_dealer.add_likes('token', []) == {}
+
+
 # TESTING GET MOVIES FILTERED BY DIRECTOR
 
 @pytest.mark.parametrize('values', [
@@ -754,3 +1010,131 @@ def test_get_movies_filtered_by_director_returns_empty_list_when_request_fails(m
     with requests_mock.Mocker() as request_mock:
         request_mock.get('http://localhost:8000/api/v1/movies/filter-by-director/A director A/', status_code=400)
         assert movie_dealer.filter_movies_by_director(Director('A director A')) == []
+
+
+# TESTING REQUEST COALESCING
+
+def test_concurrent_identical_gets_share_one_request(movie_dealer):
+    release = threading.Event()
+    results = []
+
+    def blocked(request, context):
+        release.wait(5)
+        return {'id': 1, 'title': 'A title'}
+
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get('http://localhost:8000/api/v1/movies/1/', json=blocked)
+        threads = [threading.Thread(target=lambda: results.append(movie_dealer.get_movie(Id(1)))) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for _ in range(500):
+            if movie_dealer.flights.stats.saved == 5:
+                break
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+        assert request_mock.call_count == 1
+    assert len(results) == 6 and all(result['id'] == 1 for result in results)
+    # every caller gets its own copy to edit
+    assert len({id(result) for result in results}) == 6
+    assert movie_dealer.flights.stats.saved == 5
+
+
+def test_concurrent_gets_with_different_tokens_are_not_shared(movie_dealer):
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get('http://localhost:8000/api/v1/movies/user-type/', json={'is_staff': True})
+        release = threading.Event()
+        seen = []
+
+        def blocked(request, context):
+            seen.append(request.headers['Authorization'])
+            release.wait(5)
+            return [{'id': 1}]
+
+        request_mock.get('http://localhost:8000/api/v1/movies/user_liked_movies/', json=blocked)
+        threads = [threading.Thread(target=movie_dealer.get_liked_movies, args=(token,)) for token in ('a', 'b')]
+        for thread in threads:
+            thread.start()
+        # both requests are in flight at once instead of one waiting for the other
+        for _ in range(500):
+            if len(movie_dealer.flights) == 2:
+                break
+            time.sleep(0.01)
+        assert len(movie_dealer.flights) == 2
+        release.set()
+        for thread in threads:
+            thread.join()
+    assert sorted(seen) == ['Token a', 'Token b']
+    assert movie_dealer.flights.stats.saved == 0
+
+
+def test_writes_are_never_coalesced(movie_dealer):
+    with requests_mock.Mocker() as request_mock:
+        request_mock.post('http://localhost:8000/api/v1/likes/', status_code=201)
+        assert movie_dealer.add_like('token', Id(1))
+        assert movie_dealer.add_like('token', Id(1))
+        assert request_mock.call_count == 2
+    assert movie_dealer.flights.stats.sent == 0
+
+
+# TESTING ENDPOINT METRICS
+
+def test_every_request_is_recorded_per_endpoint(movie_dealer):
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get('http://localhost:8000/api/v1/movies/1/', json={'id': 1})
+        request_mock.get('http://localhost:8000/api/v1/movies/2/', status_code=503)
+        request_mock.post('http://localhost:8000/api/v1/likes/', exc=ConnectionError)
+        movie_dealer.get_movie(Id(1))
+        movie_dealer.get_movie(Id(2))
+        with pytest.raises(ConnectionError):
+            movie_dealer.add_like('token', Id(1))
+    likes, movie = movie_dealer.metrics.snapshot()
+    assert (likes.method, likes.path, likes.count, likes.errors) == ('POST', '/likes/', 1, 1)
+    assert (movie.method, movie.path, movie.count, movie.errors) == ('GET', '/movies/{id}/', 2, 1)
+    assert movie.bytes == len(b'{"id": 1}')
+
+
+def test_streamed_listing_bytes_are_recorded(movie_dealer):
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get('http://localhost:8000/api/v1/movies/', text='[{"id": 1}, {"id": 2}]')
+        assert len(list(movie_dealer.iter_movies())) == 2
+    stats, = movie_dealer.metrics.snapshot()
+    assert (stats.path, stats.count, stats.bytes) == ('/movies/', 1, len('[{"id": 1}, {"id": 2}]'))
+
+
+def test_cached_reads_are_not_recorded(movie_dealer):
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get('http://localhost:8000/api/v1/movies/', json=[])
+        movie_dealer.get_movies()
+        movie_dealer.get_movies()
+    assert movie_dealer.metrics.snapshot()[0].count == 1
+
+
+# TESTING GET LISTED MOVIE
+
+def test_get_listed_movie_uses_the_fresh_listing(movie_dealer):
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get('http://localhost:8000/api/v1/movies/', json=[{'id': 1, 'title': 'A'}, {'id': 2, 'title': 'B'}])
+        list(movie_dealer.iter_movies())
+        assert movie_dealer.get_listed_movie(Id(2)) == {'id': 2, 'title': 'B'}
+        assert movie_dealer.get_listed_movie(Id(9)) is None
+        assert request_mock.call_count == 1
+
+
+def test_get_listed_movie_returns_an_editable_copy(movie_dealer):
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get('http://localhost:8000/api/v1/movies/', json=[{'id': 1, 'title': 'A'}])
+        list(movie_dealer.iter_movies())
+        movie_dealer.get_listed_movie(Id(1))['title'] = 'Changed'
+        assert movie_dealer.get_listed_movie(Id(1)) == {'id': 1, 'title': 'A'}
+
+
+def test_get_listed_movie_asks_the_server_once_the_listing_is_stale():
+    movie_dealer = MovieDealer(cache=ResponseCache(CacheConfig(ttl=0.0)))
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get('http://localhost:8000/api/v1/movies/', json=[{'id': 1, 'title': 'A'}])
+        request_mock.get('http://localhost:8000/api/v1/movies/1/', json={'id': 1, 'title': 'New'})
+        list(movie_dealer.iter_movies())
+        assert movie_dealer.get_listed_movie(Id(1)) == {'id': 1, 'title': 'New'}
+        assert request_mock.call_count == 2
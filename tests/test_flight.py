@@ -0,0 +1,101 @@
+import threading
+
+import pytest
+
+from movie.flight import FlightStats, SingleFlight
+
+
+def wait_for(condition):
+    for _ in range(500):
+        if condition():
+            return
+        threading.Event().wait(0.01)
+    raise AssertionError('condition not reached')
+
+
+def run_concurrently(flight, key, fetch, callers):
+    results, errors = [], []
+
+    def call():
+        try:
+            results.append(flight.do(key, fetch))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def test_single_flight_runs_sequential_calls_separately():
+    flight = SingleFlight()
+    assert flight.do('a', lambda: 1) == 1
+    assert flight.do('a', lambda: 2) == 2
+    assert flight.stats == FlightStats(sent=2, saved=0)
+    assert len(flight) == 0
+
+
+def test_single_flight_shares_one_call_between_concurrent_callers():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return 'result'
+
+    threads, results, errors = run_concurrently(flight, 'key', fetch, 8)
+    wait_for(lambda: flight.stats.sent + flight.stats.saved == 8)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert results == ['result'] * 8
+    assert errors == []
+    assert calls == [1]
+    assert flight.stats == FlightStats(sent=1, saved=7)
+    assert flight.stats.saved_ratio == pytest.approx(7 / 8)
+
+
+def test_single_flight_shares_errors():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def fetch():
+        release.wait(5)
+        raise ValueError('boom')
+
+    threads, results, errors = run_concurrently(flight, 'key', fetch, 4)
+    wait_for(lambda: flight.stats.sent + flight.stats.saved == 4)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert results == []
+    assert len(errors) == 4 and all(isinstance(e, ValueError) for e in errors)
+    assert flight.do('key', lambda: 'again') == 'again'
+
+
+def test_single_flight_keeps_keys_apart():
+    flight = SingleFlight()
+    release = threading.Event()
+    threads, results, _ = run_concurrently(flight, 'a', lambda: release.wait(5) and 'a', 1)
+    wait_for(lambda: len(flight) == 1)
+    assert flight.do('b', lambda: 'b') == 'b'
+    release.set()
+    threads[0].join()
+    assert results == ['a']
+    assert flight.stats.saved == 0
+
+
+def test_single_flight_forget_starts_new_calls():
+    flight = SingleFlight()
+    release = threading.Event()
+    threads, results, _ = run_concurrently(flight, 'key', lambda: release.wait(5) and 'old', 1)
+    wait_for(lambda: len(flight) == 1)
+    flight.forget()
+    assert flight.do('key', lambda: 'new') == 'new'
+    release.set()
+    threads[0].join()
+    assert results == ['old']
+    assert flight.stats == FlightStats(sent=2, saved=0)
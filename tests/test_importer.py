@@ -0,0 +1,151 @@
+import csv
+import json
+
+import pytest
+import requests_mock
+from valid8 import ValidationError
+
+from movie.domain import MovieDealer
+from movie.importer import Checkpoint, ImportConfig, ImportReport, MovieImporter, RowError, parse_movie, read_rows, \
+    write_error_report
+
+MOVIES_URL = 'http://localhost:8000/api/v1/movies/'
+IMAGE_URL = 'https://image.tmdb.org/t/p/w500/6KErczPBROQty7QoIsaa6wJYXZi.jpg'
+
+
+def movie_row(i, **changes):
+    return {'title': f'Title {i}', 'description': f'Description {i}', 'year': 2000 + i % 20, 'category': 'ACTION',
+            'director': 'Stanley Kubrick', 'image_url': IMAGE_URL, **changes}
+
+
+@pytest.fixture
+def csv_file(tmp_path):
+    path = tmp_path / 'movies.csv'
+    with open(path, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=list(movie_row(0)))
+        writer.writeheader()
+        for i in range(10):
+            writer.writerow(movie_row(i))
+    return path
+
+
+@pytest.fixture
+def jsonl_file(tmp_path):
+    path = tmp_path / 'movies.jsonl'
+    lines = [json.dumps(movie_row(0)), '', json.dumps(movie_row(1, year=1800)), '{not json', '[1, 2]',
+             json.dumps(movie_row(2, category='drama')), json.dumps({'title': 'Only title'}),
+             json.dumps(movie_row(3, category='CARTOON'))]
+    path.write_text('\n'.join(lines) + '\n')
+    return path
+
+
+### ImportConfig ###
+
+@pytest.mark.parametrize('values', [
+    {'workers': 0},
+    {'max_in_flight': 0},
+    {'checkpoint_every': 0},
+])
+def test_invalid_import_config_raises_exception(values):
+    with pytest.raises(ValidationError):
+        ImportConfig(**values)
+
+
+### read_rows / parse_movie ###
+
+def test_read_rows_from_csv_reports_line_numbers(csv_file):
+    rows = list(read_rows(str(csv_file)))
+    assert len(rows) == 10
+    assert rows[0] == (2, {key: str(value) for key, value in movie_row(0).items()})
+
+
+def test_read_rows_from_jsonl_returns_errors_for_bad_lines(jsonl_file):
+    rows = list(read_rows(str(jsonl_file)))
+    assert [line for line, _ in rows] == [1, 3, 4, 5, 6, 7, 8]
+    assert isinstance(rows[2][1], ValueError)
+    assert isinstance(rows[3][1], ValueError)
+
+
+def test_read_rows_rejects_unknown_file_types(tmp_path):
+    path = tmp_path / 'movies.txt'
+    path.write_text('')
+    with pytest.raises(ValueError):
+        list(read_rows(str(path)))
+
+
+def test_parse_movie_converts_text_values():
+    title, description, year, category, director, image_url = parse_movie(movie_row(1, year=' 2001', category='drama'))
+    assert (title.value, year.value, str(category), director.value) == ('Title 1', 2001, 'DRAMA', 'Stanley Kubrick')
+
+
+### MovieImporter ###
+
+def test_import_uploads_every_row(csv_file):
+    progress = []
+    with requests_mock.Mocker() as request_mock:
+        request_mock.post(MOVIES_URL, status_code=201, json={})
+        report = MovieImporter(MovieDealer(), 'token', ImportConfig(workers=4, max_in_flight=3),
+                               on_progress=lambda ok, ko: progress.append(ok)).run(str(csv_file))
+        assert request_mock.call_count == 10
+        titles = sorted(json.loads(request.body)['title'] for request in request_mock.request_history)
+        assert titles == sorted(f'Title {i}' for i in range(10))
+        assert request_mock.request_history[0].headers['Authorization'] == 'Token token'
+    assert (report.imported, report.failed, report.skipped, report.errors) == (10, 0, 0, ())
+    assert sorted(progress) == list(range(1, 11))
+
+
+def test_import_reports_invalid_rows(jsonl_file):
+    with requests_mock.Mocker() as request_mock:
+        request_mock.post(MOVIES_URL, status_code=201, json={})
+        report = MovieImporter(MovieDealer(), 'token').run(str(jsonl_file))
+        assert request_mock.call_count == 2
+    assert (report.imported, report.failed) == (2, 5)
+    assert [(error.line, error.stage) for error in report.errors] == [
+        (3, 'validation'), (4, 'read'), (5, 'read'), (7, 'validation'), (8, 'validation')]
+    assert report.errors[0].message == 'Year must be between 1900 and current year.'
+    assert report.errors[3].message == "Missing field 'year'"
+    assert report.errors[4].message == "Unknown category 'CARTOON'"
+
+
+def test_import_resumes_failed_uploads_from_checkpoint(csv_file, tmp_path):
+    checkpoint = tmp_path / 'movies.checkpoint'
+    with requests_mock.Mocker() as request_mock:
+        request_mock.post(MOVIES_URL, [{'status_code': 201, 'json': {}}] * 3 + [{'status_code': 500}] +
+                          [{'status_code': 201, 'json': {}}] * 20)
+        report = MovieImporter(MovieDealer(), 'token', ImportConfig(workers=1),
+                               checkpoint_path=str(checkpoint)).run(str(csv_file))
+        assert (report.imported, report.failed) == (9, 1)
+        assert report.errors == (RowError(5, 'upload', 'The server rejected the movie'),)
+        assert checkpoint.exists()
+
+        report = MovieImporter(MovieDealer(), 'token', checkpoint_path=str(checkpoint)).run(str(csv_file))
+        assert (report.imported, report.failed, report.skipped) == (1, 0, 9)
+        assert json.loads(request_mock.last_request.body)['title'] == 'Title 3'
+        assert not checkpoint.exists()
+
+
+def test_checkpoint_of_another_file_is_ignored(tmp_path):
+    path = tmp_path / 'checkpoint'
+    first = Checkpoint(str(path), 'a.csv')
+    for row in (0, 1, 3):
+        first.mark(row)
+    first.save()
+    assert json.loads(path.read_text())['next'] == 2
+    assert json.loads(path.read_text())['done'] == [3]
+    resumed = Checkpoint(str(path), 'a.csv')
+    assert [resumed.is_done(row) for row in range(5)] == [True, True, False, True, False]
+    assert not Checkpoint(str(path), 'b.csv').is_done(0)
+
+
+def test_report_summary_and_error_file(tmp_path):
+    report = ImportReport(8, 1, 2, 2.0, (RowError(3, 'validation', 'Bad title'),))
+    assert report.rows_per_second == 4.0
+    assert report.summary() == 'Imported 8 movies, 1 failed, 2 skipped in 2.0 s (4.0 movies/s)'
+    path = tmp_path / 'errors.csv'
+    write_error_report(report, str(path))
+    assert path.read_text().splitlines() == ['line,stage,message', '3,validation,Bad title']
+
+
+def test_create_sizes_the_pool_for_the_workers():
+    importer = MovieImporter.create('token', ImportConfig(workers=32))
+    assert importer.dealer.pool.config.pool_maxsize == 32
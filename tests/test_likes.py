@@ -0,0 +1,216 @@
+import threading
+
+import pytest
+import requests_mock
+from requests.exceptions import ConnectionError
+from valid8 import ValidationError
+
+from movie.domain import MovieDealer, Id
+from movie.likes import LikeQueue, LikeQueueConfig, LikeQueueStats
+
+API = 'http://localhost:8000/api/v1'
+
+
+class Recorder:
+    def __init__(self, results=None):
+        self.calls = []
+        self.results = list(results or [])
+        self.lock = threading.Lock()
+
+    def __call__(self, key, movie_id, liked):
+        with self.lock:
+            self.calls.append((key, movie_id, liked))
+            result = self.results.pop(0) if self.results else True
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def manual(recorder, **config):
+    # a long delay keeps the background worker out of the way, so the tests flush by hand
+    return LikeQueue(recorder, LikeQueueConfig(**{'delay': 60.0, 'retry_backoff': 0.0, **config}))
+
+
+# TESTING LikeQueueConfig
+
+@pytest.mark.parametrize('config', [{'delay': -1.0}, {'max_batch': 0}, {'max_concurrency': 0},
+                                    {'max_attempts': 0}, {'retry_backoff': -0.1}, {'flush_timeout': -1.0}])
+def test_like_queue_config_rejects_invalid_values(config):
+    with pytest.raises(ValidationError):
+        LikeQueueConfig(**config)
+
+
+# TESTING LikeQueue
+
+def test_like_queue_sends_only_the_last_change():
+    recorder = Recorder()
+    queue = manual(recorder)
+    for liked in (True, False, True):
+        queue.put('token', 1, liked)
+    queue.put('token', 2, False)
+    assert queue.pending('token') == {1: True, 2: False}
+    assert queue.flush() == 0
+    assert sorted(recorder.calls) == [('token', 1, True), ('token', 2, False)]
+    assert queue.stats == LikeQueueStats(queued=4, coalesced=2, sent=2)
+    queue.stop()
+
+
+def test_like_queue_drops_changes_that_restore_the_server_state():
+    recorder = Recorder()
+    queue = manual(recorder)
+    queue.seed('token', [1])
+    queue.put('token', 1, False)
+    queue.put('token', 1, True)
+    queue.put('token', 2, True)
+    queue.put('token', 2, False)
+    assert queue.pending('token') == {}
+    assert queue.flush() == 0
+    assert recorder.calls == []
+    queue.stop()
+
+
+def test_like_queue_keeps_users_apart():
+    recorder = Recorder()
+    queue = manual(recorder)
+    queue.put('alice', 1, True)
+    queue.put('bob', 1, False)
+    assert queue.flush('alice') == 0
+    assert recorder.calls == [('alice', 1, True)]
+    assert queue.pending('bob') == {1: False}
+    queue.stop()
+
+
+def test_like_queue_retries_connection_errors():
+    recorder = Recorder([ConnectionError(), ConnectionError(), True])
+    queue = manual(recorder)
+    queue.put('token', 1, True)
+    assert queue.flush() == 0
+    assert len(recorder.calls) == 3
+    assert queue.stats.retried == 2
+    assert queue.stats.sent == 1
+    queue.stop()
+
+
+def test_like_queue_gives_up_after_max_attempts():
+    recorder = Recorder([ConnectionError()] * 3)
+    queue = manual(recorder, max_attempts=3)
+    queue.put('token', 1, True)
+    assert queue.flush() == 0
+    assert len(recorder.calls) == 3
+    assert queue.stats.failed == 1
+    queue.stop()
+
+
+def test_like_queue_does_not_retry_rejected_changes():
+    recorder = Recorder([False])
+    queue = manual(recorder)
+    queue.put('token', 1, True)
+    queue.flush()
+    assert len(recorder.calls) == 1
+    assert queue.stats.failed == 1
+    queue.stop()
+
+
+def test_like_queue_flush_reports_unsent_changes_on_timeout():
+    recorder = Recorder([ConnectionError()] * 10)
+    queue = manual(recorder, retry_backoff=60.0)
+    queue.put('token', 1, True)
+    assert queue.flush(timeout=0.05) == 1
+    queue.stop(timeout=0)
+
+
+def test_like_queue_overlays_pending_changes():
+    queue = manual(Recorder())
+    queue.put('token', 1, False)
+    queue.put('token', 3, True)
+    queue.put('token', 4, True)
+    liked = [{'id': 1}, {'id': 2}]
+    res = queue.overlay('token', liked, lambda movie_id: {'id': movie_id} if movie_id == 3 else None)
+    assert res == [{'id': 2}, {'id': 3}]
+    assert queue.overlay('other', liked, lambda movie_id: None) is liked
+    queue.stop()
+
+
+def test_like_queue_flushes_in_background():
+    recorder = Recorder()
+    queue = LikeQueue(recorder, LikeQueueConfig(delay=0.0))
+    queue.put('token', 1, True)
+    for _ in range(200):
+        if queue.stats.sent:
+            break
+        threading.Event().wait(0.01)
+    assert recorder.calls == [('token', 1, True)]
+    queue.stop()
+
+
+def test_like_queue_batches_are_bounded():
+    recorder = Recorder()
+    queue = manual(recorder, max_batch=2)
+    for movie_id in range(5):
+        queue.put('token', movie_id, True)
+    assert queue.flush() == 0
+    assert len(recorder.calls) == 5
+    queue.stop()
+
+
+# TESTING MovieDealer with write behind
+
+@pytest.fixture
+def dealer():
+    res = MovieDealer(write_behind=LikeQueueConfig(delay=60.0, retry_backoff=0.0))
+    yield res
+    res.close()
+
+
+def test_dealer_answers_likes_without_requests(dealer):
+    with requests_mock.Mocker() as request_mock:
+        assert dealer.add_like('token', Id(1))
+        assert dealer.remove_like('token', Id(2))
+        assert dealer.add_likes('token', [Id(3), Id(4)]) == {3: True, 4: True}
+        assert request_mock.call_count == 0
+
+
+def test_dealer_coalesces_toggles_before_flush(dealer):
+    with requests_mock.Mocker() as request_mock:
+        request_mock.post(f'{API}/likes/', status_code=201)
+        request_mock.delete(f'{API}/likes/by_movie/1/', status_code=204)
+        for _ in range(3):
+            dealer.add_like('token', Id(1))
+            dealer.remove_like('token', Id(1))
+        dealer.add_like('token', Id(1))
+        assert dealer.flush_likes() == 0
+        assert [(r.method, r.text) for r in request_mock.request_history] == [('POST', 'movie=1')]
+
+
+def test_dealer_liked_movies_include_pending_changes(dealer):
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get(f'{API}/movies/user_liked_movies/', json=[{'id': 1, 'title': 'A'}, {'id': 2, 'title': 'B'}])
+        request_mock.get(f'{API}/movies/3/', json={'id': 3, 'title': 'C'})
+        request_mock.post(f'{API}/likes/', status_code=201)
+        request_mock.delete(f'{API}/likes/by_movie/1/', status_code=204)
+        dealer.remove_like('token', Id(1))
+        dealer.add_like('token', Id(3))
+        assert dealer.get_liked_movies('token') == [{'id': 2, 'title': 'B'}, {'id': 3, 'title': 'C'}]
+        dealer.flush_likes()
+
+
+def test_dealer_flushes_likes_on_logout(dealer):
+    with requests_mock.Mocker() as request_mock:
+        request_mock.post(f'{API}/likes/', status_code=201)
+        request_mock.post(f'{API}/auth/logout/', status_code=200)
+        dealer.add_like('token', Id(1))
+        assert dealer.logout('token')
+        assert [r.path for r in request_mock.request_history] == ['/api/v1/likes/', '/api/v1/auth/logout/']
+
+
+def test_dealer_flushes_likes_on_close():
+    dealer = MovieDealer(write_behind=LikeQueueConfig(delay=60.0))
+    with requests_mock.Mocker() as request_mock:
+        request_mock.delete(f'{API}/likes/by_movie/1/', status_code=204)
+        dealer.remove_like('token', Id(1))
+        dealer.close()
+        assert request_mock.call_count == 1
+
+
+def test_dealer_without_write_behind_flushes_nothing():
+    assert MovieDealer().flush_likes() == 0
@@ -0,0 +1,80 @@
+import json
+
+import pytest
+
+from movie.metrics import EndpointMetrics, endpoint
+
+
+def test_endpoint_folds_ids_and_directors():
+    assert endpoint('get', '/movies/12/') == ('GET', '/movies/{id}/')
+    assert endpoint('delete', '/likes/by_movie/7/') == ('DELETE', '/likes/by_movie/{id}/')
+    assert endpoint('get', '/movies/filter-by-director/Ridley Scott/') == \
+        ('GET', '/movies/filter-by-director/{director}/')
+    assert endpoint('get', '/movies/user-type/') == ('GET', '/movies/user-type/')
+
+
+def test_record_counts_errors_and_bytes():
+    metrics = EndpointMetrics()
+    metrics.record('get', '/movies/1/', 0.002, 100)
+    metrics.record('get', '/movies/2/', 0.004, 50, error=True)
+    metrics.record('post', '/likes/', 0.003)
+    likes, movie = metrics.snapshot()
+    assert (likes.method, likes.path, likes.count) == ('POST', '/likes/', 1)
+    assert (movie.path, movie.count, movie.errors, movie.bytes) == ('/movies/{id}/', 2, 1, 150)
+    assert movie.error_ratio == 0.5
+    assert movie.total == pytest.approx(0.006)
+
+
+def test_quantiles_come_from_the_histogram():
+    metrics = EndpointMetrics()
+    for _ in range(90):
+        metrics.record('get', '/movies/', 0.0008)
+    for _ in range(10):
+        metrics.record('get', '/movies/', 0.3)
+    stats, = metrics.snapshot()
+    assert 0 < stats.p50 <= 0.001
+    assert 0.25 < stats.p95 <= 0.5
+    assert stats.p50 <= stats.p95 <= stats.p99
+
+
+def test_count_bytes_adds_the_streamed_body():
+    metrics = EndpointMetrics()
+    metrics.record('get', '/movies/', 0.01)
+    assert b''.join(metrics.count_bytes('get', '/movies/', [b'[1,', b'2]'])) == b'[1,2]'
+    assert metrics.snapshot()[0].bytes == 5
+
+
+def test_prometheus_text_has_counters_and_cumulative_buckets():
+    metrics = EndpointMetrics()
+    metrics.record('get', '/movies/1/', 0.002, 10)
+    metrics.record('get', '/movies/1/', 20.0, 10, error=True)
+    text = metrics.to_prometheus()
+    labels = 'method="GET",path="/movies/{id}/"'
+    assert f'movie_requests_total{{{labels}}} 2' in text
+    assert f'movie_request_errors_total{{{labels}}} 1' in text
+    assert f'movie_response_bytes_total{{{labels}}} 20' in text
+    assert f'movie_request_duration_seconds_bucket{{{labels},le="0.0025"}} 1' in text
+    assert f'movie_request_duration_seconds_bucket{{{labels},le="10.0"}} 1' in text
+    assert f'movie_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2' in text
+    assert f'movie_request_duration_seconds_count{{{labels}}} 2' in text
+    assert '# TYPE movie_request_duration_seconds histogram' in text
+
+
+def test_export_picks_the_format_from_the_extension(tmp_path):
+    metrics = EndpointMetrics()
+    metrics.record('get', '/movies/', 0.01, 3)
+    assert metrics.export(str(tmp_path / 'stats.json')) == 'json'
+    document = json.loads((tmp_path / 'stats.json').read_text())
+    assert document['endpoints'][0]['path'] == '/movies/'
+    assert document['endpoints'][0]['bytes'] == 3
+    assert metrics.export(str(tmp_path / 'stats.prom')) == 'prometheus'
+    assert 'movie_requests_total' in (tmp_path / 'stats.prom').read_text()
+    with pytest.raises(ValueError):
+        metrics.export(str(tmp_path / 'stats.out'), 'xml')
+
+
+def test_reset_forgets_everything():
+    metrics = EndpointMetrics()
+    metrics.record('get', '/movies/', 0.01)
+    metrics.reset()
+    assert metrics.snapshot() == []
@@ -0,0 +1,81 @@
+from unittest.mock import patch
+
+import pytest
+from valid8 import ValidationError
+
+from movie.render import Column, TableRenderer
+
+FMT = '{:4}\t{:40}\t{:25}\t{:15}\t{:4}'
+
+
+@pytest.fixture
+def movie():
+    return {'id': 1, 'title': 'A title', 'description': 'A description', 'year': 2020, 'category': 'ACTION',
+            'director': 'A director'}
+
+
+@pytest.fixture
+def written():
+    return []
+
+
+@pytest.fixture
+def renderer(written):
+    return TableRenderer(write=written.append)
+
+
+def test_column_width_must_be_positive():
+    with pytest.raises(ValidationError):
+        Column('id', 'ID', 0)
+
+
+def test_header_matches_classic_layout(renderer):
+    assert renderer.header == FMT.format('ID', 'TITLE', 'DIRECTOR', 'CATEGORY', 'YEAR')
+
+
+def test_format_row_matches_classic_layout(renderer, movie):
+    assert renderer.format_row(movie) == FMT.format(1, 'A title', 'A director', 'ACTION', 2020) + '\n'
+
+
+def test_format_row_truncates_long_text(renderer, movie):
+    row = renderer.format_row({**movie, 'title': 'T' * 60, 'director': 'D' * 30})
+    title, director = row.split('\t')[1:3]
+    assert title == 'T' * 39 + '…'
+    assert director == 'D' * 24 + '…'
+
+
+def test_format_row_is_cached_per_id_and_version(renderer, movie):
+    assert renderer.format_row({**movie, 'version': 1}) is renderer.format_row({**movie, 'version': 1})
+    assert 'B title' not in renderer.format_row({**movie, 'title': 'B title', 'version': 1})
+    assert 'B title' in renderer.format_row({**movie, 'title': 'B title', 'version': 2})
+
+
+def test_format_row_without_version_follows_content(renderer, movie):
+    renderer.format_row(movie)
+    assert 'B title' in renderer.format_row({**movie, 'title': 'B title'})
+
+
+def test_write_rows_flushes_first_row_then_batches(written, movie):
+    renderer = TableRenderer(write=written.append, batch_rows=3, flush_interval=60.0)
+    assert renderer.write_rows({**movie, 'id': i} for i in range(8)) == 8
+    assert [chunk.count('\n') for chunk in written] == [1, 3, 3, 1]
+
+
+def test_write_rows_flushes_when_source_is_slow(written, movie):
+    renderer = TableRenderer(write=written.append, batch_rows=1000, flush_interval=0.0)
+    renderer.write_rows({**movie, 'id': i} for i in range(3))
+    assert len(written) == 3
+
+
+def test_render_prints_title_and_header(renderer, written, movie):
+    with patch('builtins.print') as mock_print:
+        assert renderer.render([movie, {**movie, 'id': 2}], 'ALL MOVIES') == 2
+        mock_print.assert_any_call('ALL MOVIES')
+        mock_print.assert_any_call(FMT.format('ID', 'TITLE', 'DIRECTOR', 'CATEGORY', 'YEAR'))
+    assert ''.join(written).count('\n') == 2
+
+
+def test_single_column_table(written, movie):
+    renderer = TableRenderer((Column('title', 'TITLE', 5),), write=written.append)
+    renderer.write_rows([movie])
+    assert written == ['A ti…\n']
@@ -0,0 +1,304 @@
+import threading
+
+import pytest
+import requests_mock
+from requests.exceptions import ConnectionError
+
+from movie.domain import MovieDealer, Id, Director, Username, Password, Title, Description, Year, Category, \
+    ImageUrl
+from movie.replica import Replica, SyncEngine, SyncStats
+from movie.session import HttpPool
+
+API = 'http://localhost:8000/api/v1'
+IMAGE_URL = 'https://image.tmdb.org/t/p/w500/6KErczPBROQty7QoIsaa6wJYXZi.jpg'
+
+
+def movie(i, title=None, director='Stanley Kubrick'):
+    return {'id': i, 'title': title or f'Title {i}', 'description': 'Description', 'year': 2000,
+            'category': 'ACTION', 'director': director, 'image_url': IMAGE_URL}
+
+
+MOVIES = [movie(3, 'Clockwork'), movie(1, 'Barry Lyndon'), movie(2, 'Alien', 'Ridley Scott')]
+
+
+@pytest.fixture
+def replica():
+    res = Replica()
+    yield res
+    res.close()
+
+
+@pytest.fixture
+def engine(replica):
+    pool = HttpPool()
+    yield SyncEngine(replica, pool, API)
+    pool.close()
+
+
+@pytest.fixture
+def dealer():
+    res = MovieDealer.with_replica(':memory:')
+    yield res
+    res.close()
+
+
+def login(dealer, request_mock, token='token'):
+    request_mock.post(f'{API}/auth/login/', json={'key': token})
+    request_mock.get(f'{API}/auth/user/', json={'is_staff': False})
+    return dealer.login(Username('username'), Password('A_p@ssw0rd'))
+
+
+# TESTING Replica
+
+def test_replica_starts_empty(replica):
+    assert not replica.has_movies()
+    assert replica.movies() == []
+    assert replica.pending() == []
+
+
+def test_replica_replaces_and_reads_movies(replica):
+    assert replica.replace_movies(MOVIES, '"v1"') == 3
+    assert replica.has_movies()
+    assert replica.get_meta('movies_etag') == '"v1"'
+    assert [m['id'] for m in replica.movies()] == [1, 2, 3]
+    assert [m['title'] for m in replica.sorted_by_title()] == ['Alien', 'Barry Lyndon', 'Clockwork']
+    assert replica.movie(3) == MOVIES[0]
+    assert replica.movie(4) is None
+
+
+def test_replica_replace_drops_missing_movies(replica):
+    replica.replace_movies(MOVIES)
+    replica.replace_movies(MOVIES[:1])
+    assert replica.movies() == MOVIES[:1]
+
+
+def test_replica_iterates_in_batches(replica):
+    replica.replace_movies([movie(i) for i in range(1, 26)])
+    assert [m['id'] for m in replica.iter_movies(batch=10)] == list(range(1, 26))
+
+
+def test_replica_upsert_and_remove(replica):
+    replica.replace_movies(MOVIES)
+    replica.upsert_movie(movie(1, 'Zardoz'))
+    replica.remove_movie(2)
+    assert [m['title'] for m in replica.sorted_by_title()] == ['Clockwork', 'Zardoz']
+
+
+def test_replica_filters_by_director(replica):
+    replica.replace_movies(MOVIES)
+    assert [m['id'] for m in replica.filter_by_director('stanley  KUBRICK')] == [1, 3]
+    assert [m['id'] for m in replica.filter_by_director('Scott')] == [2]
+    assert [m['id'] for m in replica.filter_by_director('Ridl')] == [2]
+    assert replica.filter_by_director('Nolan') == []
+
+
+def test_replica_keeps_likes_per_owner(replica):
+    replica.replace_movies(MOVIES)
+    replica.replace_likes('alice', [MOVIES[0]])
+    replica.like('alice', 2)
+    replica.like('bob', 1)
+    replica.unlike('alice', 3)
+    assert replica.has_likes('alice')
+    assert [m['id'] for m in replica.liked_movies('alice')] == [2]
+    assert [m['id'] for m in replica.liked_movies('bob')] == [1]
+    assert not replica.has_likes('carol')
+
+
+def test_replica_outbox_is_ordered(replica):
+    first = replica.enqueue('alice', 'post', '/likes/', {'data': {'movie': 1}})
+    second = replica.enqueue('bob', 'delete', '/likes/by_movie/1/', {})
+    assert [w.seq for w in replica.pending()] == [first, second]
+    assert [w.request for w in replica.pending('alice')] == [{'data': {'movie': 1}}]
+    replica.done(first)
+    assert [w.owner for w in replica.pending()] == ['bob']
+
+
+def test_replica_persists_to_file(tmp_path):
+    path = str(tmp_path / 'replica.db')
+    replica = Replica(path)
+    replica.replace_movies(MOVIES, '"v1"')
+    replica.enqueue('alice', 'post', '/likes/', {'data': {'movie': 1}})
+    replica.close()
+    replica = Replica(path)
+    assert replica.has_movies()
+    assert len(replica.movies()) == 3
+    assert len(replica.pending()) == 1
+    replica.close()
+
+
+def test_replica_reads_from_other_threads(replica):
+    replica.replace_movies(MOVIES)
+    res = []
+    thread = threading.Thread(target=lambda: res.append(len(replica.movies())))
+    thread.start()
+    thread.join()
+    assert res == [3]
+
+
+# TESTING SyncEngine
+
+def test_sync_pulls_movies_and_etag(engine, replica):
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get(f'{API}/movies/', json=MOVIES, headers={'ETag': '"v1"'})
+        assert engine.sync_once()
+    assert len(replica.movies()) == 3
+    assert replica.get_meta('movies_etag') == '"v1"'
+    assert engine.stats == SyncStats(syncs=1, online=True)
+
+
+def test_sync_sends_etag_and_keeps_movies_on_304(engine, replica):
+    replica.replace_movies(MOVIES, '"v1"')
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get(f'{API}/movies/', status_code=304)
+        assert engine.sync_once()
+        assert request_mock.last_request.headers['If-None-Match'] == '"v1"'
+    assert len(replica.movies()) == 3
+
+
+def test_sync_marks_offline_on_connection_error(engine, replica):
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get(f'{API}/movies/', exc=ConnectionError)
+        assert not engine.sync_once()
+    assert engine.online is False
+    assert engine.stats.failures == 1
+
+
+def test_sync_replays_outbox_and_pulls_likes(engine, replica):
+    engine.login('token', 'alice')
+    replica.enqueue('alice', 'post', '/likes/', {'data': {'movie': 1}})
+    replica.enqueue('alice', 'delete', '/likes/by_movie/9/', {})
+    replica.enqueue('bob', 'post', '/likes/', {'data': {'movie': 2}})
+    with requests_mock.Mocker() as request_mock:
+        request_mock.post(f'{API}/likes/', status_code=201)
+        request_mock.delete(f'{API}/likes/by_movie/9/', status_code=404)
+        request_mock.get(f'{API}/movies/', json=MOVIES)
+        request_mock.get(f'{API}/movies/user_liked_movies/', json=[MOVIES[1]])
+        assert engine.sync_once()
+        posted = [r for r in request_mock.request_history if r.method == 'POST']
+    assert posted[0].headers['Authorization'] == 'Token token'
+    assert posted[0].text == 'movie=1'
+    assert [w.owner for w in replica.pending()] == ['bob']
+    assert engine.stats.replayed == 1
+    assert engine.stats.rejected == 1
+    assert replica.liked_movies('alice') == [MOVIES[1]]
+
+
+def test_sync_keeps_outbox_when_server_fails(engine, replica):
+    engine.login('token', 'alice')
+    replica.enqueue('alice', 'post', '/likes/', {'data': {'movie': 1}})
+    with requests_mock.Mocker() as request_mock:
+        request_mock.post(f'{API}/likes/', status_code=503)
+        request_mock.get(f'{API}/movies/', json=MOVIES)
+        request_mock.get(f'{API}/movies/user_liked_movies/', json=[])
+        engine.sync_once()
+    assert len(replica.pending()) == 1
+
+
+def test_sync_forgets_logged_out_sessions(engine):
+    engine.login('token', 'alice')
+    assert engine.owner('token') == 'alice'
+    engine.logout('token')
+    assert engine.owner('token') is None
+
+
+def test_sync_runs_in_background(engine, replica):
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get(f'{API}/movies/', json=MOVIES)
+        engine.start()
+        for _ in range(200):
+            if replica.has_movies():
+                break
+            threading.Event().wait(0.01)
+        engine.stop(timeout=5)
+    assert replica.has_movies()
+
+
+# TESTING MovieDealer with a replica
+
+def test_dealer_lists_from_replica_without_network(dealer):
+    dealer.replica.replace_movies(MOVIES)
+    with requests_mock.Mocker() as request_mock:
+        assert [m['id'] for m in dealer.get_movies()] == [1, 2, 3]
+        assert [m['id'] for m in dealer.iter_movies()] == [1, 2, 3]
+        assert [m['title'] for m in dealer.sort_movies_by_title()][0] == 'Alien'
+        assert [m['id'] for m in dealer.filter_movies_by_director(Director('Ridley Scott'))] == [2]
+        assert dealer.get_movie(Id(3)) == MOVIES[0]
+        assert request_mock.call_count == 0
+
+
+def test_dealer_seeds_replica_from_first_listing(dealer):
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get(f'{API}/movies/', json=MOVIES, headers={'ETag': '"v1"'})
+        dealer.get_movies()
+    assert dealer.replica.has_movies()
+    assert dealer.replica.get_meta('movies_etag') == '"v1"'
+
+
+def test_dealer_returns_empty_list_when_offline_and_empty(dealer):
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get(f'{API}/movies/', exc=ConnectionError)
+        assert dealer.get_movies() == []
+
+
+def test_dealer_without_replica_still_raises_when_offline():
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get(f'{API}/movies/user_liked_movies/', exc=ConnectionError)
+        with pytest.raises(ConnectionError):
+            MovieDealer().get_liked_movies('token')
+
+
+def test_dealer_queues_like_when_offline(dealer):
+    dealer.replica.replace_movies(MOVIES)
+    with requests_mock.Mocker() as request_mock:
+        token = login(dealer, request_mock)
+        request_mock.post(f'{API}/likes/', exc=ConnectionError)
+        request_mock.get(f'{API}/movies/user_liked_movies/', exc=ConnectionError)
+        assert dealer.add_like(token, Id(2))
+        assert dealer.get_liked_movies(token) == [MOVIES[2]]
+    queued = dealer.replica.pending('username')
+    assert [(w.method, w.path, w.request) for w in queued] == [('post', '/likes/', {'data': {'movie': 2}})]
+
+
+def test_dealer_queues_movie_writes_when_offline(dealer):
+    dealer.replica.replace_movies(MOVIES)
+    with requests_mock.Mocker() as request_mock:
+        token = login(dealer, request_mock)
+        request_mock.delete(f'{API}/movies/2/', exc=ConnectionError)
+        request_mock.post(f'{API}/movies/', exc=ConnectionError)
+        assert dealer.remove_movie(token, Id(2))
+        assert dealer.add_movie(token, Title('New'), Description('Description'), Year(2001),
+                                Category(Category.MovieCategory.ACTION), Director('Stanley Kubrick'),
+                                ImageUrl(IMAGE_URL))
+    assert [m['id'] for m in dealer.get_movies()] == [1, 3]
+    queued = dealer.replica.pending('username')
+    assert [w.method for w in queued] == ['delete', 'post']
+    assert queued[1].request['headers'] == {'Content-Type': 'application/json'}
+    assert 'Authorization' not in str(queued)
+
+
+def test_dealer_does_not_queue_without_login(dealer):
+    with requests_mock.Mocker() as request_mock:
+        request_mock.post(f'{API}/likes/', exc=ConnectionError)
+        with pytest.raises(ConnectionError):
+            dealer.add_like('token', Id(1))
+    assert dealer.replica.pending() == []
+
+
+def test_dealer_mirrors_successful_writes(dealer):
+    dealer.replica.replace_movies(MOVIES)
+    with requests_mock.Mocker() as request_mock:
+        token = login(dealer, request_mock)
+        request_mock.post(f'{API}/likes/', status_code=201)
+        request_mock.put(f'{API}/movies/1/', status_code=200)
+        assert dealer.add_like(token, Id(1))
+        assert dealer.update_movie(token, movie(1, 'Renamed'))
+    assert dealer.replica.liked_movies('username') == [movie(1, 'Renamed')]
+    assert dealer.replica.movie(1)['title'] == 'Renamed'
+
+
+def test_dealer_logout_forgets_session(dealer):
+    with requests_mock.Mocker() as request_mock:
+        token = login(dealer, request_mock)
+        request_mock.post(f'{API}/auth/logout/', status_code=200)
+        dealer.logout(token)
+    assert dealer.sync.owner(token) is None
@@ -0,0 +1,168 @@
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest.mock import patch
+
+import pytest
+import requests_mock
+from requests.exceptions import ConnectionError
+from valid8 import ValidationError
+
+from movie.domain import MovieDealer
+from movie.session import PoolConfig, DnsCache, HttpPool, PooledAdapter
+
+
+class Ok(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = self.headers['Host'].encode()
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+### PoolConfig ###
+
+@pytest.mark.parametrize('values', [
+    {'pool_connections': 0},
+    {'pool_maxsize': 0},
+    {'dns_cache_ttl': -1.0},
+    {'warm_up_timeout': -1.0},
+])
+def test_invalid_pool_config_raises_exception(values):
+    with pytest.raises(ValidationError):
+        PoolConfig(**values)
+
+
+def test_pool_config_type_raises_exception():
+    with pytest.raises(TypeError):
+        PoolConfig(pool_maxsize='16')
+
+
+### DnsCache ###
+
+def test_dns_cache_resolves_once_within_ttl():
+    cache = DnsCache(60.0)
+    with patch('socket.getaddrinfo', return_value=[(2, 1, 6, '', ('127.0.0.1', 8000))]) as getaddrinfo:
+        assert cache.resolve('localhost', 8000) == ('127.0.0.1',)
+        assert cache.resolve('localhost', 8000) == ('127.0.0.1',)
+        getaddrinfo.assert_called_once()
+
+
+def test_dns_cache_resolves_again_after_clear():
+    cache = DnsCache(60.0)
+    with patch('socket.getaddrinfo', return_value=[(2, 1, 6, '', ('127.0.0.1', 8000))]) as getaddrinfo:
+        cache.resolve('localhost', 8000)
+        cache.clear()
+        cache.resolve('localhost', 8000)
+        assert getaddrinfo.call_count == 2
+
+
+def test_dns_cache_disabled_returns_host():
+    with patch('socket.getaddrinfo') as getaddrinfo:
+        assert DnsCache(0.0).resolve('localhost', 8000) == ('localhost',)
+        getaddrinfo.assert_not_called()
+
+
+def test_dns_cache_returns_host_when_lookup_fails():
+    with patch('socket.getaddrinfo', side_effect=OSError):
+        assert DnsCache(60.0).resolve('unknown.host', 80) == ('unknown.host',)
+
+
+def test_dns_cache_keeps_every_address():
+    infos = [(10, 1, 6, '', ('::1', 8000, 0, 0)), (2, 1, 6, '', ('127.0.0.1', 8000)),
+             (2, 1, 6, '', ('127.0.0.1', 8000))]
+    cache = DnsCache(60.0)
+    with patch('socket.getaddrinfo', return_value=infos):
+        assert cache.resolve('localhost', 8000) == ('::1', '127.0.0.1')
+        cache.prefer('localhost', 8000, '127.0.0.1')
+        assert cache.resolve('localhost', 8000) == ('127.0.0.1', '::1')
+
+
+def test_pool_falls_back_to_the_next_address():
+    # localhost resolving to ::1 first while the server listens on 127.0.0.1 only, as runserver does
+    server = HTTPServer(('127.0.0.1', 0), Ok)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    # nothing listens on this address, so the first connection attempt is refused
+    infos = [(2, 1, 6, '', ('127.0.0.2', port)), (2, 1, 6, '', ('127.0.0.1', port))]
+    getaddrinfo = socket.getaddrinfo
+    pool = HttpPool()
+    try:
+        # only the name is faked, each address is still looked up as itself when connecting
+        with patch('socket.getaddrinfo', side_effect=lambda host, *args, **kwargs:
+                   infos if host == 'localhost' else getaddrinfo(host, *args, **kwargs)):
+            response = pool.request('get', f'http://localhost:{port}/')
+        assert response.status_code == 200
+        # TLS and the Host header of the next requests on the connection keep the name, not the address
+        assert pool.request('get', f'http://localhost:{port}/').text == f'localhost:{port}'
+        assert pool.dns_cache.resolve('localhost', port)[0] == '127.0.0.1'
+    finally:
+        pool.close()
+        server.shutdown()
+        server.server_close()
+
+
+### HttpPool ###
+
+def test_pool_mounts_configured_adapter():
+    pool = HttpPool(PoolConfig(pool_connections=2, pool_maxsize=8))
+    adapter = pool.session.get_adapter('http://localhost:8000/api/v1/')
+    assert isinstance(adapter, PooledAdapter)
+    assert adapter._pool_maxsize == 8
+    assert adapter._pool_connections == 2
+
+
+def test_pool_reuses_session_until_closed():
+    pool = HttpPool()
+    session = pool.session
+    assert pool.session is session
+    pool.close()
+    assert pool.session is not session
+
+
+def test_pool_without_keep_alive_closes_connections():
+    assert HttpPool(PoolConfig(keep_alive=False)).session.headers['Connection'] == 'close'
+
+
+def test_warm_up_returns_true_when_server_reachable():
+    with requests_mock.Mocker() as request_mock:
+        request_mock.head('http://localhost:8000/api/v1/', status_code=200)
+        assert HttpPool().warm_up('http://localhost:8000/api/v1/') is True
+
+
+def test_warm_up_returns_false_when_server_unreachable():
+    with requests_mock.Mocker() as request_mock:
+        request_mock.head('http://localhost:8000/api/v1/', exc=ConnectionError)
+        assert HttpPool().warm_up('http://localhost:8000/api/v1/') is False
+
+
+### MovieDealer ###
+
+def test_movie_dealer_shares_one_session_between_endpoints():
+    dealer = MovieDealer()
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get('http://localhost:8000/api/v1/movies/', json=[])
+        request_mock.get('http://localhost:8000/api/v1/movies/user-type/', json={'user-type': 'admin'})
+        session = dealer.pool.session
+        dealer.get_movies()
+        dealer.is_admin_user('token')
+        assert dealer.pool.session is session
+
+
+def test_movie_dealer_closes_pool_on_exit():
+    with patch.object(HttpPool, 'close') as close:
+        with MovieDealer():
+            pass
+        close.assert_called_once()
+
+
+def test_movie_dealer_uses_configured_api_server():
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get('http://stub:9000/api/v1/movies/user-type/', json={'user-type': 'admin'})
+        assert MovieDealer(api_server='http://stub:9000/api/v1').is_admin_user('token') is True
@@ -0,0 +1,139 @@
+import json
+
+import pytest
+import requests_mock
+
+from movie.domain import MovieDealer
+from movie.stream import ListingMetrics, ListingStats, iter_json_array
+
+MOVIES_URL = 'http://localhost:8000/api/v1/movies/'
+
+
+@pytest.fixture
+def json_movies():
+    return [{'id': i, 'title': f'Title {i}', 'description': 'A description', 'year': 2020, 'category': 'ACTION',
+             'director': 'A director'} for i in range(5, 0, -1)]
+
+
+def chunked(data: bytes, size: int):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+### iter_json_array ###
+
+@pytest.mark.parametrize('size', [1, 2, 7, 1000])
+def test_iter_json_array_parses_any_chunking(json_movies, size):
+    data = json.dumps(json_movies, indent=1).encode()
+    assert list(iter_json_array(chunked(data, size))) == json_movies
+
+
+def test_iter_json_array_handles_split_multibyte_characters():
+    data = json.dumps([{'title': 'Amélie'}, {'title': '千と千尋'}], ensure_ascii=False).encode()
+    assert list(iter_json_array(chunked(data, 1))) == [{'title': 'Amélie'}, {'title': '千と千尋'}]
+
+
+def test_iter_json_array_does_not_split_scalars():
+    assert list(iter_json_array([b'[12', b'34, 5', b'6]'])) == [1234, 56]
+
+
+@pytest.mark.parametrize('data', [b'[]', b'  [ ]  ', b'[\n]'])
+def test_iter_json_array_empty(data):
+    assert list(iter_json_array([data])) == []
+
+
+@pytest.mark.parametrize('data', [b'{"id": 1}', b'[{"id": 1}', b'[{"id": 1,}]'])
+def test_iter_json_array_rejects_invalid_input(data):
+    with pytest.raises(ValueError):
+        list(iter_json_array([data]))
+
+
+def test_iter_json_array_yields_before_the_end_arrives():
+    rows = iter_json_array(iter([b'[{"id": 1}, ', b'{"id": 2}', b']']))
+    assert next(rows) == {'id': 1}
+
+
+### ListingMetrics ###
+
+def test_listing_metrics_records_time_to_first_row():
+    metrics = ListingMetrics()
+    assert list(metrics.track(iter([1, 2, 3]), lambda: 2)) == [1, 2, 3]
+    assert metrics.last.rows == 3
+    assert metrics.last.pages == 2
+    assert metrics.last.time_to_first_row is not None
+    assert metrics.last.elapsed >= metrics.last.time_to_first_row
+    assert metrics.count == 1
+
+
+def test_listing_metrics_without_rows():
+    metrics = ListingMetrics()
+    assert list(metrics.track(iter([]))) == []
+    assert metrics.last == ListingStats(0, 0, None, metrics.last.elapsed)
+
+
+### MovieDealer ###
+
+def test_iter_movies_streams_catalog(json_movies):
+    dealer = MovieDealer(stream_chunk_size=16)
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get(MOVIES_URL, json=json_movies)
+        assert list(dealer.iter_movies()) == json_movies
+    assert dealer.listing.last.rows == 5
+    assert dealer.listing.last.pages == 1
+
+
+def test_iter_movies_returns_nothing_when_request_fails():
+    dealer = MovieDealer()
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get(MOVIES_URL, status_code=500)
+        assert list(dealer.iter_movies()) == []
+    assert len(dealer.cache) == 0
+
+
+def test_iter_movies_follows_pages(json_movies):
+    dealer = MovieDealer()
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get(MOVIES_URL, [{'json': {'results': json_movies[:2], 'next': 'page2'}},
+                                      {'json': {'results': json_movies[2:4], 'next': 'page3'}},
+                                      {'json': {'results': json_movies[4:], 'next': None}}])
+        assert list(dealer.iter_movies(page_size=2)) == json_movies
+        assert request_mock.last_request.qs == {'limit': ['2'], 'offset': ['4']}
+    assert dealer.listing.last.pages == 3
+
+
+def test_iter_movies_accepts_unpaginated_server(json_movies):
+    dealer = MovieDealer()
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get(MOVIES_URL, json=json_movies)
+        assert list(dealer.iter_movies(page_size=2)) == json_movies
+        assert request_mock.call_count == 1
+
+
+def test_iter_movies_retains_catalog_for_local_queries(json_movies):
+    dealer = MovieDealer()
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get(MOVIES_URL, json=json_movies, headers={'ETag': '"v1"'})
+        list(dealer.iter_movies())
+        assert dealer.get_movies() == json_movies
+        assert [m['id'] for m in dealer.sort_movies_by_title()] == [1, 2, 3, 4, 5]
+        assert list(dealer.iter_movies()) == json_movies
+        assert request_mock.call_count == 1
+    assert dealer.cache.peek('/movies/').etag == '"v1"'
+
+
+def test_iter_movies_without_retain_keeps_nothing(json_movies):
+    dealer = MovieDealer()
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get(MOVIES_URL, json=json_movies)
+        list(dealer.iter_movies(retain=False))
+    assert len(dealer.cache) == 0
+    assert not dealer.catalog.is_loaded
+
+
+def test_partially_consumed_listing_is_not_retained(json_movies):
+    dealer = MovieDealer()
+    with requests_mock.Mocker() as request_mock:
+        request_mock.get(MOVIES_URL, json=json_movies)
+        rows = dealer.iter_movies()
+        next(rows)
+        rows.close()
+    assert len(dealer.cache) == 0
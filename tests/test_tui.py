@@ -0,0 +1,133 @@
+import curses
+from collections.abc import Sequence
+from unittest.mock import patch
+
+from movie.tui import ListView, MovieBrowser, Screen
+
+
+class Catalog(Sequence):
+    # a catalog of any size that builds its rows on demand and counts the ones read
+    def __init__(self, size: int):
+        self.size = size
+        self.read = set()
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, index):
+        if not 0 <= index < self.size:
+            raise IndexError(index)
+        self.read.add(index)
+        return {'id': index, 'title': f'Title {index}', 'director': 'Stanley Kubrick', 'category': 'ACTION',
+                'year': 2000}
+
+
+class Window:
+    def __init__(self, keys, height: int = 10, width: int = 80):
+        self.keys = list(keys)
+        self.size = (height, width)
+        self.writes = []
+        self.screen = {}
+
+    def getmaxyx(self):
+        return self.size
+
+    def addnstr(self, y, x, text, n, attr):
+        self.writes.append(y)
+        self.screen[y] = (text[:n], attr)
+
+    def refresh(self):
+        pass
+
+    def clear(self):
+        self.screen.clear()
+
+    def getch(self):
+        return self.keys.pop(0)
+
+
+def test_list_view_scrolls_to_keep_the_cursor_visible():
+    view = ListView(Catalog(100), height=10)
+    view.move(12)
+    assert (view.cursor, view.top) == (12, 3)
+    view.page(-1)
+    assert (view.cursor, view.top) == (2, 2)
+    view.jump(1000)
+    assert (view.cursor, view.top) == (99, 90)
+    view.jump(-5)
+    assert (view.cursor, view.top) == (0, 0)
+
+
+def test_list_view_reads_only_the_visible_rows():
+    rows = Catalog(10 ** 9)
+    view = ListView(rows, height=20)
+    view.jump(len(rows) - 1)
+    visible = view.visible()
+    assert [i for i, _ in visible] == list(range(10 ** 9 - 20, 10 ** 9))
+    assert len(rows.read) == 20
+
+
+def test_list_view_handles_short_and_empty_lists():
+    view = ListView(Catalog(3), height=10)
+    view.page(1)
+    assert (view.cursor, view.top, len(view.visible())) == (2, 0, 3)
+    empty = ListView([], height=10)
+    empty.jump(5)
+    assert (empty.cursor, empty.top, empty.visible()) == (0, 0, [])
+
+
+def test_screen_writes_only_changed_lines():
+    written = []
+    screen = Screen(lambda y, text, highlight: written.append(y))
+    assert screen.draw([('a', False), ('b', True)]) == 2
+    assert screen.draw([('a', False), ('c', True)]) == 1
+    assert written == [0, 1, 1]
+    screen.invalidate()
+    assert screen.draw([('a', False), ('c', True)]) == 2
+
+
+def test_frame_fills_the_screen():
+    view = ListView(Catalog(2), height=6)
+    lines = MovieBrowser().frame(view, 'ALL MOVIES', 60, 'status')
+    assert len(lines) == 6 + MovieBrowser.CHROME
+    assert all(len(text) == 60 for text, _ in lines)
+    assert lines[0] == ('ALL MOVIES'.ljust(60), True)
+    assert lines[3][0].split()[0] == '0' and lines[3][1] is True
+    assert 'Title 1' in lines[4][0] and lines[4][1] is False
+    assert lines[-1] == ('status'.ljust(60), True)
+
+
+@patch('curses.curs_set')
+def test_browser_redraws_only_the_rows_that_moved(curs_set):
+    window = Window([ord('j'), ord('q')])
+    MovieBrowser().run(window, Catalog(10 ** 6), 'ALL MOVIES')
+    first_frame, second_frame = window.writes[:10], window.writes[10:]
+    assert first_frame == list(range(10))
+    # the old and the new cursor row and the status line
+    assert second_frame == [3, 4, 9]
+    assert window.screen[4][1] == curses.A_REVERSE
+
+
+@patch('curses.curs_set')
+def test_browser_jumps_to_a_row_number(curs_set):
+    rows = Catalog(10 ** 6)
+    window = Window([ord('5'), ord('0'), ord('0'), 10, ord('G'), ord('g'), ord('q')])
+    MovieBrowser().run(window, rows, 'ALL MOVIES')
+    assert 499 in rows.read and 10 ** 6 - 1 in rows.read
+    # each frame reads at most a screen of rows
+    assert len(rows.read) <= 4 * 6
+    assert window.screen[3][0].split()[0] == '0'
+
+
+@patch('curses.curs_set')
+def test_escape_clears_a_pending_jump_before_leaving(curs_set):
+    window = Window([ord('7'), 27, ord('q')])
+    MovieBrowser().run(window, Catalog(10), 'ALL MOVIES')
+    assert window.keys == []
+
+
+@patch('curses.curs_set')
+def test_resize_redraws_everything(curs_set):
+    window = Window([curses.KEY_RESIZE, ord('q')], height=8)
+    MovieBrowser().run(window, Catalog(10), 'ALL MOVIES')
+    assert window.writes == list(range(8)) * 2
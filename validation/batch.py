@@ -0,0 +1,41 @@
+from dataclasses import dataclass, fields
+from typing import Any, Callable, Iterable, List
+
+from typeguard import typechecked
+
+
+@dataclass(frozen=True)
+@typechecked
+class BatchError:
+    index: int
+    error: Exception
+
+
+@dataclass(frozen=True)
+@typechecked
+class BatchResult:
+    valid: List[Any]
+    errors: List[BatchError]
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+
+def validate_batch(cls: type, values: Iterable[Any], accept: Callable[[Any], bool]) -> BatchResult:
+    # `accept` must only pass values that `cls` accepts too: those skip the per-instance checks, while
+    # everything else is built through `cls` so that errors are exactly those of single validation
+    name = fields(cls)[0].name
+    new, set_value = object.__new__, object.__setattr__
+    valid, errors = [], []
+    for index, value in enumerate(values):
+        if accept(value):
+            res = new(cls)
+            set_value(res, name, value)
+            valid.append(res)
+            continue
+        try:
+            valid.append(cls(value))
+        except Exception as e:
+            errors.append(BatchError(index, e))
+    return BatchResult(valid, errors)
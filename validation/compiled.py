@@ -0,0 +1,95 @@
+import re
+import threading
+import time
+from dataclasses import fields
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional, get_type_hints
+
+from valid8 import validate
+
+from validation.dataclasses import validate_dataclass
+from validation.regex import pattern
+
+
+def daily(compute: Callable[[], Any]) -> Callable[[], Any]:
+    # the value is computed again after local midnight, so long running sessions see the new day
+    lock = threading.Lock()
+    state = {'value': None, 'expires': 0.0}
+
+    def cached():
+        if time.monotonic() >= state['expires']:
+            with lock:
+                now = datetime.now()
+                midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+                state['value'] = compute()
+                state['expires'] = time.monotonic() + (midnight - now).total_seconds()
+        return state['value']
+
+    cached.__name__ = compute.__name__
+    return cached
+
+
+class Validator:
+    def __init__(self, cls: type, accept: Optional[Callable[[Any], bool]], accept_instance: Callable[[Any], bool],
+                 fallback: Callable[[Any], None]):
+        self.cls = cls
+        self.accept = accept
+        self.__accept_instance = accept_instance
+        self.__fallback = fallback
+
+    def check(self, instance: Any) -> None:
+        if not self.__accept_instance(instance):
+            self.__fallback(instance)
+
+
+def compile_validator(cls: type, name: str = 'value', help_msg: Optional[str] = None,
+                      min_len: Optional[int] = None, max_len: Optional[int] = None,
+                      min_value: Any = None, max_value: Any = None,
+                      regex: Optional[str] = None, custom: Optional[Callable[[Any], bool]] = None) -> Validator:
+    # Builds one specialised predicate per class with every bound and pattern bound once. Values the
+    # predicate rejects go through the usual validate_dataclass and valid8 path, so errors do not change.
+    hints = get_type_hints(cls)
+    names = [f.name for f in fields(cls)]
+    match = re.compile(regex).fullmatch if regex is not None else None
+    namespace: Dict[str, Any] = {}
+
+    def constant(value: Any) -> str:
+        key = f'_c{len(namespace)}'
+        namespace[key] = value
+        return key
+
+    def bound(value: Any) -> str:
+        return f'{constant(value)}()' if callable(value) else constant(value)
+
+    def conditions(subject: Callable[[str], str]) -> str:
+        res = [f'isinstance({subject(n)}, {constant(hints[n])})' for n in names]
+        value = subject(names[0])
+        if min_len is not None:
+            res.append(f'len({value}) >= {bound(min_len)}')
+        if max_len is not None:
+            res.append(f'len({value}) <= {bound(max_len)}')
+        if min_value is not None:
+            res.append(f'{value} >= {bound(min_value)}')
+        if max_value is not None:
+            res.append(f'{value} <= {bound(max_value)}')
+        if match is not None:
+            res.append(f'{constant(match)}({value}) is not None')
+        if custom is not None:
+            res.append(f'{constant(custom)}({value})')
+        return ' and '.join(res)
+
+    source = (f'def accept(value):\n    return {conditions(lambda n: "value")}\n'
+              f'def accept_instance(self):\n    return {conditions(lambda n: f"self.{n}")}\n')
+    exec(source, namespace)
+
+    rules = {'min_len': min_len, 'max_len': max_len, 'min_value': min_value, 'max_value': max_value,
+             'custom': pattern(regex) if regex is not None else custom}
+    rules = {k: v for k, v in rules.items() if v is not None}
+
+    def fallback(instance: Any) -> None:
+        validate_dataclass(instance)
+        if rules:
+            resolved = {k: v() if k != 'custom' and callable(v) else v for k, v in rules.items()}
+            validate(name, getattr(instance, names[0]), help_msg=help_msg, **resolved)
+
+    return Validator(cls, namespace['accept'] if len(names) == 1 else None, namespace['accept_instance'], fallback)
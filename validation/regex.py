@@ -1,9 +1,11 @@
 import re
+from functools import lru_cache
 from typing import Callable
 
 from typeguard import typechecked
 
 
+@lru_cache(maxsize=None)
 @typechecked
 def pattern(regex: str) -> Callable[[str], bool]:
     r = re.compile(regex)